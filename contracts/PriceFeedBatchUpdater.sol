@@ -0,0 +1,75 @@
+// SPDX-License-Identifier: MIT
+
+pragma solidity 0.8.4;
+
+import "OpenZeppelin/openzeppelin-contracts@4.0.0/contracts/utils/Address.sol";
+
+interface IStEthPriceFeed {
+    function update_safe_price() external returns (uint256);
+
+    function fetch_safe_price(uint256 max_age) external returns (uint256, uint256);
+}
+
+/**
+ * @dev Refreshes the cached safe price of several feeds in one transaction. A feed whose
+ *      call reverts, e.g. because its current price is not safe, is skipped without
+ *      reverting the batch. The outcome for every feed is reported in the events.
+ */
+contract PriceFeedBatchUpdater {
+    /**
+     * @dev Emitted for every feed whose call succeeded, with the returned safe price and its timestamp.
+     */
+    event SafePriceFetched(address indexed priceFeed, uint256 price, uint256 timestamp);
+
+    /**
+     * @dev Emitted for every feed whose call reverted, with the revert reason if there is one,
+     *      and for every address without code, with the `not a contract` reason.
+     */
+    event SafePriceFetchFailed(address indexed priceFeed, string reason);
+
+    /**
+     * @dev Calls `update_safe_price()` of every feed.
+     *
+     * Returns the number of the feeds that were updated.
+     */
+    function updateSafePrices(address[] calldata priceFeeds) external returns (uint256 updatedCount) {
+        for (uint256 i = 0; i < priceFeeds.length; i++) {
+            // the call to an address without code reverts in the caller, not in the `try`
+            if (!Address.isContract(priceFeeds[i])) {
+                emit SafePriceFetchFailed(priceFeeds[i], "not a contract");
+                continue;
+            }
+            try IStEthPriceFeed(priceFeeds[i]).update_safe_price() returns (uint256 price) {
+                emit SafePriceFetched(priceFeeds[i], price, block.timestamp);
+                updatedCount++;
+            } catch Error(string memory reason) {
+                emit SafePriceFetchFailed(priceFeeds[i], reason);
+            } catch {
+                emit SafePriceFetchFailed(priceFeeds[i], "");
+            }
+        }
+    }
+
+    /**
+     * @dev Calls `fetch_safe_price(maxAge)` of every feed, so only the feeds with
+     *      the cached safe price older than `maxAge` seconds are updated.
+     *
+     * Returns the number of the feeds that returned a safe price.
+     */
+    function fetchSafePrices(address[] calldata priceFeeds, uint256 maxAge) external returns (uint256 fetchedCount) {
+        for (uint256 i = 0; i < priceFeeds.length; i++) {
+            if (!Address.isContract(priceFeeds[i])) {
+                emit SafePriceFetchFailed(priceFeeds[i], "not a contract");
+                continue;
+            }
+            try IStEthPriceFeed(priceFeeds[i]).fetch_safe_price(maxAge) returns (uint256 price, uint256 timestamp) {
+                emit SafePriceFetched(priceFeeds[i], price, timestamp);
+                fetchedCount++;
+            } catch Error(string memory reason) {
+                emit SafePriceFetchFailed(priceFeeds[i], reason);
+            } catch {
+                emit SafePriceFetchFailed(priceFeeds[i], "");
+            }
+        }
+    }
+}
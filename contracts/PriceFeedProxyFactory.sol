@@ -0,0 +1,53 @@
+// SPDX-License-Identifier: MIT
+
+pragma solidity 0.8.4;
+
+import "OpenZeppelin/openzeppelin-contracts@4.0.0/contracts/utils/Address.sol";
+import "./PriceFeedProxy.sol";
+
+/**
+ * @dev Deploys price feed proxies pointing to one implementation deployed beforehand, so
+ *      only the proxy is paid for on every deployment. The proxies are regular, separately
+ *      upgradeable `PriceFeedProxy` instances, initialized in the same transaction they are
+ *      created in.
+ */
+contract PriceFeedProxyFactory {
+    /**
+     * @dev The implementation of the deployed proxies.
+     */
+    address public immutable implementation;
+
+    /**
+     * @dev Emitted when a proxy is deployed.
+     */
+    event PriceFeedDeployed(address indexed priceFeed, address indexed admin);
+
+    constructor(address priceFeedImpl) {
+        require(Address.isContract(priceFeedImpl), "PriceFeedProxyFactory: not a contract");
+        implementation = priceFeedImpl;
+    }
+
+    /**
+     * @dev Deploys a proxy to `implementation` and initializes it with the given parameters.
+     *      `admin` becomes both the admin of the feed and of the proxy.
+     *
+     * Emits a {PriceFeedDeployed} event.
+     */
+    function deployPriceFeed(
+        uint256 maxSafePriceDifference,
+        address stableSwapOracleAddress,
+        address curvePoolAddress,
+        address admin
+    ) external returns (address priceFeed) {
+        priceFeed = address(
+            new PriceFeedProxy(
+                implementation,
+                maxSafePriceDifference,
+                stableSwapOracleAddress,
+                curvePoolAddress,
+                admin
+            )
+        );
+        emit PriceFeedDeployed(priceFeed, admin);
+    }
+}
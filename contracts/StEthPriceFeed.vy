@@ -1,10 +1,42 @@
 # SPDX-License-Identifier: MIT
 # @author Lido <info@lido.fi>
-# @version 0.2.12
+# @version 0.3.10
+# pragma evm-version istanbul
 
 
-CURVE_ETH_INDEX: constant(uint256) = 0
-CURVE_STETH_INDEX: constant(uint256) = 1
+CURVE_ETH_INDEX: constant(int128) = 0
+CURVE_STETH_INDEX: constant(int128) = 1
+
+SAFE_PRICE_VALUE_MASK: constant(uint256) = 340282366920938463463374607431768211455 # 2**128 - 1
+SAFE_PRICE_TIMESTAMP_SHIFT: constant(uint256) = 128
+
+MAX_PRICE_AMOUNTS: constant(uint256) = 8
+
+FETCH_STATUS_CACHED: constant(uint256) = 0
+FETCH_STATUS_UPDATED: constant(uint256) = 1
+FETCH_STATUS_UNSAFE: constant(uint256) = 2
+FETCH_STATUS_ANCHOR_STALE: constant(uint256) = 3
+
+MAX_PRICE_HISTORY_CAPACITY: constant(uint256) = 1024
+OBSERVATION_CUMULATIVE_MASK: constant(uint256) = 6277101735386680763835789423207666416102355444464034512895 # 2**192 - 1
+OBSERVATION_TIMESTAMP_SHIFT: constant(uint256) = 192
+
+MAX_ANCHOR_AGE: constant(uint256) = 604800 # 1 week
+
+# A heartbeat keeps the cached price with a fresh timestamp, so the threshold is kept
+# well below `max_safe_price_difference`
+MAX_MIN_SAFE_PRICE_CHANGE: constant(uint256) = 50 # 0.5%
+
+MAX_PRICE_SOURCES: constant(uint256) = 5
+MAX_PRICE_SOURCE_GAS_LIMIT: constant(uint256) = 200000
+PRICE_SOURCE_ADDRESS_MASK: constant(uint256) = 1461501637330902918203684832716283019655932542975 # 2**160 - 1
+PRICE_SOURCE_GAS_LIMIT_SHIFT: constant(uint256) = 160
+# gas spent by the feed between the check of the remaining gas and the source call
+PRICE_SOURCE_CALL_GAS_OVERHEAD: constant(uint256) = 1000
+
+PRICE_MEMO_PRICE_MASK: constant(uint256) = 79228162514264337593543950335 # 2**96 - 1
+PRICE_MEMO_UNSAFE_SHIFT: constant(uint256) = 192
+PRICE_MEMO_BLOCK_SHIFT: constant(uint256) = 193
 
 # Note: check out the unstructured storage upgrade guide before making changes
 # to the variable order after the deployment to prevent storage collisions
@@ -12,10 +44,32 @@ CURVE_STETH_INDEX: constant(uint256) = 1
 
 admin: public(address)
 max_safe_price_difference: public(uint256)
-safe_price_value: public(uint256)
-safe_price_timestamp: public(uint256)
+# Unused since v2, cleared by `finalize_upgrade_v2`
+legacy_safe_price_value: uint256
+legacy_safe_price_timestamp: uint256
 curve_pool_address: public(address)
 stable_swap_oracle_address: public(address)
+# The cached safe price in the lower 128 bits and its timestamp in the upper 128 bits
+safe_price_packed: uint256
+# Ring buffer of the safe price observations, zero capacity means the history is disabled
+price_history_capacity: public(uint256)
+price_history_count: public(uint256)
+# Time-integral of the safe price up to the observation in the lower 192 bits
+# and the observation timestamp in the upper 64 bits
+price_observations: HashMap[uint256, uint256]
+# Price sources aggregated with the Curve pool price, see `set_price_sources`
+price_sources_count: public(uint256)
+# Source address in the lower 160 bits and its gas stipend in the upper 96 bits
+price_source_configs: uint256[MAX_PRICE_SOURCES]
+# Maximum age of the anchor price in seconds, zero means the age is not checked
+max_anchor_age: public(uint256)
+# Minimum safe price change written by an update, smaller changes only refresh the timestamp
+min_safe_price_change: public(uint256)
+# The price stored by `snapshot_price` in the block of the upper 63 bits: the price in the lower
+# 96 bits and whether the price has changed unsafely in bit 192
+price_memo: uint256
+# Minimum number of the price sources that must respond for the price to be safe
+price_source_quorum: public(uint256)
 
 
 interface StableSwap:
@@ -24,6 +78,7 @@ interface StableSwap:
 
 interface StableSwapStateOracle:
     def stethPrice() -> uint256: view
+    def timestamp() -> uint256: view
 
 
 event SafePriceUpdated:
@@ -36,6 +91,21 @@ event AdminChanged:
 event MaxSafePriceDifferenceChanged:
     max_safe_price_difference: uint256
 
+event MaxAnchorAgeChanged:
+    max_anchor_age: uint256
+
+event MinSafePriceChangeChanged:
+    min_safe_price_change: uint256
+
+event PriceSourcesChanged:
+    sources: address[MAX_PRICE_SOURCES]
+    gas_limits: uint256[MAX_PRICE_SOURCES]
+    quorum: uint256
+
+event PriceHistoryInitialized:
+    capacity: uint256
+
+
 @external
 def initialize(
     max_safe_price_difference: uint256,
@@ -51,10 +121,10 @@ def initialize(
     @param curve_pool_address Curve stEth/Eth pool address
     @param stable_swap_oracle_address Stable swap oracle address
     """
-    assert self.curve_pool_address == ZERO_ADDRESS
+    assert self.curve_pool_address == empty(address)
     assert max_safe_price_difference <= 1000
-    assert stable_swap_oracle_address != ZERO_ADDRESS
-    assert curve_pool_address != ZERO_ADDRESS
+    assert stable_swap_oracle_address != empty(address)
+    assert curve_pool_address != empty(address)
 
     self.max_safe_price_difference = max_safe_price_difference
     self.admin = admin
@@ -62,6 +132,47 @@ def initialize(
     self.curve_pool_address = curve_pool_address
 
 
+@external
+def finalize_upgrade_v2():
+    """
+    @dev Moves the cached safe price from the two legacy slots into the packed one.
+
+    Should be passed as the setup call to `PriceFeedProxy.upgradeTo` when upgrading
+    from the v1 implementation. Does nothing if there is nothing to migrate. The legacy
+    price never overwrites a price written by v2, it's only cleared.
+    """
+    assert self.curve_pool_address != empty(address)
+    legacy_timestamp: uint256 = self.legacy_safe_price_timestamp
+    if legacy_timestamp != 0:
+        if self.safe_price_packed == 0:
+            self.safe_price_packed = (legacy_timestamp << SAFE_PRICE_TIMESTAMP_SHIFT) | self.legacy_safe_price_value
+        self.legacy_safe_price_value = 0
+        self.legacy_safe_price_timestamp = 0
+
+
+@external
+def initialize_price_history(capacity: uint256):
+    """
+    @dev Enables the safe price history keeping the last `capacity` safe price updates.
+
+    May only be called by the admin, and only once.
+    Maximal capacity accepted is 1024.
+
+    @param capacity Number of the safe price updates kept in the ring buffer
+    """
+    assert msg.sender == self.admin
+    assert self.price_history_capacity == 0
+    assert capacity != 0 and capacity <= MAX_PRICE_HISTORY_CAPACITY
+
+    self.price_history_capacity = capacity
+    safe_price_timestamp: uint256 = self.safe_price_packed >> SAFE_PRICE_TIMESTAMP_SHIFT
+    if safe_price_timestamp != 0:
+        self.price_observations[0] = safe_price_timestamp << OBSERVATION_TIMESTAMP_SHIFT
+        self.price_history_count = 1
+
+    log PriceHistoryInitialized(capacity)
+
+
 @view
 @internal
 def _percentage_diff(new: uint256, old: uint256) -> uint256:
@@ -77,20 +188,146 @@ def safe_price() -> (uint256, uint256):
     """
     @dev Returns the cached safe price and its timestamp. Reverts if no cached price was set.
     """
-    safe_price_timestamp: uint256 = self.safe_price_timestamp
+    packed: uint256 = self.safe_price_packed
+    safe_price_timestamp: uint256 = packed >> SAFE_PRICE_TIMESTAMP_SHIFT
     assert safe_price_timestamp != 0
-    return (self.safe_price_value, safe_price_timestamp)
+    return (packed & SAFE_PRICE_VALUE_MASK, safe_price_timestamp)
+
+
+@view
+@external
+def safe_price_value() -> uint256:
+    """
+    @dev Returns the cached safe price, or zero if no cached price was set.
+    """
+    return self.safe_price_packed & SAFE_PRICE_VALUE_MASK
+
+
+@view
+@external
+def safe_price_timestamp() -> uint256:
+    """
+    @dev Returns the timestamp of the cached safe price, or zero if no cached price was set.
+    """
+    return self.safe_price_packed >> SAFE_PRICE_TIMESTAMP_SHIFT
+
+
+@view
+@external
+def price_sources() -> (address[MAX_PRICE_SOURCES], uint256[MAX_PRICE_SOURCES]):
+    """
+    @dev Returns the additional price sources and their gas stipends, see `set_price_sources`.
+    """
+    sources: address[MAX_PRICE_SOURCES] = empty(address[MAX_PRICE_SOURCES])
+    gas_limits: uint256[MAX_PRICE_SOURCES] = empty(uint256[MAX_PRICE_SOURCES])
+    count: uint256 = self.price_sources_count
+    for i in range(MAX_PRICE_SOURCES):
+        if i >= count:
+            break
+        config: uint256 = self.price_source_configs[i]
+        sources[i] = convert(config & PRICE_SOURCE_ADDRESS_MASK, address)
+        gas_limits[i] = config >> PRICE_SOURCE_GAS_LIMIT_SHIFT
+    return (sources, gas_limits)
 
 
 @view
 @internal
-def _current_price() -> (uint256, bool, uint256):
+def _median_price(pool_price: uint256) -> (uint256, bool):
+    """
+    @dev Returns the median of the pool price and the prices of the sources that
+    responded, and whether at least `price_source_quorum` sources responded.
+    """
+    count: uint256 = self.price_sources_count
+    if count == 0:
+        return (pool_price, True)
+
+    # sorted prices, filled by insertion as the sources are read
+    prices: uint256[MAX_PRICE_SOURCES + 1] = empty(uint256[MAX_PRICE_SOURCES + 1])
+    prices[0] = pool_price
+    responded: uint256 = 0
+    for i in range(MAX_PRICE_SOURCES):
+        if i >= count:
+            break
+        config: uint256 = self.price_source_configs[i]
+        gas_limit: uint256 = config >> PRICE_SOURCE_GAS_LIMIT_SHIFT
+        # the call gets at most 63/64 of the remaining gas, and a source starved by the gas
+        # limit of the caller must not be skipped as if it had failed on its own
+        assert msg.gas >= gas_limit * 64 / 63 + PRICE_SOURCE_CALL_GAS_OVERHEAD, "not enough gas for price sources"
+        success: bool = False
+        response: Bytes[32] = b""
+        success, response = raw_call(
+            convert(config & PRICE_SOURCE_ADDRESS_MASK, address),
+            method_id("get_price()"),
+            max_outsize=32,
+            gas=gas_limit,
+            is_static_call=True,
+            revert_on_failure=False
+        )
+        if not success or len(response) != 32:
+            continue
+        price: uint256 = convert(response, uint256)
+        j: uint256 = responded + 1
+        for k in range(MAX_PRICE_SOURCES):
+            if j == 0 or prices[j - 1] <= price:
+                break
+            prices[j] = prices[j - 1]
+            j -= 1
+        prices[j] = price
+        responded += 1
+
+    total: uint256 = responded + 1
+    median: uint256 = 0
+    if total % 2 == 1:
+        median = prices[total / 2]
+    else:
+        median = (prices[total / 2 - 1] + prices[total / 2]) / 2
+    return (median, responded >= self.price_source_quorum)
+
+
+@view
+@internal
+def _is_anchor_stale() -> bool:
+    max_anchor_age: uint256 = self.max_anchor_age
+    if max_anchor_age == 0:
+        return False
+    anchor_timestamp: uint256 = StableSwapStateOracle(self.stable_swap_oracle_address).timestamp()
+    return anchor_timestamp + max_anchor_age < block.timestamp
+
+
+@view
+@internal
+def _pool_price() -> (uint256, bool, uint256):
     pool_price: uint256 = StableSwap(self.curve_pool_address).get_dy(CURVE_STETH_INDEX, CURVE_ETH_INDEX, 10**18)
+    has_quorum: bool = True
+    pool_price, has_quorum = self._median_price(pool_price)
     oracle_price: uint256 = StableSwapStateOracle(self.stable_swap_oracle_address).stethPrice()
-    has_changed_unsafely: bool = self._percentage_diff(pool_price, oracle_price) > self.max_safe_price_difference
+    has_changed_unsafely: bool = not has_quorum or self._percentage_diff(pool_price, oracle_price) > self.max_safe_price_difference
     return (pool_price, has_changed_unsafely, oracle_price)
 
 
+@view
+@internal
+def _current_price() -> (uint256, bool, uint256):
+    pool_price: uint256 = 0
+    has_changed_unsafely: bool = True
+    oracle_price: uint256 = 0
+    pool_price, has_changed_unsafely, oracle_price = self._pool_price()
+    if not has_changed_unsafely:
+        has_changed_unsafely = self._is_anchor_stale()
+    return (pool_price, has_changed_unsafely, oracle_price)
+
+
+@internal
+def _memoize_price(pool_price: uint256, has_changed_unsafely: bool):
+    # prices that don't fit are not memoized, they are computed on every snapshot instead
+    if pool_price > PRICE_MEMO_PRICE_MASK:
+        return
+    memo: uint256 = (block.number << PRICE_MEMO_BLOCK_SHIFT) | pool_price
+    if has_changed_unsafely:
+        memo = memo | (1 << PRICE_MEMO_UNSAFE_SHIFT)
+    self.price_memo = memo
+
+
 @view
 @external
 def full_price_info() -> (uint256, bool, uint256):
@@ -119,20 +356,174 @@ def current_price() -> (uint256, bool):
     return (current_price, is_safe)
 
 
+@external
+def snapshot_price() -> (uint256, bool):
+    """
+    @dev Same as `current_price()`, but the first call in a block stores the result and
+    later calls in the same block return it without querying the pool and the oracle.
+
+    Only `snapshot_price()` reads the stored result, the other functions always query
+    the pool. Note that the result is shared by all the transactions of the block, so
+    a later transaction gets the price as of the first snapshot.
+    """
+    current_price: uint256 = 0
+    has_changed_unsafely: bool = True
+    oracle_price: uint256 = 0
+    memo: uint256 = self.price_memo
+    if memo >> PRICE_MEMO_BLOCK_SHIFT == block.number:
+        current_price = memo & PRICE_MEMO_PRICE_MASK
+        has_changed_unsafely = (memo >> PRICE_MEMO_UNSAFE_SHIFT) & 1 == 1
+    else:
+        current_price, has_changed_unsafely, oracle_price = self._current_price()
+        self._memoize_price(current_price, has_changed_unsafely)
+    is_safe: bool = current_price <= 10**18 and not has_changed_unsafely
+    return (current_price, is_safe)
+
+
+@view
+@external
+def feed_state() -> (uint256, uint256, uint256, bool, uint256, uint256, address, address, address):
+    """
+    @dev Returns the whole feed state in a single call: the cached safe price and its timestamp,
+    the current pool price, whether it's safe, the anchor price, the maximum allowed safe
+    price difference, the admin, the Curve pool address and the stable swap oracle address.
+
+    Unlike `safe_price()`, returns zero safe price and timestamp if no cached price was set.
+    """
+    packed: uint256 = self.safe_price_packed
+    current_price: uint256 = 0
+    has_changed_unsafely: bool = True
+    oracle_price: uint256 = 0
+    current_price, has_changed_unsafely, oracle_price = self._current_price()
+    is_safe: bool = current_price <= 10**18 and not has_changed_unsafely
+    return (
+        packed & SAFE_PRICE_VALUE_MASK,
+        packed >> SAFE_PRICE_TIMESTAMP_SHIFT,
+        current_price,
+        is_safe,
+        oracle_price,
+        self.max_safe_price_difference,
+        self.admin,
+        self.curve_pool_address,
+        self.stable_swap_oracle_address
+    )
+
+
+@view
+@external
+def price_for_amounts(
+    amounts: uint256[MAX_PRICE_AMOUNTS]
+) -> (uint256[MAX_PRICE_AMOUNTS], bool[MAX_PRICE_AMOUNTS], uint256):
+    """
+    @dev Returns the pool price per 10**18 stETH when selling each of the given amounts,
+    whether each of the prices is safe, and the anchor price.
+
+    The amounts are read up to the first zero one; the remaining entries
+    are returned as zero prices that are not safe.
+    """
+    prices: uint256[MAX_PRICE_AMOUNTS] = empty(uint256[MAX_PRICE_AMOUNTS])
+    is_safe: bool[MAX_PRICE_AMOUNTS] = empty(bool[MAX_PRICE_AMOUNTS])
+
+    curve_pool_address: address = self.curve_pool_address
+    oracle_price: uint256 = StableSwapStateOracle(self.stable_swap_oracle_address).stethPrice()
+    max_safe_price_difference: uint256 = self.max_safe_price_difference
+    is_anchor_fresh: bool = not self._is_anchor_stale()
+
+    for i in range(MAX_PRICE_AMOUNTS):
+        amount: uint256 = amounts[i]
+        if amount == 0:
+            break
+        price: uint256 = StableSwap(curve_pool_address).get_dy(CURVE_STETH_INDEX, CURVE_ETH_INDEX, amount) * 10**18 / amount
+        prices[i] = price
+        is_safe[i] = is_anchor_fresh and price <= 10**18 and self._percentage_diff(price, oracle_price) <= max_safe_price_difference
+
+    return (prices, is_safe, oracle_price)
+
+
+@view
+@external
+def twap(window: uint256) -> (uint256, uint256):
+    """
+    @dev Returns the time-weighted average safe price since the `window`-th latest
+    safe price update, and the timestamp of that update.
+
+    The cached safe price is considered to be in effect up to the current block.
+    Reverts if the history keeps fewer than `window` updates.
+    """
+    count: uint256 = self.price_history_count
+    capacity: uint256 = self.price_history_capacity
+    assert window != 0 and window <= count and window <= capacity
+
+    last: uint256 = self.price_observations[(count - 1) % capacity]
+    first: uint256 = self.price_observations[(count - window) % capacity]
+    last_timestamp: uint256 = last >> OBSERVATION_TIMESTAMP_SHIFT
+    first_timestamp: uint256 = first >> OBSERVATION_TIMESTAMP_SHIFT
+
+    safe_price: uint256 = self.safe_price_packed & SAFE_PRICE_VALUE_MASK
+    if block.timestamp == first_timestamp:
+        return (safe_price, first_timestamp)
+
+    cumulative: uint256 = (last & OBSERVATION_CUMULATIVE_MASK) + safe_price * (block.timestamp - last_timestamp)
+    twap: uint256 = (cumulative - (first & OBSERVATION_CUMULATIVE_MASK)) / (block.timestamp - first_timestamp)
+    return (twap, first_timestamp)
+
+
 @internal
-def _update_safe_price() -> uint256:
+def _record_price_observation(prev_price: uint256, capacity: uint256):
+    # `prev_price` has been in effect since the latest observation
+    count: uint256 = self.price_history_count
+    cumulative: uint256 = 0
+    if count != 0:
+        last: uint256 = self.price_observations[(count - 1) % capacity]
+        last_timestamp: uint256 = last >> OBSERVATION_TIMESTAMP_SHIFT
+        if last_timestamp == block.timestamp:
+            return
+        cumulative = (last & OBSERVATION_CUMULATIVE_MASK) + prev_price * (block.timestamp - last_timestamp)
+    self.price_observations[count % capacity] = (block.timestamp << OBSERVATION_TIMESTAMP_SHIFT) | cumulative
+    self.price_history_count = count + 1
+
+
+@internal
+def _try_update_safe_price() -> (uint256, uint256):
+    # checked first so that a stale anchor doesn't cost the pool quote
+    if self._is_anchor_stale():
+        return (0, FETCH_STATUS_ANCHOR_STALE)
+
     price: uint256 = 0
     has_changed_unsafely: bool = True
     _: uint256 = 0
-    price, has_changed_unsafely, _ = self._current_price()
-    assert not has_changed_unsafely, "price is not safe"
+    price, has_changed_unsafely, _ = self._pool_price()
+    if has_changed_unsafely:
+        return (0, FETCH_STATUS_UNSAFE)
 
     price = min(10**18, price)
-    log SafePriceUpdated(self.safe_price_value, price)
+    prev_price: uint256 = self.safe_price_packed & SAFE_PRICE_VALUE_MASK
+
+    min_safe_price_change: uint256 = self.min_safe_price_change
+    if min_safe_price_change != 0 and prev_price != 0:
+        if self._percentage_diff(price, prev_price) < min_safe_price_change:
+            # a heartbeat: the cached price is kept and only its timestamp is refreshed
+            self.safe_price_packed = (block.timestamp << SAFE_PRICE_TIMESTAMP_SHIFT) | prev_price
+            return (prev_price, FETCH_STATUS_UPDATED)
+
+    log SafePriceUpdated(prev_price, price)
+
+    capacity: uint256 = self.price_history_capacity
+    if capacity != 0:
+        self._record_price_observation(prev_price, capacity)
 
-    self.safe_price_value = price
-    self.safe_price_timestamp = block.timestamp
+    self.safe_price_packed = (block.timestamp << SAFE_PRICE_TIMESTAMP_SHIFT) | price
 
+    return (price, FETCH_STATUS_UPDATED)
+
+
+@internal
+def _update_safe_price() -> uint256:
+    price: uint256 = 0
+    status: uint256 = 0
+    price, status = self._try_update_safe_price()
+    assert status != FETCH_STATUS_ANCHOR_STALE, "anchor price is stale"
+    assert status == FETCH_STATUS_UPDATED, "price is not safe"
     return price
 
 
@@ -142,7 +533,12 @@ def update_safe_price() -> uint256:
     @dev Sets the cached safe price to the current pool price.
 
     If the price is higher than 10**18, sets the cached safe price to 10**18.
-    If the price is not safe for any other reason, reverts.
+    If the price is not safe for any other reason, reverts. Reverts without
+    querying the pool if the anchor price is older than `max_anchor_age`.
+
+    If the price differs from the cached one by less than `min_safe_price_change`,
+    keeps the cached price and only sets its timestamp to the current one.
+    Returns the cached safe price.
     """
     return self._update_safe_price()
 
@@ -155,12 +551,43 @@ def fetch_safe_price(max_age: uint256) -> (uint256, uint256):
     Calls `update_safe_price()` prior to that if the cached safe price
     is older than `max_age` seconds.
     """
-    safe_price_timestamp: uint256 = self.safe_price_timestamp
+    packed: uint256 = self.safe_price_packed
+    safe_price_timestamp: uint256 = packed >> SAFE_PRICE_TIMESTAMP_SHIFT
     if safe_price_timestamp == 0 or block.timestamp - safe_price_timestamp > max_age:
         price: uint256 = self._update_safe_price()
         return (price, block.timestamp)
     else:
-        return (self.safe_price_value, safe_price_timestamp)
+        return (packed & SAFE_PRICE_VALUE_MASK, safe_price_timestamp)
+
+
+@external
+def try_fetch_safe_price(max_age: uint256) -> (uint256, uint256, uint256):
+    """
+    @dev Returns the cached safe price, its timestamp and the fetch status.
+
+    Behaves like `fetch_safe_price(max_age)`, but if the cached safe price needs to be
+    updated and the current price is not safe, returns the outdated cached price and
+    its timestamp instead of reverting. The price and the timestamp are both zero if
+    no cached price was set.
+
+    Status is FETCH_STATUS_CACHED (0) if the cached price is not older than `max_age`,
+    FETCH_STATUS_UPDATED (1) if it has been updated, FETCH_STATUS_UNSAFE (2) if the
+    current price is not safe, and FETCH_STATUS_ANCHOR_STALE (3) if the anchor price
+    is older than `max_anchor_age`.
+    """
+    packed: uint256 = self.safe_price_packed
+    safe_price_timestamp: uint256 = packed >> SAFE_PRICE_TIMESTAMP_SHIFT
+    safe_price_value: uint256 = packed & SAFE_PRICE_VALUE_MASK
+    if safe_price_timestamp != 0 and block.timestamp - safe_price_timestamp <= max_age:
+        return (safe_price_value, safe_price_timestamp, FETCH_STATUS_CACHED)
+
+    price: uint256 = 0
+    status: uint256 = 0
+    price, status = self._try_update_safe_price()
+    if status == FETCH_STATUS_UPDATED:
+        return (price, block.timestamp, status)
+    else:
+        return (safe_price_value, safe_price_timestamp, status)
 
 
 @external
@@ -186,4 +613,75 @@ def set_max_safe_price_difference(max_safe_price_difference: uint256):
     assert msg.sender == self.admin
     assert max_safe_price_difference <= 1000
     self.max_safe_price_difference = max_safe_price_difference
+    self.price_memo = 0
     log MaxSafePriceDifferenceChanged(max_safe_price_difference)
+
+
+@external
+def set_max_anchor_age(max_anchor_age: uint256):
+    """
+    @dev Updates the maximum age of the anchor price in seconds, as reported by
+    the `timestamp()` of the stable swap oracle.
+
+    Prices are not safe while the anchor price is older than that. Zero disables
+    the check. May only be called by the admin.
+    Maximal age accepted is 1 week (604800)
+    """
+    assert msg.sender == self.admin
+    assert max_anchor_age <= MAX_ANCHOR_AGE
+    self.max_anchor_age = max_anchor_age
+    self.price_memo = 0
+    log MaxAnchorAgeChanged(max_anchor_age)
+
+
+@external
+def set_min_safe_price_change(min_safe_price_change: uint256):
+    """
+    @dev Updates the minimum change of the safe price written by an update.
+
+    Updates to a price that differs from the cached one by less than that only
+    refresh the timestamp of the cached price, without emitting `SafePriceUpdated`.
+    10000 equals to 100%, zero disables the check. May only be called by the admin.
+    Maximal value accepted is 0.5% (50)
+    """
+    assert msg.sender == self.admin
+    assert min_safe_price_change <= MAX_MIN_SAFE_PRICE_CHANGE
+    self.min_safe_price_change = min_safe_price_change
+    log MinSafePriceChangeChanged(min_safe_price_change)
+
+
+@external
+def set_price_sources(
+    sources: address[MAX_PRICE_SOURCES],
+    gas_limits: uint256[MAX_PRICE_SOURCES],
+    quorum: uint256
+):
+    """
+    @dev Sets the price sources aggregated with the Curve pool price.
+
+    The current price becomes the median of the Curve pool price and the prices
+    returned by `get_price()` of each source. The sources are read up to the first
+    zero address, each one with at most `gas_limits[i]` gas. A source that reverts,
+    runs out of its gas stipend or returns malformed data is skipped, and the price
+    is not safe unless at least `quorum` sources respond. Pass zero addresses to use
+    the Curve pool price only.
+
+    May only be called by the admin.
+    Maximal gas stipend accepted is 200000, maximal quorum is the number of sources
+    """
+    assert msg.sender == self.admin
+    count: uint256 = 0
+    for i in range(MAX_PRICE_SOURCES):
+        if sources[i] == empty(address):
+            assert gas_limits[i] == 0
+            self.price_source_configs[i] = 0
+        else:
+            assert i == count, "sources must be contiguous"
+            assert gas_limits[i] != 0 and gas_limits[i] <= MAX_PRICE_SOURCE_GAS_LIMIT
+            self.price_source_configs[i] = (gas_limits[i] << PRICE_SOURCE_GAS_LIMIT_SHIFT) | convert(sources[i], uint256)
+            count += 1
+    assert quorum <= count
+    self.price_sources_count = count
+    self.price_source_quorum = quorum
+    self.price_memo = 0
+    log PriceSourcesChanged(sources, gas_limits, quorum)
@@ -0,0 +1,113 @@
+# SPDX-License-Identifier: MIT
+# @author Lido <info@lido.fi>
+# @version 0.2.12
+# @notice Copy of the StEthPriceFeed cached safe price on a chain where the feed can't be called,
+#         pushed by a trusted relayer.
+
+
+SAFE_PRICE_VALUE_MASK: constant(uint256) = 340282366920938463463374607431768211455 # 2**128 - 1
+SAFE_PRICE_TIMESTAMP_MASK: constant(uint256) = 18446744073709551615 # 2**64 - 1
+SAFE_PRICE_TIMESTAMP_SHIFT: constant(int128) = 128
+SAFE_PRICE_BLOCK_SHIFT: constant(int128) = 192
+
+
+admin: public(address)
+relayer: public(address)
+# The mirrored safe price in the lower 128 bits, its mainnet timestamp in the next 64 bits
+# and the mainnet block it was read at in the upper 64 bits
+safe_price_packed: uint256
+
+
+event SafePriceMirrored:
+    price: uint256
+    price_timestamp: uint256
+    mainnet_block: uint256
+
+event AdminChanged:
+    admin: address
+
+event RelayerChanged:
+    relayer: address
+
+
+@external
+def __init__(admin: address, relayer: address):
+    self.admin = admin
+    self.relayer = relayer
+
+
+@view
+@external
+def safe_price() -> (uint256, uint256):
+    """
+    @dev Returns the mirrored safe price and its mainnet timestamp. Reverts if no price was pushed.
+    """
+    packed: uint256 = self.safe_price_packed
+    assert packed != 0
+    return (
+        bitwise_and(packed, SAFE_PRICE_VALUE_MASK),
+        bitwise_and(shift(packed, -SAFE_PRICE_TIMESTAMP_SHIFT), SAFE_PRICE_TIMESTAMP_MASK)
+    )
+
+
+@view
+@external
+def safe_price_info() -> (uint256, uint256, uint256):
+    """
+    @dev Returns the mirrored safe price, its mainnet timestamp and the mainnet block
+    it was read at, or zeros if no price was pushed.
+    """
+    packed: uint256 = self.safe_price_packed
+    return (
+        bitwise_and(packed, SAFE_PRICE_VALUE_MASK),
+        bitwise_and(shift(packed, -SAFE_PRICE_TIMESTAMP_SHIFT), SAFE_PRICE_TIMESTAMP_MASK),
+        shift(packed, -SAFE_PRICE_BLOCK_SHIFT)
+    )
+
+
+@external
+def push_safe_price(price: uint256, price_timestamp: uint256, mainnet_block: uint256):
+    """
+    @dev Stores the safe price read from the mainnet feed at `mainnet_block`,
+    along with its `price_timestamp`.
+
+    May only be called by the relayer. Reverts unless the timestamp is newer than
+    the one of the stored price and the block is not older than the stored one.
+    """
+    assert msg.sender == self.relayer
+    assert price != 0 and price <= SAFE_PRICE_VALUE_MASK
+    assert price_timestamp <= SAFE_PRICE_TIMESTAMP_MASK and mainnet_block <= SAFE_PRICE_TIMESTAMP_MASK
+
+    packed: uint256 = self.safe_price_packed
+    assert price_timestamp > bitwise_and(shift(packed, -SAFE_PRICE_TIMESTAMP_SHIFT), SAFE_PRICE_TIMESTAMP_MASK), "timestamp is not newer"
+    assert mainnet_block >= shift(packed, -SAFE_PRICE_BLOCK_SHIFT), "block is older"
+
+    self.safe_price_packed = bitwise_or(
+        bitwise_or(shift(mainnet_block, SAFE_PRICE_BLOCK_SHIFT), shift(price_timestamp, SAFE_PRICE_TIMESTAMP_SHIFT)),
+        price
+    )
+    log SafePriceMirrored(price, price_timestamp, mainnet_block)
+
+
+@external
+def set_admin(admin: address):
+    """
+    @dev Updates the admin address.
+
+    May only be called by the current admin.
+    """
+    assert msg.sender == self.admin
+    self.admin = admin
+    log AdminChanged(admin)
+
+
+@external
+def set_relayer(relayer: address):
+    """
+    @dev Updates the address allowed to push the safe price.
+
+    May only be called by the admin.
+    """
+    assert msg.sender == self.admin
+    self.relayer = relayer
+    log RelayerChanged(relayer)
@@ -13,7 +13,7 @@ def __init__(_price: uint256):
 @view
 @external
 def get_dy(x: int128, y: int128, dx: uint256) -> uint256:
-    return self.price
+    return self.price * dx / 10**18
 
 
 @external
@@ -4,10 +4,11 @@
 
 admin: public(address)
 max_safe_price_difference: public(uint256)
-safe_price_value: public(uint256)
-safe_price_timestamp: public(uint256)
+legacy_safe_price_value: uint256
+legacy_safe_price_timestamp: uint256
 curve_pool_address: public(address)
 stable_swap_oracle_address: public(address)
+safe_price_packed: uint256
 
 const_price: public(uint256)
 
@@ -17,6 +18,18 @@ def perform_upgrade(const_price: uint256):
     self.const_price = const_price
 
 
+@view
+@external
+def safe_price_value() -> uint256:
+    return bitwise_and(self.safe_price_packed, 2**128 - 1)
+
+
+@view
+@external
+def safe_price_timestamp() -> uint256:
+    return shift(self.safe_price_packed, -128)
+
+
 @external
 def safe_price() -> (uint256, uint256):
     return (self.const_price, 42)
@@ -4,12 +4,18 @@
 
 interface PriceFeed:
     def fetch_safe_price(max_age: uint256) -> (uint256, uint256): nonpayable
+    def try_fetch_safe_price(max_age: uint256) -> (uint256, uint256, uint256): nonpayable
 
 
 event Test__PriceFetchResult:
     safe_price: uint256
     updated_at: uint256
 
+event Test__PriceTryFetchResult:
+    safe_price: uint256
+    updated_at: uint256
+    status: uint256
+
 
 price_feed: address
 
@@ -25,3 +31,12 @@ def fetch_safe_price(max_age: uint256):
     updated_at: uint256 = 0
     (safe_price, updated_at) = PriceFeed(self.price_feed).fetch_safe_price(max_age)
     log Test__PriceFetchResult(safe_price, updated_at)
+
+
+@external
+def try_fetch_safe_price(max_age: uint256):
+    safe_price: uint256 = 0
+    updated_at: uint256 = 0
+    status: uint256 = 0
+    (safe_price, updated_at, status) = PriceFeed(self.price_feed).try_fetch_safe_price(max_age)
+    log Test__PriceTryFetchResult(safe_price, updated_at, status)
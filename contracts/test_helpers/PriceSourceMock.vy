@@ -0,0 +1,41 @@
+# @version 0.2.12
+# @dev This is a test helper contract only, don't use it in production!
+
+
+price: public(uint256)
+# number of storage reads `get_price` performs before returning, to simulate an expensive source
+extra_reads: public(uint256)
+# makes `get_price` revert, to simulate a broken source
+reverts: public(bool)
+
+
+@external
+def __init__(_price: uint256):
+    self.price = _price
+
+
+@view
+@external
+def get_price() -> uint256:
+    assert not self.reverts, "price source reverts"
+    price: uint256 = self.price
+    for i in range(1000):
+        if i >= self.extra_reads:
+            break
+        price = self.price
+    return price
+
+
+@external
+def set_price(_price: uint256):
+    self.price = _price
+
+
+@external
+def set_extra_reads(_extra_reads: uint256):
+    self.extra_reads = _extra_reads
+
+
+@external
+def set_reverts(_reverts: bool):
+    self.reverts = _reverts
@@ -0,0 +1,76 @@
+# @version 0.2.12
+# @dev This is a test helper contract only, don't use it in production!
+
+
+interface PriceFeed:
+    def current_price() -> (uint256, bool): view
+    def snapshot_price() -> (uint256, bool): nonpayable
+    def update_safe_price() -> uint256: nonpayable
+    def set_max_safe_price_difference(max_safe_price_difference: uint256): nonpayable
+
+
+interface CurvePool:
+    def set_price(_price: uint256): nonpayable
+
+
+MAX_READS: constant(uint256) = 10
+
+
+event Test__PriceRead:
+    price: uint256
+    is_safe: bool
+    gas_used: uint256
+
+
+price_feed: address
+
+
+@external
+def __init__(price_feed: address):
+    self.price_feed = price_feed
+
+
+@internal
+def _read_price(snapshot: bool):
+    price: uint256 = 0
+    is_safe: bool = False
+    gas_before: uint256 = msg.gas
+    if snapshot:
+        (price, is_safe) = PriceFeed(self.price_feed).snapshot_price()
+    else:
+        (price, is_safe) = PriceFeed(self.price_feed).current_price()
+    log Test__PriceRead(price, is_safe, gas_before - msg.gas)
+
+
+@external
+def read_prices(count: uint256, snapshot: bool):
+    """
+    @dev Reads the current price `count` times in one transaction, with `snapshot_price()`
+    if `snapshot` is set and `current_price()` otherwise, logging the gas of each read.
+    """
+    for i in range(MAX_READS):
+        if i >= count:
+            break
+        self._read_price(snapshot)
+
+
+@external
+def update_and_read_price_after_change(curve_pool: address, new_price: uint256):
+    PriceFeed(self.price_feed).update_safe_price()
+    CurvePool(curve_pool).set_price(new_price)
+    self._read_price(True)
+
+
+@external
+def snapshot_and_read_price_after_change(curve_pool: address, new_price: uint256):
+    PriceFeed(self.price_feed).snapshot_price()
+    CurvePool(curve_pool).set_price(new_price)
+    self._read_price(False)
+    self._read_price(True)
+
+
+@external
+def snapshot_and_read_price_after_config_change(max_safe_price_difference: uint256):
+    PriceFeed(self.price_feed).snapshot_price()
+    PriceFeed(self.price_feed).set_max_safe_price_difference(max_safe_price_difference)
+    self._read_price(True)
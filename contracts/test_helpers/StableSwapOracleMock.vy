@@ -1,13 +1,17 @@
-# @version 0.2.12
+# @version 0.3.10
+# pragma evm-version istanbul
 # @dev This is a test helper contract only, don't use it in production!
+# @dev Compiled with 0.3.10 since 0.2.x doesn't allow a function named `timestamp`.
 
 
 price: public(uint256)
+timestamp: public(uint256)
 
 
 @external
 def __init__(_price: uint256):
     self.price = _price
+    self.timestamp = block.timestamp
 
 
 @view
@@ -19,3 +23,8 @@ def stethPrice() -> uint256:
 @external
 def set_price(_price: uint256):
     self.price = _price
+
+
+@external
+def set_timestamp(_timestamp: uint256):
+    self.timestamp = _timestamp
@@ -0,0 +1,105 @@
+# @version 0.2.12
+# @dev This is a test helper contract only, don't use it in production!
+# @dev A two-coin StableSwap pool with the settable state, implementing `get_dy`
+#      the same way the Curve stETH/ETH pool does. Mirrors utils/stableswap.py.
+
+
+N_COINS: constant(int128) = 2
+A_PRECISION: constant(uint256) = 100
+FEE_DENOMINATOR: constant(uint256) = 10 ** 10
+
+
+balances: public(uint256[N_COINS])
+# A * A_PRECISION, the value returned by `A_precise()` of the pool
+amp: public(uint256)
+fee: public(uint256)
+
+
+@external
+def __init__(_balances: uint256[N_COINS], _amp: uint256, _fee: uint256):
+    self.balances = _balances
+    self.amp = _amp
+    self.fee = _fee
+
+
+@pure
+@internal
+def get_D(xp: uint256[N_COINS], amp: uint256) -> uint256:
+    S: uint256 = 0
+    for _x in xp:
+        S += _x
+    if S == 0:
+        return 0
+
+    Dprev: uint256 = 0
+    D: uint256 = S
+    Ann: uint256 = amp * N_COINS
+    for _i in range(255):
+        D_P: uint256 = D
+        for _x in xp:
+            D_P = D_P * D / (_x * N_COINS + 1)
+        Dprev = D
+        D = (Ann * S / A_PRECISION + D_P * N_COINS) * D / ((Ann - A_PRECISION) * D / A_PRECISION + (N_COINS + 1) * D_P)
+        if D > Dprev:
+            if D - Dprev <= 1:
+                return D
+        else:
+            if Dprev - D <= 1:
+                return D
+    raise
+
+
+@view
+@internal
+def get_y(i: int128, j: int128, x: uint256, xp: uint256[N_COINS]) -> uint256:
+    assert i != j
+    assert j >= 0 and j < N_COINS
+    assert i >= 0 and i < N_COINS
+
+    amp: uint256 = self.amp
+    D: uint256 = self.get_D(xp, amp)
+    Ann: uint256 = amp * N_COINS
+    c: uint256 = D
+    S_: uint256 = 0
+    _x: uint256 = 0
+    for _i in range(N_COINS):
+        if _i == i:
+            _x = x
+        elif _i != j:
+            _x = xp[_i]
+        else:
+            continue
+        S_ += _x
+        c = c * D / (_x * N_COINS)
+    c = c * D * A_PRECISION / (Ann * N_COINS)
+    b: uint256 = S_ + D * A_PRECISION / Ann
+
+    y_prev: uint256 = 0
+    y: uint256 = D
+    for _i in range(255):
+        y_prev = y
+        y = (y*y + c) / (2 * y + b - D)
+        if y > y_prev:
+            if y - y_prev <= 1:
+                return y
+        else:
+            if y_prev - y <= 1:
+                return y
+    raise
+
+
+@view
+@external
+def get_dy(i: int128, j: int128, dx: uint256) -> uint256:
+    xp: uint256[N_COINS] = self.balances
+    x: uint256 = xp[i] + dx
+    y: uint256 = self.get_y(i, j, x, xp)
+    dy: uint256 = xp[j] - y - 1
+    return dy - self.fee * dy / FEE_DENOMINATOR
+
+
+@external
+def set_state(_balances: uint256[N_COINS], _amp: uint256, _fee: uint256):
+    self.balances = _balances
+    self.amp = _amp
+    self.fee = _fee
@@ -0,0 +1,19 @@
+from utils.config import get_env
+from utils.safety_backtest import load_csv, unsafe_fractions
+
+
+DEFAULT_THRESHOLDS = '50,100,200,300,400,500,750,1000'
+
+
+def main():
+    path = get_env('BACKTEST_PRICES_CSV', True)
+    thresholds = [
+        int(threshold)
+        for threshold in get_env('BACKTEST_THRESHOLDS', False, default=DEFAULT_THRESHOLDS).split(',')
+    ]
+
+    pool_prices, oracle_prices, _ = load_csv(path)
+    print(f'Rows: {len(pool_prices)}')
+    print('max_safe_price_difference  update reverts  not safe')
+    for threshold, (reverts, not_safe) in unsafe_fractions(pool_prices, oracle_prices, thresholds).items():
+        print(f'{threshold:>25}  {reverts:>14.4%}  {not_safe:>8.4%}')
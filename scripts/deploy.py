@@ -1,18 +1,55 @@
-from brownie import Contract
+import asyncio
+
+from brownie import Contract, network, web3
 from utils.config import get_deployer_account, get_is_live, get_env, prompt_bool
+from utils.deploy_manifest import (
+    Lockfile,
+    load_manifest,
+    default_lockfile_path,
+    deploy_networks,
+    implementation_key,
+    code_hash,
+    deployment_params,
+    format_record,
+)
 
 try:
-    from brownie import StEthPriceFeed, PriceFeedProxy
+    from brownie import StEthPriceFeed, StEthPriceFeedImmutable, PriceFeedProxy, PriceFeedProxyFactory
 except ImportError:
     print("You're probably running inside Brownie console. Please call:")
-    print("set_console_globals(StEthPriceFeed=StEthPriceFeed, PriceFeedProxy=PriceFeedProxy)")
+    print(
+        "set_console_globals(StEthPriceFeed=StEthPriceFeed, "
+        "StEthPriceFeedImmutable=StEthPriceFeedImmutable, PriceFeedProxy=PriceFeedProxy, "
+        "PriceFeedProxyFactory=PriceFeedProxyFactory)"
+    )
 
 
 def set_console_globals(**kwargs):
     global StEthPriceFeed
+    global StEthPriceFeedImmutable
     global PriceFeedProxy
+    global PriceFeedProxyFactory
     StEthPriceFeed = kwargs['StEthPriceFeed']
+    StEthPriceFeedImmutable = kwargs['StEthPriceFeedImmutable']
     PriceFeedProxy = kwargs['PriceFeedProxy']
+    PriceFeedProxyFactory = kwargs['PriceFeedProxyFactory']
+
+
+def deploy_implementation(stable_swap_oracle_address, curve_pool_address, immutable_sources, tx_params):
+    if immutable_sources:
+        return StEthPriceFeedImmutable.deploy(
+            stable_swap_oracle_address,
+            curve_pool_address,
+            tx_params,
+            publish_source=False
+        )
+    return StEthPriceFeed.deploy(tx_params, publish_source=False)
+
+
+def implementation_init_code(stable_swap_oracle_address, curve_pool_address, immutable_sources):
+    if immutable_sources:
+        return StEthPriceFeedImmutable.deploy.encode_input(stable_swap_oracle_address, curve_pool_address)
+    return StEthPriceFeed.bytecode
 
 
 def deploy_price_feed(
@@ -20,9 +57,31 @@ def deploy_price_feed(
     stable_swap_oracle_address,
     curve_pool_address,
     admin,
-    tx_params
+    tx_params,
+    immutable_sources=False,
+    implementation=None,
+    factory=None
 ):
-    price_feed_contract = StEthPriceFeed.deploy(tx_params, publish_source=False)
+    if factory is not None:
+        tx = factory.deployPriceFeed(
+            max_safe_price_difference,
+            stable_swap_oracle_address,
+            curve_pool_address,
+            admin,
+            tx_params
+        )
+        # the event rather than the return value, which needs the transaction to be traced
+        price_feed_address = tx.events['PriceFeedDeployed']['priceFeed']
+        return Contract.from_abi('StEthPriceFeed', price_feed_address, StEthPriceFeed.abi)
+
+    price_feed_contract = implementation
+    if price_feed_contract is None:
+        price_feed_contract = deploy_implementation(
+            stable_swap_oracle_address,
+            curve_pool_address,
+            immutable_sources,
+            tx_params
+        )
     proxy = PriceFeedProxy.deploy(
         price_feed_contract,
         max_safe_price_difference,
@@ -34,12 +93,41 @@ def deploy_price_feed(
     return Contract.from_abi('StEthPriceFeed', proxy.address, StEthPriceFeed.abi)
 
 
+def deploy_price_feed_factory(stable_swap_oracle_address, curve_pool_address, immutable_sources, tx_params):
+    price_feed_contract = deploy_implementation(
+        stable_swap_oracle_address,
+        curve_pool_address,
+        immutable_sources,
+        tx_params
+    )
+    return PriceFeedProxyFactory.deploy(price_feed_contract, tx_params)
+
+
+def upgrade_price_feed(price_feed_address, tx_params, immutable_sources=False):
+    price_feed = Contract.from_abi('StEthPriceFeed', price_feed_address, StEthPriceFeed.abi)
+    price_feed_contract = deploy_implementation(
+        price_feed.stable_swap_oracle_address(),
+        price_feed.curve_pool_address(),
+        immutable_sources,
+        tx_params
+    )
+    proxy = Contract.from_abi('PriceFeedProxy', price_feed_address, PriceFeedProxy.abi)
+    proxy.upgradeTo(
+        price_feed_contract,
+        price_feed_contract.finalize_upgrade_v2.encode_input(),
+        tx_params
+    )
+    return Contract.from_abi('StEthPriceFeed', price_feed_address, StEthPriceFeed.abi)
+
+
 def main():
     deployer = get_deployer_account(get_is_live())
     stable_swap_oracle_address = get_env('STABLE_SWAP_ORACLE_ADDRESS', True)
     curve_pool_address = get_env('CURVE_POOL_ADDRESS', True)
     max_safe_price_difference = get_env('MAX_SAFE_PRICE_DIFFERENCE', False, default=500)
     admin = get_env('ADMIN', False, default=deployer)
+    immutable_sources = get_env('IMMUTABLE_SOURCES', False, default='0') == '1'
+    factory_address = get_env('PRICE_FEED_FACTORY_ADDRESS', False)
 
     print(f'Deployer: {deployer}')
     print(f'Stable swap oracle address: {stable_swap_oracle_address}')
@@ -49,6 +137,11 @@ def main():
         f'({max_safe_price_difference / 100}%)'
     )
     print(f'Admin: {admin}')
+    print(f'Immutable price sources: {immutable_sources}')
+    factory = None
+    if factory_address is not None:
+        factory = Contract.from_abi('PriceFeedProxyFactory', factory_address, PriceFeedProxyFactory.abi)
+        print(f'Factory: {factory.address}, implementation: {factory.implementation()}')
     print('Proceed? [y/n]: ')
 
     if not prompt_bool():
@@ -60,5 +153,170 @@ def main():
         stable_swap_oracle_address,
         curve_pool_address,
         admin,
+        tx_params={'from': deployer},
+        immutable_sources=immutable_sources,
+        factory=factory
+    )
+
+
+def deploy_factory():
+    deployer = get_deployer_account(get_is_live())
+    immutable_sources = get_env('IMMUTABLE_SOURCES', False, default='0') == '1'
+    # only used by the immutable sources implementation
+    stable_swap_oracle_address = get_env('STABLE_SWAP_ORACLE_ADDRESS', immutable_sources)
+    curve_pool_address = get_env('CURVE_POOL_ADDRESS', immutable_sources)
+
+    print(f'Deployer: {deployer}')
+    print(f'Immutable price sources: {immutable_sources}')
+    if immutable_sources:
+        print(f'Stable swap oracle address: {stable_swap_oracle_address}')
+        print(f'Curve pool oracle address: {curve_pool_address}')
+    print('Proceed? [y/n]: ')
+
+    if not prompt_bool():
+        print('Aborting')
+        return
+
+    deploy_price_feed_factory(
+        stable_swap_oracle_address,
+        curve_pool_address,
+        immutable_sources,
         tx_params={'from': deployer}
     )
+
+
+def upgrade():
+    deployer = get_deployer_account(get_is_live())
+    price_feed_address = get_env('PRICE_FEED_ADDRESS', True)
+    immutable_sources = get_env('IMMUTABLE_SOURCES', False, default='0') == '1'
+
+    print(f'Deployer: {deployer}')
+    print(f'Price feed proxy address: {price_feed_address}')
+    print(f'Immutable price sources: {immutable_sources}')
+    print('Proceed? [y/n]: ')
+
+    if not prompt_bool():
+        print('Aborting')
+        return
+
+    upgrade_price_feed(
+        price_feed_address,
+        tx_params={'from': deployer},
+        immutable_sources=immutable_sources
+    )
+
+
+def has_code(address, expected_code_hash):
+    return code_hash(web3.eth.get_code(address)) == expected_code_hash
+
+
+def deploy_from_manifest(deployments, lock_section, tx_params, emit):
+    """
+    Deploys the parsed manifest `deployments` of the active network, skipping those in
+    `lock_section` (see `utils.deploy_manifest.Lockfile.network`) and reusing the locked
+    implementations with the same init code. Every contract deployed is passed to `emit`
+    as a lockfile record. Returns the deployed feeds by name.
+    """
+    implementations = lock_section['implementations']
+    locked_deployments = lock_section['deployments']
+    price_feeds = {}
+
+    for deployment in deployments:
+        name = deployment['name']
+        params = deployment_params(deployment, tx_params['from'])
+
+        locked = locked_deployments.get(name)
+        if locked is not None and web3.eth.get_code(locked['proxy']):
+            if locked['params'] != params:
+                raise ValueError(
+                    f'{name}: the parameters differ from the deployed ones, '
+                    f'rename the deployment or remove it from the lockfile to redeploy'
+                )
+            print(f'{name}: already deployed at {locked["proxy"]}')
+            price_feeds[name] = Contract.from_abi('StEthPriceFeed', locked['proxy'], StEthPriceFeed.abi)
+            continue
+
+        key = implementation_key(implementation_init_code(
+            params['stable_swap_oracle'],
+            params['curve_pool'],
+            params['immutable_sources']
+        ))
+        implementation = implementations.get(key)
+        if implementation is not None and has_code(implementation['address'], implementation['code_hash']):
+            implementation_address = implementation['address']
+            print(f'{name}: reusing the implementation at {implementation_address}')
+        else:
+            contract = deploy_implementation(
+                params['stable_swap_oracle'],
+                params['curve_pool'],
+                params['immutable_sources'],
+                tx_params
+            )
+            implementation_address = contract.address
+            implementations[key] = {
+                'contract': contract._name,
+                'address': implementation_address,
+                'tx_hash': contract.tx.txid,
+                'block_number': contract.tx.block_number,
+                'code_hash': code_hash(web3.eth.get_code(implementation_address)),
+            }
+            emit({'type': 'implementation', 'key': key, **implementations[key]})
+
+        proxy = PriceFeedProxy.deploy(
+            implementation_address,
+            params['max_safe_price_difference'],
+            params['stable_swap_oracle'],
+            params['curve_pool'],
+            params['admin'],
+            tx_params
+        )
+        locked_deployments[name] = {
+            'params': params,
+            'implementation': implementation_address,
+            'proxy': proxy.address,
+            'tx_hash': proxy.tx.txid,
+            'block_number': proxy.tx.block_number,
+        }
+        emit({'type': 'deployment', 'name': name, **locked_deployments[name]})
+        price_feeds[name] = Contract.from_abi('StEthPriceFeed', proxy.address, StEthPriceFeed.abi)
+
+    return price_feeds
+
+
+def deploy_manifest_network():
+    # run by `deploy_manifest` for every network, reports the deployed contracts on stdout
+    manifest_path = get_env('DEPLOY_MANIFEST', True)
+    lockfile_path = get_env('DEPLOY_LOCKFILE', False, default=default_lockfile_path(manifest_path))
+    network_name = network.show_active()
+    manifest = load_manifest(manifest_path)
+    if network_name not in manifest:
+        raise EnvironmentError(f'The manifest has no {network_name} network')
+
+    deployer = get_deployer_account(get_is_live())
+    print(f'Deployer: {deployer}')
+    deploy_from_manifest(
+        manifest[network_name]['deployments'],
+        Lockfile(lockfile_path).network(network_name),
+        {'from': deployer},
+        lambda record: print(format_record(record), flush=True)
+    )
+
+
+def deploy_manifest():
+    manifest_path = get_env('DEPLOY_MANIFEST', True)
+    lockfile_path = get_env('DEPLOY_LOCKFILE', False, default=default_lockfile_path(manifest_path))
+    max_parallel = int(get_env('DEPLOY_MAX_PARALLEL', False, default=4))
+    manifest = load_manifest(manifest_path)
+    networks = get_env('DEPLOY_NETWORKS', False)
+    if networks is not None:
+        manifest = {name: manifest[name] for name in networks.split(',')}
+
+    print(f'Manifest: {manifest_path}')
+    print(f'Lockfile: {lockfile_path}')
+    print(f'Networks: {", ".join(manifest)}')
+
+    exit_codes = asyncio.run(deploy_networks(manifest, Lockfile(lockfile_path), max_parallel))
+    failed = [name for name, exit_code in exit_codes.items() if exit_code != 0]
+    if failed:
+        raise RuntimeError(f'Deployment failed on {", ".join(failed)}, run again to resume')
+    print('All networks deployed')
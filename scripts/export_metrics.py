@@ -0,0 +1,28 @@
+import asyncio
+
+from utils.config import get_env
+from utils.feed_exporter import FeedExporter
+
+
+def main():
+    rpc_url = get_env('EXPORTER_RPC_URL', True)
+    price_feed_addresses = [address.strip() for address in get_env('PRICE_FEED_ADDRESSES', True).split(',')]
+    port = int(get_env('EXPORTER_PORT', False, default=9108))
+    concurrency = int(get_env('EXPORTER_CONCURRENCY', False, default=4))
+    min_interval = float(get_env('EXPORTER_MIN_POLL_INTERVAL', False, default=5))
+    max_interval = float(get_env('EXPORTER_MAX_POLL_INTERVAL', False, default=60))
+
+    exporter = FeedExporter(
+        rpc_url,
+        price_feed_addresses,
+        concurrency=concurrency,
+        min_interval=min_interval,
+        max_interval=max_interval
+    )
+    exporter.serve(port)
+
+    print(f'Price feeds: {", ".join(client.address for client in exporter.clients)}')
+    print(f'Poll interval: from {min_interval}s to {max_interval}s, {concurrency} polls at a time')
+    print(f'Metrics: http://0.0.0.0:{port}/metrics')
+
+    asyncio.run(exporter.run())
@@ -0,0 +1,29 @@
+from brownie import web3
+from utils.config import get_env
+from utils.event_indexer import EventIndexer
+
+
+def main():
+    price_feed_address = get_env('PRICE_FEED_ADDRESS', True)
+    db_path = get_env('INDEXER_DB_PATH', False, default='price_feed_events.sqlite')
+    start_block = int(get_env('INDEXER_START_BLOCK', False, default=0))
+    confirmations = int(get_env('INDEXER_CONFIRMATIONS', False, default=12))
+
+    indexer = EventIndexer(
+        web3.provider.endpoint_uri,
+        price_feed_address,
+        db_path,
+        start_block=start_block,
+        confirmations=confirmations
+    )
+    try:
+        last_block = indexer.last_indexed_block()
+        print(f'Price feed: {indexer.address}')
+        print(f'Database: {db_path}, indexed up to block {last_block if last_block is not None else "-"}')
+        stored = indexer.run()
+        print(f'Stored {stored} events, indexed up to block {indexer.last_indexed_block()}')
+        latest = indexer.safe_price_at_block(indexer.last_indexed_block() or 0)
+        if latest is not None:
+            print(f'Latest safe price: {latest[0]} at {latest[1]}')
+    finally:
+        indexer.close()
@@ -0,0 +1,212 @@
+import asyncio
+
+from brownie import Contract, web3
+from utils.config import get_deployer_account, get_is_live, get_env
+from utils.price_math import MAX_SAFE_PRICE, percentage_diff, has_changed_unsafely, capped_safe_price
+from utils.feed_exporter import KeeperMetrics
+
+try:
+    from brownie import StEthPriceFeed, PriceFeedBatchUpdater
+except ImportError:
+    print("You're probably running inside Brownie console. Please call:")
+    print("set_console_globals(StEthPriceFeed=StEthPriceFeed, PriceFeedBatchUpdater=PriceFeedBatchUpdater)")
+
+
+def set_console_globals(**kwargs):
+    global StEthPriceFeed
+    global PriceFeedBatchUpdater
+    StEthPriceFeed = kwargs['StEthPriceFeed']
+    PriceFeedBatchUpdater = kwargs['PriceFeedBatchUpdater']
+
+
+# update reasons
+REASON_NO_PRICE = 'no cached price'
+REASON_STALE = 'cached price is stale'
+REASON_DRIFT = 'price has drifted'
+
+FETCH_STATUS_UPDATED = 1
+
+
+def update_reason(feed_state, now, max_age, max_drift, min_safe_price_change=0):
+    """
+    Returns the reason to call `update_safe_price` given the result of `feed_state()`,
+    or None if the update is either not needed or would revert.
+
+    `max_age` is in seconds, `max_drift` and the feed's `min_safe_price_change` are in the
+    units of `max_safe_price_difference` (10000 equals to 100%). A drift below
+    `min_safe_price_change` is no reason to update: the feed would keep the cached price
+    and only refresh its timestamp.
+    """
+    (
+        safe_price,
+        safe_price_timestamp,
+        pool_price,
+        is_safe,
+        oracle_price,
+        max_safe_price_difference,
+        *_
+    ) = feed_state
+
+    # `is_safe` is also false for prices above 1, which `update_safe_price` accepts and caps,
+    # unless the anchor price is stale, see `Keeper.check`
+    if not is_safe and (
+        pool_price <= MAX_SAFE_PRICE
+        or has_changed_unsafely(pool_price, oracle_price, max_safe_price_difference)
+    ):
+        return None
+
+    if safe_price_timestamp == 0:
+        return REASON_NO_PRICE
+    if now - safe_price_timestamp > max_age:
+        return REASON_STALE
+    drift_threshold = max(max_drift, min_safe_price_change)
+    if safe_price == 0 or percentage_diff(capped_safe_price(pool_price), safe_price) >= drift_threshold:
+        return REASON_DRIFT
+    return None
+
+
+class Keeper:
+    """
+    Updates the feeds that need it. With `batch_updater` set, all the updates of a poll
+    are sent in one `PriceFeedBatchUpdater.updateSafePrices` transaction, and the results
+    of the updated feeds are that transaction. With `metrics` set, a
+    `utils.feed_exporter.KeeperMetrics`, the gas used by the transactions is observed.
+    """
+
+    def __init__(self, price_feeds, account, max_age, max_drift, poll_interval, batch_updater=None, metrics=None):
+        self.price_feeds = price_feeds
+        self.account = account
+        self.max_age = max_age
+        self.max_drift = max_drift
+        self.poll_interval = poll_interval
+        self.batch_updater = batch_updater
+        self.metrics = metrics
+        # transactions share the account nonce so they're sent one at a time
+        self._tx_lock = asyncio.Lock()
+
+    async def check(self, price_feed):
+        feed_state = await asyncio.to_thread(price_feed.feed_state)
+        min_safe_price_change = await asyncio.to_thread(price_feed.min_safe_price_change)
+        latest_block = await asyncio.to_thread(web3.eth.get_block, 'latest')
+        reason = update_reason(
+            feed_state,
+            latest_block['timestamp'],
+            self.max_age,
+            self.max_drift,
+            min_safe_price_change
+        )
+        if reason is None:
+            return None
+        # `feed_state()` doesn't tell a stale anchor from a price above 1, so the update is
+        # dry-run before sending it to make sure it wouldn't revert
+        _, _, status = await asyncio.to_thread(
+            price_feed.try_fetch_safe_price.call,
+            0,
+            {'from': self.account}
+        )
+        return reason if status == FETCH_STATUS_UPDATED else None
+
+    async def poll(self, price_feed):
+        reason = await self.check(price_feed)
+        if reason is None:
+            return None
+
+        async with self._tx_lock:
+            print(f'{price_feed.address}: updating the safe price, {reason}')
+            tx = await asyncio.to_thread(
+                price_feed.update_safe_price,
+                {'from': self.account, 'required_confs': 1}
+            )
+        if self.metrics is not None:
+            self.metrics.observe_tx(tx)
+        return tx
+
+    async def poll_batch(self):
+        reasons = await asyncio.gather(
+            *[self.check(price_feed) for price_feed in self.price_feeds],
+            return_exceptions=True
+        )
+        to_update = []
+        for price_feed, reason in zip(self.price_feeds, reasons):
+            if reason is not None and not isinstance(reason, Exception):
+                print(f'{price_feed.address}: updating the safe price, {reason}')
+                to_update.append(price_feed)
+        tx = None
+        if to_update:
+            async with self._tx_lock:
+                tx = await asyncio.to_thread(
+                    self.batch_updater.updateSafePrices,
+                    [price_feed.address for price_feed in to_update],
+                    {'from': self.account, 'required_confs': 1}
+                )
+            if self.metrics is not None:
+                self.metrics.observe_tx(tx, batch=True)
+            # feeds whose price has become unsafe since the check are skipped by the updater
+            failed = tx.events['SafePriceFetchFailed'] if 'SafePriceFetchFailed' in tx.events else []
+            for event in failed:
+                print(f'{event["priceFeed"]}: update failed, {event["reason"] or "no reason"}')
+        return [
+            reason if isinstance(reason, Exception) else (tx if price_feed in to_update else None)
+            for price_feed, reason in zip(self.price_feeds, reasons)
+        ]
+
+    async def poll_all(self):
+        if self.batch_updater is not None:
+            results = await self.poll_batch()
+        else:
+            results = await asyncio.gather(
+                *[self.poll(price_feed) for price_feed in self.price_feeds],
+                return_exceptions=True
+            )
+        for price_feed, result in zip(self.price_feeds, results):
+            if isinstance(result, Exception):
+                print(f'{price_feed.address}: {result!r}')
+        return results
+
+    async def run(self, iterations=None):
+        iteration = 0
+        while iterations is None or iteration < iterations:
+            await self.poll_all()
+            iteration += 1
+            if iterations is None or iteration < iterations:
+                await asyncio.sleep(self.poll_interval)
+
+
+def main():
+    account = get_deployer_account(get_is_live())
+    price_feed_addresses = get_env('PRICE_FEED_ADDRESSES', True).split(',')
+    max_age = int(get_env('KEEPER_MAX_AGE', False, default=60 * 60))
+    max_drift = int(get_env('KEEPER_MAX_DRIFT', False, default=50))
+    poll_interval = float(get_env('KEEPER_POLL_INTERVAL', False, default=60))
+    batch_updater_address = get_env('BATCH_UPDATER_ADDRESS', False)
+    metrics_port = get_env('KEEPER_METRICS_PORT', False)
+
+    price_feeds = [
+        Contract.from_abi('StEthPriceFeed', address.strip(), StEthPriceFeed.abi)
+        for address in price_feed_addresses
+    ]
+
+    print(f'Keeper account: {account}')
+    print(f'Price feeds: {", ".join(feed.address for feed in price_feeds)}')
+    print(f'Max cached price age: {max_age}s')
+    print(f'Max price drift: {max_drift} ({max_drift / 100}%)')
+
+    batch_updater = None
+    if batch_updater_address is not None:
+        batch_updater = Contract.from_abi('PriceFeedBatchUpdater', batch_updater_address, PriceFeedBatchUpdater.abi)
+        print(f'Batch updater: {batch_updater.address}')
+
+    metrics = None
+    if metrics_port is not None:
+        metrics = KeeperMetrics()
+        metrics.serve(int(metrics_port))
+        print(f'Metrics: http://0.0.0.0:{metrics_port}/metrics')
+
+    keeper = Keeper(price_feeds, account, max_age, max_drift, poll_interval, batch_updater, metrics)
+    asyncio.run(keeper.run())
+
+
+def deploy_batch_updater():
+    deployer = get_deployer_account(get_is_live())
+    print(f'Deployer: {deployer}')
+    PriceFeedBatchUpdater.deploy({'from': deployer})
@@ -0,0 +1,119 @@
+from brownie import web3, Contract
+from utils.config import get_env, get_deployer_account, get_is_live, prompt_bool
+from utils.gas_profile import profile, write_profile, OP_CLASSES
+
+import scripts.deploy
+
+try:
+    from brownie import StEthPriceFeed, PriceFeedProxy, CurvePoolMock, StableSwapOracleMock
+except ImportError:
+    print("You're probably running inside Brownie console. Please call:")
+    print(
+        "set_console_globals(StEthPriceFeed=StEthPriceFeed, PriceFeedProxy=PriceFeedProxy, "
+        "CurvePoolMock=CurvePoolMock, StableSwapOracleMock=StableSwapOracleMock)"
+    )
+
+
+def set_console_globals(**kwargs):
+    global StEthPriceFeed
+    global PriceFeedProxy
+    global CurvePoolMock
+    global StableSwapOracleMock
+    StEthPriceFeed = kwargs['StEthPriceFeed']
+    PriceFeedProxy = kwargs['PriceFeedProxy']
+    CurvePoolMock = kwargs['CurvePoolMock']
+    StableSwapOracleMock = kwargs['StableSwapOracleMock']
+
+
+# calls that take `max_age`, the rest take no arguments
+MAX_AGE_CALLS = ('fetch_safe_price', 'try_fetch_safe_price')
+# views are sent as transactions to get traced
+VIEW_CALLS = ('current_price', 'full_price_info', 'feed_state')
+PROFILED_CALLS = MAX_AGE_CALLS + ('update_safe_price',) + VIEW_CALLS
+
+
+def trace_transaction(tx_hash):
+    response = web3.provider.make_request(
+        'debug_traceTransaction',
+        [tx_hash, {'disableStorage': True, 'disableMemory': True}]
+    )
+    if 'error' in response:
+        raise ValueError(f'debug_traceTransaction: {response["error"]}')
+    return response['result']['structLogs']
+
+
+def feed_names(price_feed):
+    proxy = Contract.from_abi('PriceFeedProxy', price_feed.address, PriceFeedProxy.abi)
+    return {
+        price_feed.address: 'PriceFeedProxy',
+        proxy.implementation(): 'StEthPriceFeed',
+        price_feed.curve_pool_address(): 'CurvePool',
+        price_feed.stable_swap_oracle_address(): 'StableSwapStateOracle',
+    }
+
+
+def profile_call(price_feed, name, max_age, tx_params):
+    """
+    Sends the call to the feed and returns the profile of the transaction.
+    """
+    if name not in PROFILED_CALLS:
+        raise ValueError(f'unknown call {name}, expected one of {", ".join(PROFILED_CALLS)}')
+    fn = getattr(price_feed, name)
+    args = (max_age,) if name in MAX_AGE_CALLS else ()
+    tx = fn.transact(*args, tx_params) if name in VIEW_CALLS else fn(*args, tx_params)
+    return profile(trace_transaction(tx.txid), price_feed.address, tx.gas_used, feed_names(price_feed))
+
+
+def deploy_mocked_price_feed(tx_params):
+    curve_pool = CurvePoolMock.deploy(98 * 10**16, tx_params)
+    stable_swap_oracle = StableSwapOracleMock.deploy(10**18, tx_params)
+    price_feed = scripts.deploy.deploy_price_feed(
+        max_safe_price_difference=500,
+        stable_swap_oracle_address=stable_swap_oracle,
+        curve_pool_address=curve_pool,
+        admin=tx_params['from'],
+        tx_params=tx_params
+    )
+    # so that the profiled call overwrites a non-zero slot, as it does on mainnet
+    price_feed.update_safe_price(tx_params)
+    curve_pool.set_price(97 * 10**16, tx_params)
+    return price_feed
+
+
+def main():
+    is_live = get_is_live()
+    tx_params = {'from': get_deployer_account(is_live)}
+    name = get_env('PROFILE_CALL', False, default='fetch_safe_price')
+    max_age = int(get_env('PROFILE_MAX_AGE', False, default=0))
+    output = get_env('PROFILE_OUTPUT', False, default='gas_profile')
+    price_feed_address = get_env('PRICE_FEED_ADDRESS', False)
+
+    if price_feed_address is None:
+        if is_live:
+            raise EnvironmentError('Please set PRICE_FEED_ADDRESS, mocks are only deployed on the development network')
+        price_feed = deploy_mocked_price_feed(tx_params)
+    else:
+        price_feed = Contract.from_abi('StEthPriceFeed', price_feed_address, StEthPriceFeed.abi)
+
+    if is_live:
+        # the profiled call is sent as a real transaction, paid by the deployer
+        print(f'Deployer: {tx_params["from"]}')
+        print(f'Price feed address: {price_feed.address}')
+        print(f'Call: {name}')
+        print('Proceed? [y/n]: ')
+
+        if not prompt_bool():
+            print('Aborting')
+            return
+
+    result = profile_call(price_feed, name, max_age, tx_params)
+    write_profile(result, f'{output}.json', f'{output}.folded')
+
+    print(f'{name}: {result["gas_used"]} gas, {result["intrinsic_gas_less_refunds"]} intrinsic less refunds')
+    print(f'{"frame":<80} {"total":>8} ' + ' '.join(f'{c:>7}' for c in OP_CLASSES))
+    for frame in result['frames']:
+        print(
+            f'{frame["path"]:<80} {frame["gas"]:>8} '
+            + ' '.join(f'{frame["by_class"][c]:>7}' for c in OP_CLASSES)
+        )
+    print(f'Written {output}.json and {output}.folded')
@@ -0,0 +1,64 @@
+from brownie import web3
+from web3.middleware import construct_sign_and_send_raw_middleware
+
+from utils.config import get_deployer_account, get_is_live, get_env, prompt_bool
+from utils.mirror_relayer import MirrorRelayer
+
+try:
+    from brownie import StEthPriceMirror
+except ImportError:
+    print("You're probably running inside Brownie console. Please call:")
+    print("set_console_globals(StEthPriceMirror=StEthPriceMirror)")
+
+
+def set_console_globals(**kwargs):
+    global StEthPriceMirror
+    StEthPriceMirror = kwargs['StEthPriceMirror']
+
+
+def deploy_mirror(admin, relayer, tx_params):
+    return StEthPriceMirror.deploy(admin, relayer, tx_params)
+
+
+def deploy():
+    deployer = get_deployer_account(get_is_live())
+    admin = get_env('ADMIN', False, default=deployer)
+    relayer = get_env('MIRROR_RELAYER', False, default=deployer)
+
+    print(f'Deployer: {deployer}')
+    print(f'Admin: {admin}')
+    print(f'Relayer: {relayer}')
+    print('Proceed? [y/n]: ')
+
+    if not prompt_bool():
+        print('Aborting')
+        return
+
+    deploy_mirror(admin, relayer, {'from': deployer})
+
+
+def main():
+    # the destination chain is the brownie network, the source one is read over `SOURCE_RPC_URL`
+    is_live = get_is_live()
+    sender = get_deployer_account(is_live)
+    if is_live:
+        web3.middleware_onion.add(construct_sign_and_send_raw_middleware(sender.private_key))
+
+    relayer = MirrorRelayer(
+        get_env('SOURCE_RPC_URL', True),
+        get_env('PRICE_FEED_ADDRESS', True),
+        web3,
+        get_env('MIRROR_ADDRESS', True),
+        sender.address,
+        start_block=int(get_env('MIRROR_START_BLOCK', False, default=0)),
+        confirmations=int(get_env('MIRROR_CONFIRMATIONS', False, default=12)),
+        max_block_range=int(get_env('MIRROR_MAX_BLOCK_RANGE', False, default=10_000))
+    )
+    poll_interval = float(get_env('MIRROR_POLL_INTERVAL', False, default=60))
+
+    print(f'Relayer account: {sender}')
+    print(f'Price feed: {relayer.price_feed_address} at {relayer.source_rpc_url}')
+    print(f'Mirror: {relayer.mirror.address}')
+    print(f'Mirrored price: {relayer.mirrored_update()}')
+
+    relayer.run(poll_interval)
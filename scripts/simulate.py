@@ -0,0 +1,72 @@
+from utils.config import get_env, get_deployer_account, get_is_live
+from utils.price_math import has_changed_unsafely
+from utils.stableswap import load_snapshots, replay_snapshots
+
+try:
+    from brownie import StEthPriceFeed, StableSwapPoolMock, StableSwapOracleMock
+except ImportError:
+    print("You're probably running inside Brownie console. Please call:")
+    print("set_console_globals(StEthPriceFeed=StEthPriceFeed, StableSwapPoolMock=StableSwapPoolMock, StableSwapOracleMock=StableSwapOracleMock)")
+
+
+def set_console_globals(**kwargs):
+    global StEthPriceFeed
+    global StableSwapPoolMock
+    global StableSwapOracleMock
+    StEthPriceFeed = kwargs['StEthPriceFeed']
+    StableSwapPoolMock = kwargs['StableSwapPoolMock']
+    StableSwapOracleMock = kwargs['StableSwapOracleMock']
+
+
+def replay_on_chain(snapshots, max_safe_price_difference, tx_params):
+    """
+    Deploys the feed reading a StableSwapPoolMock and calls `update_safe_price` at every
+    snapshot where it wouldn't revert. Returns `(pool_price, is_safe, safe_price)` tuples,
+    one per snapshot.
+    """
+    first = snapshots[0]
+    pool = StableSwapPoolMock.deploy(first.balances, first.amp, first.fee, tx_params)
+    oracle = StableSwapOracleMock.deploy(first.oracle_price, tx_params)
+    price_feed = StEthPriceFeed.deploy(tx_params)
+    price_feed.initialize(max_safe_price_difference, oracle, pool, tx_params['from'], tx_params)
+
+    result = []
+    for snapshot in snapshots:
+        pool.set_state(snapshot.balances, snapshot.amp, snapshot.fee, tx_params)
+        oracle.set_price(snapshot.oracle_price, tx_params)
+        pool_price, is_safe, oracle_price = price_feed.full_price_info()
+        if not has_changed_unsafely(pool_price, oracle_price, max_safe_price_difference):
+            price_feed.update_safe_price(tx_params)
+        result.append((pool_price, is_safe, price_feed.safe_price_value()))
+    return result
+
+
+def main():
+    snapshots = load_snapshots(get_env('SIMULATION_SNAPSHOTS_CSV', True))
+    max_safe_price_difference = int(get_env('MAX_SAFE_PRICE_DIFFERENCE', False, default=500))
+    # replaying on chain is only meant to cross-check the model on a subset of the snapshots
+    on_chain_count = int(get_env('SIMULATION_ON_CHAIN_COUNT', False, default=0))
+
+    simulated = replay_snapshots(snapshots, max_safe_price_difference)
+    unsafe = sum(1 for _, is_safe, _, _ in simulated if not is_safe)
+    never_updated = sum(1 for _, _, _, timestamp in simulated if timestamp == 0)
+    print(f'Snapshots: {len(snapshots)}')
+    print(f'max_safe_price_difference: {max_safe_price_difference}')
+    print(f'Not safe: {unsafe} ({unsafe / max(len(snapshots), 1):.4%})')
+    print(f'Before the first safe price: {never_updated}')
+
+    if on_chain_count == 0:
+        return
+
+    if get_is_live():
+        raise EnvironmentError('On-chain replay deploys mocks, please use the development network')
+
+    tx_params = {'from': get_deployer_account(False)}
+    on_chain = replay_on_chain(snapshots[:on_chain_count], max_safe_price_difference, tx_params)
+    mismatches = [
+        i for i, (expected, actual) in enumerate(zip(simulated, on_chain))
+        if expected[:3] != actual
+    ]
+    print(f'Replayed on chain: {len(on_chain)}, mismatches: {len(mismatches)}')
+    for i in mismatches[:10]:
+        print(f'  snapshot {i}: expected {simulated[i][:3]}, got {on_chain[i]}')
@@ -1,7 +1,24 @@
+import json
+import os
+import time
+
 import pytest
 import scripts.deploy
 
 
+# the timing report is printed with `--timing-report` or when this is set to a path,
+# to compare the durations with the ones stored there by the previous run
+TIMING_REPORT_PATH = os.environ.get('TEST_TIMING_REPORT')
+TIMING_REPORT_SLOWEST = 10
+
+DEFAULT_MAX_SAFE_PRICE_DIFFERENCE = 500
+
+
+# The contracts shared by the tests of a module are deployed by the module-scoped fixtures
+# below. Brownie takes the `fn_isolation` snapshot after those have run and reverts to it
+# after every test, so each test starts from the same freshly deployed state. Deploying
+# once per session isn't possible: `module_isolation`, required by `pytest-xdist`, resets
+# the chain for every module.
 @pytest.fixture(scope='function', autouse=True)
 def shared_setup(fn_isolation):
     pass
@@ -12,29 +29,60 @@ def deployer(accounts):
     return accounts[0]
 
 
+@pytest.fixture(scope='module')
+def stable_swap_oracle(deployer, StableSwapOracleMock):
+    return StableSwapOracleMock.deploy(1e18, {'from': deployer})
+
+
+@pytest.fixture(scope='module')
+def curve_pool(deployer, CurvePoolMock):
+    return CurvePoolMock.deploy(1e18, {'from': deployer})
+
+
+@pytest.fixture(scope='module')
+def price_feed_implementation(deployer, StEthPriceFeed):
+    return StEthPriceFeed.deploy({'from': deployer})
+
+
+@pytest.fixture(scope='module')
+def default_price_feed(deployer, stable_swap_oracle, curve_pool, price_feed_implementation):
+    return scripts.deploy.deploy_price_feed(
+        max_safe_price_difference=DEFAULT_MAX_SAFE_PRICE_DIFFERENCE,
+        stable_swap_oracle_address=stable_swap_oracle,
+        curve_pool_address=curve_pool,
+        admin=deployer,
+        tx_params={'from': deployer},
+        implementation=price_feed_implementation
+    )
+
+
 @pytest.fixture(scope='function')
-def deploy_price_feed(deployer, stable_swap_oracle, curve_pool):
-    def deploy(max_safe_price_difference, deployer = deployer, admin = deployer):
+def deploy_price_feed(deployer, stable_swap_oracle, curve_pool, price_feed_implementation, default_price_feed):
+    default_deployer = deployer
+    # the first feed with the default arguments is the module one, the next ones are deployed
+    unused_default_feeds = [default_price_feed]
+
+    def deploy(max_safe_price_difference, deployer = deployer, admin = deployer, immutable_sources = False):
+        is_default = (
+            max_safe_price_difference == DEFAULT_MAX_SAFE_PRICE_DIFFERENCE
+            and deployer == default_deployer
+            and admin == default_deployer
+            and not immutable_sources
+        )
+        if is_default and unused_default_feeds:
+            return unused_default_feeds.pop()
         return scripts.deploy.deploy_price_feed(
             max_safe_price_difference=max_safe_price_difference,
             stable_swap_oracle_address=stable_swap_oracle,
             curve_pool_address=curve_pool,
             admin=admin,
-            tx_params={'from': deployer}
+            tx_params={'from': deployer},
+            immutable_sources=immutable_sources,
+            implementation=None if immutable_sources else price_feed_implementation
         )
     return deploy
 
 
-@pytest.fixture(scope='function')
-def stable_swap_oracle(deployer, StableSwapOracleMock):
-    return StableSwapOracleMock.deploy(1e18, {'from': deployer})
-
-
-@pytest.fixture(scope='function')
-def curve_pool(deployer, CurvePoolMock):
-    return CurvePoolMock.deploy(1e18, {'from': deployer})
-
-
 @pytest.fixture(scope='module')
 def stranger(accounts):
     return accounts[9]
@@ -64,3 +112,74 @@ class Helpers:
 @pytest.fixture(scope='module')
 def helpers():
     return Helpers
+
+
+class TimingReport:
+    def __init__(self):
+        # (nodeid, phase) -> seconds, the phases being setup, call and teardown
+        self.durations = {}
+        self.started_at = time.monotonic()
+
+    def add(self, report):
+        self.durations[(report.nodeid, report.when)] = report.duration
+
+    def totals(self):
+        totals = {'setup': 0.0, 'call': 0.0, 'teardown': 0.0}
+        for (_, phase), duration in self.durations.items():
+            totals[phase] += duration
+        totals['wall'] = time.monotonic() - self.started_at
+        return totals
+
+    def slowest(self, phase, count):
+        durations = [(duration, nodeid) for (nodeid, when), duration in self.durations.items() if when == phase]
+        return sorted(durations, reverse=True)[:count]
+
+
+timing_report = None
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--timing-report',
+        action='store_true',
+        help='print the total setup, call and teardown time and the slowest setups'
+    )
+
+
+def pytest_configure(config):
+    global timing_report
+    if config.getoption('--timing-report') or TIMING_REPORT_PATH is not None:
+        timing_report = TimingReport()
+
+
+def pytest_runtest_logreport(report):
+    if timing_report is not None:
+        timing_report.add(report)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if timing_report is None or not timing_report.durations:
+        return
+    totals = timing_report.totals()
+    tests_count = len({nodeid for nodeid, _ in timing_report.durations})
+
+    previous = None
+    if TIMING_REPORT_PATH is not None and os.path.exists(TIMING_REPORT_PATH):
+        with open(TIMING_REPORT_PATH) as f:
+            previous = json.load(f)
+
+    terminalreporter.section('timing report')
+    for phase, duration in totals.items():
+        line = f'{phase:>8}: {duration:8.2f}s'
+        if previous is not None and phase in previous['totals']:
+            line += f'  (before: {previous["totals"][phase]:8.2f}s)'
+        terminalreporter.write_line(line)
+    terminalreporter.write_line(f'{tests_count} tests, {totals["setup"] / tests_count:.3f}s setup per test')
+    terminalreporter.write_line('slowest setups:')
+    for duration, nodeid in timing_report.slowest('setup', TIMING_REPORT_SLOWEST):
+        terminalreporter.write_line(f'{duration:8.2f}s {nodeid}')
+
+    if TIMING_REPORT_PATH is not None:
+        with open(TIMING_REPORT_PATH, 'w') as f:
+            json.dump({'tests': tests_count, 'totals': totals}, f, indent=2)
+            f.write('\n')
@@ -0,0 +1,106 @@
+import pytest
+from brownie import chain, reverts
+
+
+ONE_HOUR = 60 * 60
+ONE_WEEK = 7 * 24 * ONE_HOUR
+
+FETCH_STATUS_ANCHOR_STALE = 3
+
+
+@pytest.fixture(scope='function')
+def price_feed(deploy_price_feed, stable_swap_oracle, curve_pool):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+    return deploy_price_feed(max_safe_price_difference=500)
+
+
+def set_anchor_age(stable_swap_oracle, age):
+    stable_swap_oracle.set_timestamp(chain.time() - age)
+
+
+def test_anchor_age_is_not_checked_by_default(price_feed, stable_swap_oracle, stranger):
+    assert price_feed.max_anchor_age() == 0
+
+    stable_swap_oracle.set_timestamp(0)
+
+    assert price_feed.current_price() == (0.98 * 1e18, True)
+    tx = price_feed.update_safe_price({'from': stranger})
+    assert tx.return_value == 0.98 * 1e18
+
+
+def test_set_max_anchor_age_acl(price_feed, stranger):
+    with reverts():
+        price_feed.set_max_anchor_age(ONE_HOUR, {'from': stranger})
+
+
+def test_set_max_anchor_age(price_feed, helpers):
+    tx = price_feed.set_max_anchor_age(ONE_HOUR, {'from': price_feed.admin()})
+
+    helpers.assert_single_event_named('MaxAnchorAgeChanged', tx, {'max_anchor_age': ONE_HOUR})
+    assert price_feed.max_anchor_age() == ONE_HOUR
+
+
+def test_set_max_anchor_age_cap(price_feed):
+    price_feed.set_max_anchor_age(ONE_WEEK, {'from': price_feed.admin()})
+    assert price_feed.max_anchor_age() == ONE_WEEK
+
+    with reverts():
+        price_feed.set_max_anchor_age(ONE_WEEK + 1, {'from': price_feed.admin()})
+
+
+def test_fresh_anchor(price_feed, stable_swap_oracle, stranger):
+    price_feed.set_max_anchor_age(ONE_HOUR, {'from': price_feed.admin()})
+    set_anchor_age(stable_swap_oracle, ONE_HOUR // 2)
+
+    assert price_feed.current_price() == (0.98 * 1e18, True)
+    tx = price_feed.update_safe_price({'from': stranger})
+    assert tx.return_value == 0.98 * 1e18
+
+
+def test_stale_anchor(price_feed, stable_swap_oracle, curve_pool, stranger, helpers):
+    price_feed.update_safe_price({'from': stranger})
+    safe_price = price_feed.safe_price()
+
+    price_feed.set_max_anchor_age(ONE_HOUR, {'from': price_feed.admin()})
+    set_anchor_age(stable_swap_oracle, ONE_HOUR + 60)
+    curve_pool.set_price(0.97 * 1e18)
+
+    # the price is still reported, but not as a safe one
+    assert price_feed.current_price() == (0.97 * 1e18, False)
+    assert price_feed.full_price_info() == (0.97 * 1e18, False, 1e18)
+    assert price_feed.feed_state()[2:4] == (0.97 * 1e18, False)
+    prices, is_safe, _ = price_feed.price_for_amounts([1e18, 0, 0, 0, 0, 0, 0, 0])
+    assert (prices[0], is_safe[0]) == (0.97 * 1e18, False)
+
+    with reverts('anchor price is stale'):
+        price_feed.update_safe_price({'from': stranger})
+    with reverts('anchor price is stale'):
+        price_feed.fetch_safe_price(0, {'from': stranger})
+
+    tx = price_feed.try_fetch_safe_price(0, {'from': stranger})
+    helpers.assert_no_events_named('SafePriceUpdated', tx)
+    assert tx.return_value == safe_price + (FETCH_STATUS_ANCHOR_STALE,)
+
+    # the cached price is still served while it's fresh enough
+    tx = price_feed.fetch_safe_price(ONE_HOUR, {'from': stranger})
+    assert tx.return_value == safe_price
+
+    # a new anchor report makes the price safe again
+    set_anchor_age(stable_swap_oracle, 0)
+    tx = price_feed.update_safe_price({'from': stranger})
+    assert tx.return_value == 0.97 * 1e18
+
+
+def test_stale_anchor_is_checked_before_pool(price_feed, stable_swap_oracle, curve_pool, stranger):
+    price_feed.set_max_anchor_age(ONE_HOUR, {'from': price_feed.admin()})
+    set_anchor_age(stable_swap_oracle, ONE_HOUR + 60)
+
+    # an unsafe pool price reverts with the anchor error, the pool isn't queried
+    curve_pool.set_price(0.5 * 1e18)
+    with reverts('anchor price is stale'):
+        price_feed.update_safe_price({'from': stranger})
+
+    tx = price_feed.try_fetch_safe_price(0, {'from': stranger})
+    assert tx.return_value[2] == FETCH_STATUS_ANCHOR_STALE
+    assert curve_pool.address not in [call['to'] for call in tx.subcalls]
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from brownie import chain, PriceFeedBatchUpdater
+
+from scripts.keeper import Keeper
+
+
+ONE_HOUR = 60 * 60
+
+
+@pytest.fixture(scope='module')
+def batch_updater(deployer):
+    return PriceFeedBatchUpdater.deploy({'from': deployer})
+
+
+@pytest.fixture(scope='function')
+def feeds(deploy_price_feed, stable_swap_oracle, curve_pool):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+    return [
+        deploy_price_feed(max_safe_price_difference=500),
+        deploy_price_feed(max_safe_price_difference=500),
+        deploy_price_feed(max_safe_price_difference=100),
+    ]
+
+
+def test_update_safe_prices(batch_updater, feeds, stable_swap_oracle, curve_pool, stranger):
+    # unsafe for the strict feed only
+    curve_pool.set_price(0.985 * 1e18)
+    stable_swap_oracle.set_price(0.97 * 1e18)
+
+    tx = batch_updater.updateSafePrices([feed.address for feed in feeds], {'from': stranger})
+
+    assert tx.return_value == 2
+    assert len(tx.events['SafePriceFetched']) == 2
+    for event, feed in zip(tx.events['SafePriceFetched'], feeds[:2]):
+        assert event['priceFeed'] == feed.address
+        assert event['price'] == 0.985 * 1e18
+        assert event['timestamp'] == tx.timestamp
+        assert feed.safe_price() == (0.985 * 1e18, tx.timestamp)
+
+    assert len(tx.events['SafePriceFetchFailed']) == 1
+    assert tx.events['SafePriceFetchFailed']['priceFeed'] == feeds[2].address
+    assert tx.events['SafePriceFetchFailed']['reason'] == 'price is not safe'
+    assert feeds[2].safe_price_timestamp() == 0
+
+
+def test_update_safe_prices_non_feed(batch_updater, feeds, stranger):
+    tx = batch_updater.updateSafePrices([stranger.address, feeds[0].address], {'from': stranger})
+
+    assert tx.return_value == 1
+    assert tx.events['SafePriceFetchFailed']['priceFeed'] == stranger.address
+    assert tx.events['SafePriceFetchFailed']['reason'] == 'not a contract'
+    assert tx.events['SafePriceFetched']['priceFeed'] == feeds[0].address
+
+
+def test_fetch_safe_prices_non_feed(batch_updater, feeds, stranger):
+    tx = batch_updater.fetchSafePrices([stranger.address, feeds[0].address], 0, {'from': stranger})
+
+    assert tx.return_value == 1
+    assert tx.events['SafePriceFetchFailed']['priceFeed'] == stranger.address
+    assert tx.events['SafePriceFetchFailed']['reason'] == 'not a contract'
+    assert tx.events['SafePriceFetched']['priceFeed'] == feeds[0].address
+
+
+def test_fetch_safe_prices(batch_updater, feeds, curve_pool, stranger):
+    first_tx = feeds[0].update_safe_price({'from': stranger})
+    chain.sleep(ONE_HOUR)
+    curve_pool.set_price(0.99 * 1e18)
+
+    tx = batch_updater.fetchSafePrices([feed.address for feed in feeds], 2 * ONE_HOUR, {'from': stranger})
+
+    assert tx.return_value == 3
+    events = tx.events['SafePriceFetched']
+    # the first feed's price is fresh enough so it isn't updated
+    assert (events[0]['price'], events[0]['timestamp']) == (0.98 * 1e18, first_tx.timestamp)
+    assert (events[1]['price'], events[1]['timestamp']) == (0.99 * 1e18, tx.timestamp)
+    assert (events[2]['price'], events[2]['timestamp']) == (0.99 * 1e18, tx.timestamp)
+    assert feeds[0].safe_price() == (0.98 * 1e18, first_tx.timestamp)
+
+
+def test_keeper_batch_mode(batch_updater, feeds, stable_swap_oracle, curve_pool, stranger):
+    feeds[0].update_safe_price({'from': stranger})
+    curve_pool.set_price(0.985 * 1e18)
+    stable_swap_oracle.set_price(0.97 * 1e18)
+
+    keeper = Keeper(feeds, stranger, ONE_HOUR, 100, poll_interval=0, batch_updater=batch_updater)
+    results = asyncio.run(keeper.poll_all())
+
+    assert results[0] is None
+    assert results[2] is None
+    tx = results[1]
+    assert tx.receiver == batch_updater.address
+    assert tx.events['SafePriceFetched']['priceFeed'] == feeds[1].address
+    assert feeds[1].safe_price() == (0.985 * 1e18, tx.timestamp)
+
+    chain.sleep(ONE_HOUR + 1)
+    results = asyncio.run(keeper.poll_all())
+
+    assert results[0] == results[1]
+    assert results[2] is None
+    assert results[0].return_value == 2
@@ -0,0 +1,126 @@
+import asyncio
+import io
+import json
+import sys
+
+import pytest
+from brownie import web3
+
+from scripts.deploy import deploy_from_manifest
+from utils.deploy_manifest import Lockfile, ManifestError, parse_manifest, deploy_networks
+
+
+def manifest_for(stable_swap_oracle, curve_pool, deployments):
+    return parse_manifest({'networks': {'development': {'deployments': [
+        {'stable_swap_oracle': stable_swap_oracle.address, 'curve_pool': curve_pool.address, **deployment}
+        for deployment in deployments
+    ]}}})
+
+
+def test_parse_manifest_defaults(stable_swap_oracle, curve_pool):
+    manifest = manifest_for(stable_swap_oracle, curve_pool, [{'name': 'feed'}])
+    assert manifest['development']['deployer'] is None
+    assert manifest['development']['deployments'] == [{
+        'name': 'feed',
+        'max_safe_price_difference': 500,
+        'stable_swap_oracle': stable_swap_oracle.address,
+        'curve_pool': curve_pool.address,
+        'admin': None,
+        'immutable_sources': False,
+    }]
+
+
+@pytest.mark.parametrize('deployments', [
+    [{'name': 'feed'}, {'name': 'feed'}],
+    [{'name': 'feed', 'max_safe_price_difference': 1001}],
+    [{'name': 'feed', 'admin': '0x1234'}],
+    [{'name': 'feed', 'max_age': 10}],
+    [{}],
+])
+def test_parse_manifest_invalid(stable_swap_oracle, curve_pool, deployments):
+    with pytest.raises(ManifestError):
+        manifest_for(stable_swap_oracle, curve_pool, deployments)
+
+
+def test_deploy_and_resume(stable_swap_oracle, curve_pool, deployer, stranger, tmp_path):
+    deployments = manifest_for(stable_swap_oracle, curve_pool, [
+        {'name': 'first'},
+        {'name': 'second', 'max_safe_price_difference': 100, 'admin': stranger.address},
+        {'name': 'immutable', 'immutable_sources': True},
+    ])['development']['deployments']
+    lockfile = Lockfile(str(tmp_path / 'manifest.lock.json'))
+    records = []
+
+    def emit(record):
+        records.append(record)
+        lockfile.record('development', record)
+
+    # interrupted after the first deployment
+    feeds = deploy_from_manifest(deployments[:1], Lockfile(lockfile.path).network('development'), {'from': deployer}, emit)
+    assert [record['type'] for record in records] == ['implementation', 'deployment']
+    assert feeds['first'].admin() == deployer
+
+    records.clear()
+    feeds = deploy_from_manifest(deployments, Lockfile(lockfile.path).network('development'), {'from': deployer}, emit)
+    # the mutable implementation is reused by the second feed
+    assert [record['type'] for record in records] == ['deployment', 'implementation', 'deployment']
+    assert feeds['second'].max_safe_price_difference() == 100
+    assert feeds['second'].admin() == stranger
+
+    section = Lockfile(lockfile.path).network('development')
+    assert len(section['implementations']) == 2
+    assert section['deployments']['first']['implementation'] == section['deployments']['second']['implementation']
+    assert section['deployments']['first']['proxy'] == feeds['first'].address
+    assert section['deployments']['immutable']['block_number'] == web3.eth.block_number
+
+    block_number = web3.eth.block_number
+    records.clear()
+    resumed = deploy_from_manifest(deployments, Lockfile(lockfile.path).network('development'), {'from': deployer}, emit)
+    assert records == []
+    assert web3.eth.block_number == block_number
+    assert {name: feed.address for name, feed in resumed.items()} == {name: feed.address for name, feed in feeds.items()}
+
+
+def test_changed_params_are_not_redeployed(stable_swap_oracle, curve_pool, deployer, tmp_path):
+    lockfile = Lockfile(str(tmp_path / 'manifest.lock.json'))
+    emit = lambda record: lockfile.record('development', record)
+    deployments = manifest_for(stable_swap_oracle, curve_pool, [{'name': 'feed'}])['development']['deployments']
+    deploy_from_manifest(deployments, lockfile.network('development'), {'from': deployer}, emit)
+
+    deployments = manifest_for(
+        stable_swap_oracle,
+        curve_pool,
+        [{'name': 'feed', 'max_safe_price_difference': 100}]
+    )['development']['deployments']
+    with pytest.raises(ValueError):
+        deploy_from_manifest(deployments, lockfile.network('development'), {'from': deployer}, emit)
+
+
+def test_deploy_networks_records_output(stable_swap_oracle, curve_pool, tmp_path):
+    manifest = manifest_for(stable_swap_oracle, curve_pool, [{'name': 'feed'}])
+    manifest = {'first': dict(manifest['development'], deployer='first-deployer'), 'second': manifest['development']}
+    script = (
+        'import json, os, sys\n'
+        'print("deployer", os.environ.get("DEPLOYER"))\n'
+        'print("DEPLOY_RECORD " + json.dumps({"type": "deployment", "name": "feed", "proxy": sys.argv[1]}))\n'
+        'sys.exit(sys.argv[1] == "second")\n'
+    )
+    lockfile = Lockfile(str(tmp_path / 'manifest.lock.json'))
+    output = io.StringIO()
+
+    exit_codes = asyncio.run(deploy_networks(
+        manifest,
+        lockfile,
+        max_parallel=2,
+        command=lambda network: [sys.executable, '-c', script, network],
+        env={},
+        output=output
+    ))
+
+    assert exit_codes == {'first': 0, 'second': 1}
+    assert '[first] deployer first-deployer' in output.getvalue()
+    assert '[second] deployer None' in output.getvalue()
+    with open(lockfile.path) as f:
+        data = json.load(f)
+    assert data['networks']['first']['deployments'] == {'feed': {'proxy': 'first'}}
+    assert data['networks']['second']['deployments'] == {'feed': {'proxy': 'second'}}
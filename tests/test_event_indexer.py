@@ -0,0 +1,219 @@
+import pytest
+from brownie import chain, web3, Contract, PriceFeedProxy, ZERO_ADDRESS
+
+from utils.event_indexer import EventIndexer, PROXY_ADMIN_CHANGED
+from utils.price_feed_client import RpcError
+
+
+@pytest.fixture(scope='function')
+def price_feed(deploy_price_feed, stable_swap_oracle, curve_pool):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(1e18)
+    return deploy_price_feed(max_safe_price_difference=500)
+
+
+@pytest.fixture(scope='function')
+def make_indexer(price_feed, tmp_path):
+    indexers = []
+
+    def make(**kwargs):
+        indexer = EventIndexer(
+            web3.provider.endpoint_uri,
+            price_feed.address,
+            str(tmp_path / 'events.sqlite'),
+            confirmations=0,
+            **kwargs
+        )
+        indexers.append(indexer)
+        return indexer
+
+    yield make
+    for indexer in indexers:
+        indexer.close()
+
+
+def update_safe_price(price_feed, curve_pool, price, stranger):
+    curve_pool.set_price(price)
+    tx = price_feed.update_safe_price({'from': stranger})
+    return tx.block_number, tx.timestamp
+
+
+def test_indexes_feed_and_proxy_events(
+    price_feed,
+    curve_pool,
+    deployer,
+    stranger,
+    make_indexer,
+    StEthPriceFeed
+):
+    first = update_safe_price(price_feed, curve_pool, 0.98 * 1e18, stranger)
+    second = update_safe_price(price_feed, curve_pool, 0.97 * 1e18, stranger)
+    price_feed.set_max_safe_price_difference(300, {'from': deployer})
+    price_feed.set_max_anchor_age(3600, {'from': deployer})
+    price_feed.set_min_safe_price_change(10, {'from': deployer})
+    price_feed.set_price_sources([stranger] + [ZERO_ADDRESS] * 4, [50000] + [0] * 4, 1, {'from': deployer})
+    price_feed.initialize_price_history(10, {'from': deployer})
+    price_feed.set_admin(stranger, {'from': deployer})
+
+    proxy = Contract.from_abi('PriceFeedProxy', price_feed.address, PriceFeedProxy.abi)
+    new_impl = StEthPriceFeed.deploy({'from': deployer})
+    upgrade_tx = proxy.upgradeTo(new_impl, b'', {'from': deployer})
+    proxy.changeProxyAdmin(stranger, {'from': deployer})
+
+    indexer = make_indexer()
+    assert indexer.run() == 10
+
+    assert indexer.safe_price_updates(0, chain.height) == [
+        (first[0], first[1], 0, 0.98 * 1e18),
+        (second[0], second[1], 0.98 * 1e18, 0.97 * 1e18),
+    ]
+    assert [(event, args) for _, _, event, args in indexer.config_changes()] == [
+        ('MaxSafePriceDifferenceChanged', {'max_safe_price_difference': 300}),
+        ('MaxAnchorAgeChanged', {'max_anchor_age': 3600}),
+        ('MinSafePriceChangeChanged', {'min_safe_price_change': 10}),
+        ('PriceSourcesChanged', {
+            'sources': [stranger.address] + [ZERO_ADDRESS] * 4,
+            'gas_limits': [50000] + [0] * 4,
+            'quorum': 1,
+        }),
+        ('PriceHistoryInitialized', {'capacity': 10}),
+        ('AdminChanged', {'admin': stranger}),
+        ('Upgraded', {'implementation': new_impl}),
+        (PROXY_ADMIN_CHANGED, {'previousAdmin': deployer, 'newAdmin': stranger}),
+    ]
+    assert indexer.config_changes('Upgraded')[0][:2] == (upgrade_tx.block_number, upgrade_tx.timestamp)
+
+
+def test_safe_price_lookups(price_feed, curve_pool, stranger, make_indexer):
+    first = update_safe_price(price_feed, curve_pool, 0.98 * 1e18, stranger)
+    chain.sleep(100)
+    second = update_safe_price(price_feed, curve_pool, 0.97 * 1e18, stranger)
+
+    indexer = make_indexer()
+    indexer.run()
+
+    assert indexer.safe_price_at_block(first[0] - 1) is None
+    assert indexer.safe_price_at_block(first[0]) == (0.98 * 1e18, first[1])
+    assert indexer.safe_price_at_block(second[0] - 1) == (0.98 * 1e18, first[1])
+    assert indexer.safe_price_at_block(second[0]) == (0.97 * 1e18, second[1])
+
+    assert indexer.safe_price_at_time(first[1] - 1) is None
+    assert indexer.safe_price_at_time(second[1] - 1) == (0.98 * 1e18, first[1])
+    assert indexer.safe_price_at_time(second[1]) == (0.97 * 1e18, second[1])
+
+
+def test_timestamp_refresh_is_not_indexed(price_feed, curve_pool, stranger, make_indexer):
+    price_feed.set_min_safe_price_change(50, {'from': price_feed.admin()})
+    block_number, timestamp = update_safe_price(price_feed, curve_pool, 0.98 * 1e18, stranger)
+    chain.sleep(100)
+    refresh_tx = price_feed.update_safe_price({'from': stranger})
+    assert price_feed.safe_price() == (0.98 * 1e18, refresh_tx.timestamp)
+
+    indexer = make_indexer()
+    indexer.run()
+
+    # a refresh within min_safe_price_change emits no event, the indexer keeps the older timestamp
+    assert indexer.safe_price_at_block(refresh_tx.block_number) == (0.98 * 1e18, timestamp)
+    assert indexer.safe_price_updates(0, chain.height) == [(block_number, timestamp, 0, 0.98 * 1e18)]
+
+
+def test_incremental_runs(price_feed, curve_pool, stranger, make_indexer):
+    update_safe_price(price_feed, curve_pool, 0.98 * 1e18, stranger)
+
+    indexer = make_indexer()
+    assert indexer.run() == 1
+    assert indexer.last_indexed_block() == chain.height
+    indexed_up_to = chain.height
+
+    requested = []
+    get_logs = indexer.get_logs
+
+    def recording_get_logs(from_block, to_block):
+        requested.append((from_block, to_block))
+        return get_logs(from_block, to_block)
+
+    # a new indexer over the same database resumes from the checkpoint
+    indexer = make_indexer()
+    indexer.get_logs = recording_get_logs
+    assert indexer.run() == 0
+    assert requested == []
+
+    block_number, timestamp = update_safe_price(price_feed, curve_pool, 0.97 * 1e18, stranger)
+    assert indexer.run() == 1
+    assert requested == [(indexed_up_to + 1, chain.height)]
+    assert indexer.safe_price_at_block(block_number) == (0.97 * 1e18, timestamp)
+
+
+def test_adaptive_chunk_size(price_feed, curve_pool, stranger, make_indexer):
+    for price in (0.98, 0.97, 0.96, 0.97):
+        update_safe_price(price_feed, curve_pool, price * 1e18, stranger)
+    chain.mine(64)
+
+    indexer = make_indexer(chunk_size=64, min_chunk_size=1)
+    requested = []
+    get_logs = indexer.get_logs
+
+    def limited_get_logs(from_block, to_block):
+        requested.append((from_block, to_block))
+        if to_block - from_block + 1 > 4:
+            raise RpcError('eth_getLogs', {'code': -32005, 'message': 'query returned more than 10000 results'})
+        return get_logs(from_block, to_block)
+
+    indexer.get_logs = limited_get_logs
+    assert indexer.run() == 4
+
+    sizes = [to_block - from_block + 1 for from_block, to_block in requested]
+    # the range shrinks until it's accepted and never grows up to the rejected size again
+    assert sizes[:5] == [64, 32, 16, 8, 4]
+    assert all(size <= 7 for size in sizes[5:])
+    # every block is covered exactly once by the accepted ranges
+    accepted = [(a, b) for a, b in requested if b - a + 1 <= 4]
+    assert accepted[0][0] == 0
+    assert all(prev[1] + 1 == next[0] for prev, next in zip(accepted, accepted[1:]))
+    assert accepted[-1][1] == chain.height
+
+
+def test_min_chunk_size_error_is_raised(price_feed, make_indexer):
+    indexer = make_indexer(chunk_size=4, min_chunk_size=2)
+
+    def failing_get_logs(from_block, to_block):
+        raise RpcError('eth_getLogs', {'code': -32000, 'message': 'node is down'})
+
+    indexer.get_logs = failing_get_logs
+    with pytest.raises(RpcError):
+        indexer.run()
+    assert indexer.last_indexed_block() is None
+
+
+class BatchResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+@pytest.mark.parametrize('body,message', [
+    # a batch rejected as a whole
+    ({'jsonrpc': '2.0', 'id': None, 'error': {'code': -32600, 'message': 'batch too large'}}, 'batch too large'),
+    ([{'jsonrpc': '2.0', 'id': 1, 'error': {'code': -32000, 'message': 'header not found'}}], 'header not found'),
+    ([{'jsonrpc': '2.0', 'id': 1, 'result': None}], 'block not found'),
+    ([], 'no results for blocks'),
+])
+def test_block_timestamp_errors_are_raised(price_feed, curve_pool, stranger, make_indexer, body, message):
+    update_safe_price(price_feed, curve_pool, 0.98 * 1e18, stranger)
+    indexer = make_indexer()
+
+    # the batch of the block requests gets `body`, the other requests go to the node
+    post = indexer.session.post
+
+    def post_batch(url, json, **kwargs):
+        return BatchResponse(body) if isinstance(json, list) else post(url, json=json, **kwargs)
+
+    indexer.session.post = post_batch
+    with pytest.raises(RpcError, match=message):
+        indexer.run()
+    assert indexer.last_indexed_block() is None
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+from brownie import chain, web3
+
+from scripts.keeper import Keeper
+from utils.feed_exporter import FeedExporter, KeeperMetrics, poll_interval, rpc_method
+
+pytest.importorskip('prometheus_client')
+
+
+ONE_HOUR = 60 * 60
+
+
+def sample(exporter, name, **labels):
+    return exporter.registry.get_sample_value(name, labels)
+
+
+def test_poll_interval():
+    assert poll_interval(0, 500, 5, 60) == 60
+    assert poll_interval(250, 500, 5, 60) == 32.5
+    assert poll_interval(500, 500, 5, 60) == 5
+    assert poll_interval(700, 500, 5, 60) == 5
+    assert poll_interval(0, 0, 5, 60) == 5
+
+
+def test_rpc_method():
+    assert rpc_method(json.dumps({'method': 'eth_blockNumber'})) == 'eth_blockNumber'
+    assert rpc_method(json.dumps([{'method': 'eth_call'}, {'method': 'eth_call'}])) == 'eth_call'
+    assert rpc_method(None) == 'unknown'
+
+
+def test_exporter_metrics(deploy_price_feed, stable_swap_oracle, curve_pool, stranger):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+    updated_feed = deploy_price_feed(max_safe_price_difference=500)
+    tx = updated_feed.update_safe_price({'from': stranger})
+    strict_feed = deploy_price_feed(max_safe_price_difference=100)
+
+    exporter = FeedExporter(
+        web3.provider.endpoint_uri,
+        [updated_feed.address, strict_feed.address],
+        concurrency=2,
+        min_interval=5,
+        max_interval=60
+    )
+    intervals = [exporter.poll(client, now=tx.timestamp + ONE_HOUR) for client in exporter.clients]
+
+    # 2% deviation is 40% of the way to 5%, and beyond 1%
+    assert intervals == [38, 5]
+    assert sample(exporter, 'steth_price_feed_safe_price_age_seconds', feed=updated_feed.address) == ONE_HOUR
+    assert sample(exporter, 'steth_price_feed_safe_price', feed=updated_feed.address) == 0.98
+    assert sample(exporter, 'steth_price_feed_deviation_bps', feed=strict_feed.address) == 200
+    assert sample(exporter, 'steth_price_feed_max_safe_price_difference_bps', feed=strict_feed.address) == 100
+    assert sample(exporter, 'steth_price_feed_is_safe', feed=updated_feed.address) == 1
+    assert sample(exporter, 'steth_price_feed_is_safe', feed=strict_feed.address) == 0
+    assert sample(exporter, 'steth_price_feed_poll_interval_seconds', feed=strict_feed.address) == 5
+    assert sample(exporter, 'steth_price_feed_rpc_latency_seconds_count', method='eth_call') == 2
+
+
+def test_exporter_run_counts_errors(deploy_price_feed, stranger):
+    price_feed = deploy_price_feed(max_safe_price_difference=500)
+    exporter = FeedExporter(
+        web3.provider.endpoint_uri,
+        [price_feed.address, stranger.address],
+        concurrency=1,
+        min_interval=0,
+        max_interval=0
+    )
+    asyncio.run(exporter.run(iterations=2))
+
+    # the stranger has no code, so `feed_state` returns no data
+    assert sample(exporter, 'steth_price_feed_poll_errors_total', feed=stranger.address) == 2
+    assert sample(exporter, 'steth_price_feed_poll_errors_total', feed=price_feed.address) is None
+    assert sample(exporter, 'steth_price_feed_pool_price', feed=price_feed.address) is not None
+
+
+def test_keeper_metrics(deploy_price_feed, stable_swap_oracle, curve_pool, stranger):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+    price_feed = deploy_price_feed(max_safe_price_difference=500)
+
+    metrics = KeeperMetrics()
+    keeper = Keeper([price_feed], stranger, ONE_HOUR, 100, poll_interval=0, metrics=metrics)
+    tx = asyncio.run(keeper.poll_all())[0]
+    chain.sleep(ONE_HOUR + 1)
+    asyncio.run(keeper.poll_all())
+
+    assert metrics.registry.get_sample_value('steth_price_feed_keeper_tx_gas_used_count', {'mode': 'single'}) == 2
+    assert metrics.registry.get_sample_value('steth_price_feed_keeper_tx_gas_used_sum', {'mode': 'single'}) > tx.gas_used
@@ -0,0 +1,143 @@
+import random
+
+import pytest
+from brownie import chain, history, ZERO_ADDRESS
+from brownie.exceptions import VirtualMachineError
+
+from utils.feed_model import PriceFeedModel, PriceFeedRevert, FixedPrice
+
+
+OPERATIONS_COUNT = 60
+ONE_HOUR = 60 * 60
+
+
+@pytest.fixture(scope='function')
+def price_feed(deploy_price_feed, stable_swap_oracle, curve_pool):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(1e18)
+    return deploy_price_feed(max_safe_price_difference=500)
+
+
+def send(fn, *args, sender):
+    # returns the receipt of the transaction whether it has reverted or not
+    try:
+        return fn(*args, {'from': sender})
+    except VirtualMachineError:
+        return history[-1]
+
+
+class DifferentialRun:
+    def __init__(self, price_feed, curve_pool, stable_swap_oracle, sources, stranger):
+        self.price_feed = price_feed
+        self.admin = price_feed.admin()
+        self.curve_pool = curve_pool
+        self.stable_swap_oracle = stable_swap_oracle
+        self.sources = sources
+        self.stranger = stranger
+        self.model = PriceFeedModel(
+            FixedPrice(curve_pool.price()),
+            FixedPrice(stable_swap_oracle.stethPrice(), stable_swap_oracle.timestamp()),
+            price_feed.max_safe_price_difference(),
+            sources=[FixedPrice(source.price()) for source in sources],
+            price_source_quorum=price_feed.price_source_quorum()
+        )
+
+    def compare(self, tx, model_call):
+        try:
+            expected = model_call(tx.timestamp)
+        except PriceFeedRevert as e:
+            assert tx.status == 0
+            if e.reason is not None:
+                assert tx.revert_msg == e.reason
+            return
+        assert tx.status == 1
+        assert tx.return_value == expected
+
+    def run(self, rnd):
+        price_feed = self.price_feed
+        model = self.model
+        price = lambda: rnd.randrange(90 * 10**16, 105 * 10**16, 10**15)
+
+        for _ in range(OPERATIONS_COUNT):
+            op = rnd.randrange(10)
+            if op == 0:
+                model.pool.price = price()
+                self.curve_pool.set_price(model.pool.price, {'from': self.stranger})
+            elif op == 1:
+                model.anchor.price = price()
+                self.stable_swap_oracle.set_price(model.anchor.price, {'from': self.stranger})
+            elif op == 2 and self.sources:
+                index = rnd.randrange(len(self.sources))
+                # a source that doesn't respond has no price in the model
+                reverts = rnd.randrange(4) == 0
+                model.sources[index].price = None if reverts else price()
+                self.sources[index].set_reverts(reverts, {'from': self.stranger})
+                if not reverts:
+                    self.sources[index].set_price(model.sources[index].price, {'from': self.stranger})
+            elif op == 3:
+                self.stable_swap_oracle.set_timestamp(chain.time() - rnd.randrange(ONE_HOUR), {'from': self.stranger})
+                model.anchor.timestamp = self.stable_swap_oracle.timestamp()
+            elif op == 4:
+                chain.sleep(rnd.randrange(2 * ONE_HOUR))
+            elif op == 5:
+                value = rnd.choice([0, 10, 100, 300, 500, 1000, 1001])
+                tx = send(price_feed.set_max_safe_price_difference, value, sender=self.admin)
+                self.compare(tx, lambda now: model.set_max_safe_price_difference(value))
+            elif op == 6:
+                value = rnd.choice([0, 0, 1, 5, 50, 51])
+                tx = send(price_feed.set_min_safe_price_change, value, sender=self.admin)
+                self.compare(tx, lambda now: model.set_min_safe_price_change(value))
+            elif op == 7:
+                value = rnd.choice([0, 0, 10 * 60, ONE_HOUR, 7 * 24 * ONE_HOUR + 1])
+                tx = send(price_feed.set_max_anchor_age, value, sender=self.admin)
+                self.compare(tx, lambda now: model.set_max_anchor_age(value))
+            elif op == 8:
+                max_age = rnd.randrange(2 * ONE_HOUR)
+                if rnd.randrange(2):
+                    tx = send(price_feed.fetch_safe_price, max_age, sender=self.stranger)
+                    self.compare(tx, lambda now: model.fetch_safe_price(max_age, now))
+                else:
+                    tx = send(price_feed.try_fetch_safe_price, max_age, sender=self.stranger)
+                    self.compare(tx, lambda now: model.try_fetch_safe_price(max_age, now))
+            else:
+                tx = send(price_feed.update_safe_price, sender=self.stranger)
+                self.compare(tx, model.update_safe_price)
+
+            tx = price_feed.full_price_info.transact({'from': self.stranger})
+            assert tx.return_value == model.full_price_info(tx.timestamp)
+            assert price_feed.safe_price_value() == model.state.safe_price_value
+            assert price_feed.safe_price_timestamp() == model.state.safe_price_timestamp
+            assert price_feed.max_safe_price_difference() == model.state.max_safe_price_difference
+
+
+@pytest.mark.parametrize('sources_count', [0, 2])
+@pytest.mark.parametrize('seed', range(4))
+def test_model_matches_contract(
+    price_feed,
+    curve_pool,
+    stable_swap_oracle,
+    stranger,
+    PriceSourceMock,
+    deployer,
+    sources_count,
+    seed
+):
+    sources = [PriceSourceMock.deploy(1e18, {'from': deployer}) for _ in range(sources_count)]
+    if sources:
+        price_feed.set_price_sources(
+            sources + [ZERO_ADDRESS] * (5 - sources_count),
+            [50000] * sources_count + [0] * (5 - sources_count),
+            1,
+            {'from': price_feed.admin()}
+        )
+
+    DifferentialRun(price_feed, curve_pool, stable_swap_oracle, sources, stranger).run(random.Random(seed))
+
+
+def test_model_does_not_change_state_on_revert():
+    model = PriceFeedModel(FixedPrice(9 * 10**17), FixedPrice(10**18), 500)
+
+    with pytest.raises(PriceFeedRevert, match='price is not safe'):
+        model.update_safe_price(1000)
+    assert model.try_fetch_safe_price(0, 1000) == (0, 0, 2)
+    assert (model.state.safe_price_value, model.state.safe_price_timestamp) == (0, 0)
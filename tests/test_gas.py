@@ -0,0 +1,351 @@
+import json
+import os
+
+import pytest
+from brownie import chain, Contract, PriceFeedProxy, ZERO_ADDRESS
+
+
+# gas usage is compared against this file; a path without an entry fails,
+# set UPDATE_GAS_BASELINE=1 to write the measured values into it
+GAS_BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'gas_baseline.json')
+
+# a path is considered a regression when it becomes more than 1% more expensive
+MAX_GAS_INCREASE = 0.01
+
+ONE_HOUR = 60 * 60
+
+
+class GasRecorder:
+    def __init__(self, path, update):
+        self.path = path
+        self.update = update
+        self.measured = {}
+        self.baseline = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.baseline = json.load(f)
+
+    def record(self, name, tx):
+        return self.record_gas(name, tx.gas_used)
+
+    def record_gas(self, name, gas_used):
+        self.measured[name] = gas_used
+        if self.update:
+            return gas_used
+        expected = self.baseline.get(name)
+        assert expected is not None, (
+            f'{name}: no gas baseline, run with UPDATE_GAS_BASELINE=1 to record it ({gas_used})'
+        )
+        assert gas_used <= expected * (1 + MAX_GAS_INCREASE), (
+            f'{name}: gas usage increased from {expected} to {gas_used}'
+        )
+        return gas_used
+
+    def save(self):
+        if not self.update or not self.measured:
+            return
+        result = dict(self.baseline, **self.measured)
+        if result == self.baseline:
+            return
+        with open(self.path, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+@pytest.fixture(scope='module')
+def gas_recorder():
+    recorder = GasRecorder(GAS_BASELINE_PATH, os.environ.get('UPDATE_GAS_BASELINE') == '1')
+    yield recorder
+    recorder.save()
+
+
+@pytest.fixture(scope='function', params=['implementation', 'proxy'])
+def price_feed(request, deploy_price_feed, deployer, stable_swap_oracle, curve_pool, StEthPriceFeed):
+    if request.param == 'proxy':
+        return deploy_price_feed(max_safe_price_difference=500)
+    price_feed = StEthPriceFeed.deploy({'from': deployer})
+    price_feed.initialize(500, stable_swap_oracle, curve_pool, deployer, {'from': deployer})
+    return price_feed
+
+
+@pytest.fixture(scope='function')
+def target(request):
+    return request.node.callspec.params['price_feed']
+
+
+@pytest.fixture(scope='function', autouse=True)
+def safe_prices(stable_swap_oracle, curve_pool):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+
+
+def test_gas_safe_price(price_feed, target, stranger, gas_recorder):
+    price_feed.update_safe_price({'from': stranger})
+    tx = price_feed.safe_price.transact({'from': stranger})
+    gas_recorder.record(f'{target}.safe_price', tx)
+
+
+def test_gas_current_price(price_feed, target, stranger, gas_recorder):
+    tx = price_feed.current_price.transact({'from': stranger})
+    gas_recorder.record(f'{target}.current_price', tx)
+
+
+def test_gas_full_price_info(price_feed, target, stranger, gas_recorder):
+    tx = price_feed.full_price_info.transact({'from': stranger})
+    gas_recorder.record(f'{target}.full_price_info', tx)
+
+
+def test_gas_update_safe_price(price_feed, target, curve_pool, stranger, gas_recorder):
+    tx = price_feed.update_safe_price({'from': stranger})
+    gas_recorder.record(f'{target}.update_safe_price_first', tx)
+
+    curve_pool.set_price(0.97 * 1e18)
+    tx = price_feed.update_safe_price({'from': stranger})
+    gas_recorder.record(f'{target}.update_safe_price', tx)
+
+
+def test_gas_fetch_safe_price_cache_hit(price_feed, target, stranger, helpers, gas_recorder):
+    price_feed.update_safe_price({'from': stranger})
+    tx = price_feed.fetch_safe_price(ONE_HOUR, {'from': stranger})
+    helpers.assert_no_events_named('SafePriceUpdated', tx)
+    gas_recorder.record(f'{target}.fetch_safe_price_hit', tx)
+
+
+def test_gas_fetch_safe_price_refresh(price_feed, target, curve_pool, stranger, helpers, gas_recorder):
+    price_feed.update_safe_price({'from': stranger})
+    curve_pool.set_price(0.97 * 1e18)
+    chain.sleep(ONE_HOUR + 1)
+
+    tx = price_feed.fetch_safe_price(ONE_HOUR, {'from': stranger})
+    helpers.assert_single_event_named('SafePriceUpdated', tx)
+    gas_recorder.record(f'{target}.fetch_safe_price_refresh', tx)
+
+
+def test_gas_try_fetch_safe_price_stale(price_feed, target, curve_pool, stranger, helpers, gas_recorder):
+    price_feed.update_safe_price({'from': stranger})
+    curve_pool.set_price(0.90 * 1e18)
+    chain.sleep(ONE_HOUR + 1)
+
+    tx = price_feed.try_fetch_safe_price(ONE_HOUR, {'from': stranger})
+    helpers.assert_no_events_named('SafePriceUpdated', tx)
+    gas_recorder.record(f'{target}.try_fetch_safe_price_stale', tx)
+
+
+def test_gas_try_fetch_safe_price_anchor_stale(
+    price_feed,
+    target,
+    stable_swap_oracle,
+    stranger,
+    helpers,
+    gas_recorder
+):
+    price_feed.set_max_anchor_age(ONE_HOUR, {'from': price_feed.admin()})
+    stable_swap_oracle.set_timestamp(chain.time() - 2 * ONE_HOUR)
+
+    tx = price_feed.try_fetch_safe_price(0, {'from': stranger})
+    helpers.assert_no_events_named('SafePriceUpdated', tx)
+    gas_recorder.record(f'{target}.try_fetch_safe_price_anchor_stale', tx)
+
+
+@pytest.fixture(scope='function')
+def v1_price_feed(deployer, stable_swap_oracle, curve_pool, StEthPriceFeedV1):
+    v1_impl = StEthPriceFeedV1.deploy({'from': deployer})
+    proxy = PriceFeedProxy.deploy(v1_impl, 500, stable_swap_oracle, curve_pool, deployer, {'from': deployer})
+    return Contract.from_abi('StEthPriceFeedV1', proxy.address, StEthPriceFeedV1.abi)
+
+
+def measure_fetch_safe_price(price_feed, curve_pool, stranger):
+    curve_pool.set_price(0.98 * 1e18)
+    price_feed.update_safe_price({'from': stranger})
+    hit_tx = price_feed.fetch_safe_price(ONE_HOUR, {'from': stranger})
+
+    curve_pool.set_price(0.97 * 1e18)
+    chain.sleep(ONE_HOUR + 1)
+    refresh_tx = price_feed.fetch_safe_price(ONE_HOUR, {'from': stranger})
+    return hit_tx, refresh_tx
+
+
+def test_gas_packed_safe_price_layout(deploy_price_feed, v1_price_feed, curve_pool, stranger, gas_recorder):
+    price_feed = deploy_price_feed(max_safe_price_difference=500)
+
+    v1_hit, v1_refresh = measure_fetch_safe_price(v1_price_feed, curve_pool, stranger)
+    v2_hit, v2_refresh = measure_fetch_safe_price(price_feed, curve_pool, stranger)
+
+    gas_recorder.record('proxy_v1.fetch_safe_price_hit', v1_hit)
+    gas_recorder.record('proxy_v1.fetch_safe_price_refresh', v1_refresh)
+
+    # one SLOAD less on the cache hit, one SSTORE less on the refresh
+    assert v2_hit.gas_used < v1_hit.gas_used
+    assert v2_refresh.gas_used < v1_refresh.gas_used
+
+
+def test_gas_immutable_sources(
+    price_feed,
+    target,
+    deploy_price_feed,
+    deployer,
+    stable_swap_oracle,
+    curve_pool,
+    stranger,
+    gas_recorder,
+    StEthPriceFeedImmutable
+):
+    if target == 'proxy':
+        immutable_feed = deploy_price_feed(max_safe_price_difference=500, immutable_sources=True)
+    else:
+        immutable_feed = StEthPriceFeedImmutable.deploy(stable_swap_oracle, curve_pool, {'from': deployer})
+        immutable_feed.initialize(500, stable_swap_oracle, curve_pool, deployer, {'from': deployer})
+
+    gas_used = {}
+    for name, feed in [(target, price_feed), (f'{target}_immutable', immutable_feed)]:
+        curve_pool.set_price(0.98 * 1e18)
+        feed.update_safe_price({'from': stranger})
+        curve_pool.set_price(0.97 * 1e18)
+        txs = {
+            'current_price': feed.current_price.transact({'from': stranger}),
+            'full_price_info': feed.full_price_info.transact({'from': stranger}),
+            'update_safe_price': feed.update_safe_price({'from': stranger}),
+        }
+        gas_used[name] = {}
+        for method, tx in txs.items():
+            if name != target:
+                gas_recorder.record(f'{name}.{method}', tx)
+            gas_used[name][method] = tx.gas_used
+
+    # the pool and the oracle addresses are no longer read from the storage, two SLOADs each
+    for method, storage_gas in gas_used[target].items():
+        assert storage_gas - gas_used[f'{target}_immutable'][method] >= 1500
+
+
+def test_gas_price_for_amounts(price_feed, target, stranger, gas_recorder):
+    amounts = [1e18, 10 * 1e18, 100 * 1e18, 1000 * 1e18, 0, 0, 0, 0]
+    tx = price_feed.price_for_amounts.transact(amounts, {'from': stranger})
+    gas_recorder.record(f'{target}.price_for_amounts_4', tx)
+
+
+def test_gas_price_history_refresh(deploy_price_feed, curve_pool, stranger, gas_recorder):
+    price_feed = deploy_price_feed(max_safe_price_difference=500)
+    price_feed.initialize_price_history(4, {'from': price_feed.admin()})
+
+    gas_used = []
+    for i in range(12):
+        curve_pool.set_price((0.97 + 0.001 * (i % 2)) * 1e18)
+        chain.sleep(ONE_HOUR + 1)
+        tx = price_feed.fetch_safe_price(ONE_HOUR, {'from': stranger})
+        gas_used.append(tx.gas_used)
+
+    gas_recorder.record('proxy_history.fetch_safe_price_refresh', tx)
+
+    # once the ring buffer has wrapped around every refresh costs the same
+    assert len(set(gas_used[5:])) == 1
+    assert max(gas_used[5:]) <= min(gas_used[1:4])
+
+
+def test_gas_feed_state(price_feed, target, stranger, gas_recorder):
+    price_feed.update_safe_price({'from': stranger})
+    tx = price_feed.feed_state.transact({'from': stranger})
+    gas_recorder.record(f'{target}.feed_state', tx)
+
+
+@pytest.mark.parametrize('sources_count', [1, 3, 5])
+def test_gas_price_sources(deploy_price_feed, curve_pool, stranger, gas_recorder, PriceSourceMock, sources_count):
+    price_feed = deploy_price_feed(max_safe_price_difference=500)
+    sources = [PriceSourceMock.deploy((0.96 + 0.01 * i) * 1e18, {'from': stranger}) for i in range(sources_count)]
+    padding = 5 - sources_count
+    price_feed.set_price_sources(
+        sources + [ZERO_ADDRESS] * padding,
+        [50000] * sources_count + [0] * padding,
+        sources_count,
+        {'from': price_feed.admin()}
+    )
+    curve_pool.set_price(0.97 * 1e18)
+
+    gas_recorder.record(f'proxy_sources_{sources_count}.current_price', price_feed.current_price.transact({'from': stranger}))
+    gas_recorder.record(f'proxy_sources_{sources_count}.update_safe_price', price_feed.update_safe_price({'from': stranger}))
+
+
+def test_gas_update_safe_price_heartbeat(deploy_price_feed, curve_pool, stranger, gas_recorder):
+    txs = {}
+    changed_txs = {}
+    for min_safe_price_change in (0, 10):
+        for history_capacity in (0, 4):
+            curve_pool.set_price(1e18)
+            price_feed = deploy_price_feed(max_safe_price_difference=500)
+            admin = price_feed.admin()
+            if history_capacity != 0:
+                price_feed.initialize_price_history(history_capacity, {'from': admin})
+            if min_safe_price_change != 0:
+                price_feed.set_min_safe_price_change(min_safe_price_change, {'from': admin})
+            price_feed.update_safe_price({'from': stranger})
+            chain.sleep(60)
+
+            txs[(min_safe_price_change, history_capacity)] = price_feed.update_safe_price({'from': stranger})
+
+            if min_safe_price_change != 0:
+                # a change above the threshold is written as usual
+                curve_pool.set_price(0.99 * 1e18)
+                chain.sleep(60)
+                changed_txs[history_capacity] = price_feed.update_safe_price({'from': stranger})
+
+    gas_used = {
+        (0, 0): gas_recorder.record('proxy.update_safe_price_unchanged', txs[(0, 0)]),
+        (10, 0): gas_recorder.record('proxy.update_safe_price_heartbeat', txs[(10, 0)]),
+        (0, 4): gas_recorder.record('proxy_history.update_safe_price_unchanged', txs[(0, 4)]),
+        (10, 4): gas_recorder.record('proxy_history.update_safe_price_heartbeat', txs[(10, 4)]),
+    }
+    changed_gas_used = {
+        0: gas_recorder.record('proxy.update_safe_price_changed', changed_txs[0]),
+        4: gas_recorder.record('proxy_history.update_safe_price_changed', changed_txs[4]),
+    }
+
+    # no event and no history observation, the timestamp write stays
+    assert gas_used[(10, 0)] < gas_used[(0, 0)] < changed_gas_used[0]
+    assert gas_used[(10, 4)] < gas_used[(0, 4)] < changed_gas_used[4]
+    assert gas_used[(10, 4)] - gas_used[(10, 0)] < 1000
+
+
+@pytest.mark.parametrize('snapshot', [False, True])
+def test_gas_repeated_current_price(deploy_price_feed, stranger, gas_recorder, deployer, RepeatedPriceReader, snapshot):
+    price_feed = deploy_price_feed(max_safe_price_difference=500)
+    reader = RepeatedPriceReader.deploy(price_feed, {'from': deployer})
+
+    tx = reader.read_prices(5, snapshot, {'from': stranger})
+    gas_used = [event['gas_used'] for event in tx.events['Test__PriceRead']]
+
+    name = 'proxy_snapshot' if snapshot else 'proxy'
+    for i in (0, 1, 4):
+        gas_recorder.record_gas(f'{name}.current_price_in_block_{i + 1}', gas_used[i])
+
+    if snapshot:
+        # the pool and the oracle are queried by the first snapshot, later ones cost a single SLOAD
+        assert gas_used[1] == gas_used[4]
+        assert gas_used[4] * 2 < gas_used[0]
+
+
+def test_gas_factory_deployment(
+    deployer,
+    stable_swap_oracle,
+    curve_pool,
+    gas_recorder,
+    StEthPriceFeed,
+    PriceFeedProxyFactory
+):
+    # every feed deploys its own implementation
+    implementation = StEthPriceFeed.deploy({'from': deployer})
+    gas_recorder.record('deploy.implementation', implementation.tx)
+    proxy = PriceFeedProxy.deploy(implementation, 500, stable_swap_oracle, curve_pool, deployer, {'from': deployer})
+    standalone = gas_recorder.record_gas('deploy.standalone', implementation.tx.gas_used + proxy.tx.gas_used)
+
+    # the first feed also pays for the implementation and the factory
+    implementation = StEthPriceFeed.deploy({'from': deployer})
+    factory = PriceFeedProxyFactory.deploy(implementation, {'from': deployer})
+    txs = [
+        factory.deployPriceFeed(500, stable_swap_oracle, curve_pool, deployer, {'from': deployer})
+        for _ in range(5)
+    ]
+    first = implementation.tx.gas_used + factory.tx.gas_used + txs[0].gas_used
+    gas_recorder.record_gas('factory.deploy_first', first)
+    nth = gas_recorder.record('factory.deploy_nth', txs[-1])
+
+    assert len({tx.gas_used for tx in txs}) == 1
+    assert nth * 2 < standalone
@@ -0,0 +1,96 @@
+import json
+
+from scripts.profile_gas import profile_call, deploy_mocked_price_feed
+from utils.gas_profile import profile, collapsed_stacks, write_profile
+
+
+PROXY = '0x' + '11' * 20
+IMPL = '0x' + '22' * 20
+POOL = '0x' + '33' * 20
+
+NAMES = {PROXY: 'PriceFeedProxy', IMPL: 'StEthPriceFeed', POOL: 'CurvePool'}
+
+
+def step(op, depth, gas, gas_cost=0, stack=None):
+    return {'op': op, 'depth': depth, 'gas': gas, 'gasCost': gas_cost, 'stack': stack or []}
+
+
+# proxy -> delegatecall to the implementation -> staticcall to the pool
+STRUCT_LOGS = [
+    step('PUSH1', 1, 10000, 3),
+    step('SLOAD', 1, 9997, 800),
+    step('DELEGATECALL', 1, 9197, 9000, ['0x10', IMPL[2:], '0x5']),
+    step('SLOAD', 2, 9000, 800),
+    step('STATICCALL', 2, 8200, 8000, ['0x1', POOL, '0x5']),
+    step('ADD', 3, 7000, 3),
+    step('RETURN', 3, 6997, 0),
+    step('SSTORE', 2, 7600, 5000),
+    step('LOG1', 2, 2600, 1000),
+    step('RETURN', 2, 1600, 0),
+    step('STOP', 1, 1700, 0),
+]
+
+
+def test_profile_attributes_gas_to_frames():
+    result = profile(STRUCT_LOGS, PROXY, 30000, NAMES)
+
+    assert result['execution_gas'] == 10000 - 1700
+    assert result['intrinsic_gas_less_refunds'] == 30000 - 8300
+    assert result['by_class'] == {'SLOAD': 1600, 'SSTORE': 5000, 'CALL': 694, 'LOG': 1000, 'OTHER': 3 + 3}
+
+    frames = {frame['path']: frame for frame in result['frames']}
+    assert list(frames) == [
+        'PriceFeedProxy',
+        'PriceFeedProxy;StEthPriceFeed[delegatecall]',
+        'PriceFeedProxy;StEthPriceFeed[delegatecall];CurvePool[staticcall]',
+    ]
+    proxy = frames['PriceFeedProxy']
+    impl = frames['PriceFeedProxy;StEthPriceFeed[delegatecall]']
+    pool = frames['PriceFeedProxy;StEthPriceFeed[delegatecall];CurvePool[staticcall]']
+
+    assert pool['by_class']['OTHER'] == 3 and pool['gas'] == 3
+    # 8200 -> 7600 around the staticcall, 3 of which were spent by the pool
+    assert impl['by_class']['CALL'] == 597
+    assert impl['gas'] == 800 + 597 + 3 + 5000 + 1000
+    # 9197 -> 1700 around the delegatecall
+    assert proxy['by_class']['CALL'] == 9197 - 1700 - impl['gas']
+    assert proxy['gas'] == result['execution_gas']
+
+
+def test_collapsed_stacks():
+    result = profile(STRUCT_LOGS, PROXY, 30000, NAMES)
+    lines = collapsed_stacks(result).splitlines()
+
+    assert 'PriceFeedProxy;StEthPriceFeed[delegatecall];SSTORE 5000' in lines
+    assert 'PriceFeedProxy;StEthPriceFeed[delegatecall];CurvePool[staticcall];OTHER 3' in lines
+    # zero entries are skipped
+    assert not any(line.endswith(' 0') for line in lines)
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) == result['execution_gas']
+
+
+def test_unknown_addresses_are_labeled_by_address():
+    result = profile(STRUCT_LOGS, PROXY, 30000)
+    assert result['frames'][1]['path'] == f'{PROXY};{IMPL}[delegatecall]'
+
+
+def test_profile_fetch_safe_price(deployer, tmp_path):
+    price_feed = deploy_mocked_price_feed({'from': deployer})
+
+    result = profile_call(price_feed, 'fetch_safe_price', 0, {'from': deployer})
+
+    paths = [frame['path'] for frame in result['frames']]
+    assert paths == [
+        'PriceFeedProxy',
+        'PriceFeedProxy;StEthPriceFeed[delegatecall]',
+        'PriceFeedProxy;StEthPriceFeed[delegatecall];CurvePool[staticcall]',
+        'PriceFeedProxy;StEthPriceFeed[delegatecall];StableSwapStateOracle[staticcall]',
+    ]
+    impl = result['frames'][1]
+    assert impl['by_class']['SLOAD'] > 0
+    assert impl['by_class']['SSTORE'] > 0
+    assert impl['by_class']['LOG'] > 0
+    assert result['intrinsic_gas_less_refunds'] >= 21000
+
+    write_profile(result, tmp_path / 'profile.json', tmp_path / 'profile.folded')
+    assert json.loads((tmp_path / 'profile.json').read_text()) == result
+    assert (tmp_path / 'profile.folded').read_text() == collapsed_stacks(result)
@@ -0,0 +1,111 @@
+import pytest
+from brownie import reverts, chain, Contract, PriceFeedProxy, ZERO_ADDRESS
+import scripts.deploy
+from utils.immutable_variant import VARIANT_PATH, read_source, render
+
+
+@pytest.fixture(scope='function')
+def price_feed(deploy_price_feed):
+    return deploy_price_feed(max_safe_price_difference=500, immutable_sources=True)
+
+
+def as_proxy(price_feed):
+    return Contract.from_abi('PriceFeedProxy', price_feed.address, PriceFeedProxy.abi)
+
+
+def test_sources_are_taken_from_implementation(price_feed, stable_swap_oracle, curve_pool, StEthPriceFeedImmutable):
+    assert price_feed.curve_pool_address() == curve_pool
+    assert price_feed.stable_swap_oracle_address() == stable_swap_oracle
+    assert price_feed.max_safe_price_difference() == 500
+
+    impl = StEthPriceFeedImmutable.at(as_proxy(price_feed).implementation())
+    assert impl.curve_pool_address() == curve_pool
+    assert impl.stable_swap_oracle_address() == stable_swap_oracle
+
+
+def test_variant_is_up_to_date():
+    # regenerate with `python -m utils.immutable_variant` after changing StEthPriceFeed.vy
+    assert read_source(VARIANT_PATH) == render(read_source())
+
+
+def test_prices(price_feed, stable_swap_oracle, curve_pool, stranger):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+    assert price_feed.current_price() == (0.98 * 1e18, True)
+    assert price_feed.full_price_info() == (0.98 * 1e18, True, 1e18)
+
+    price_feed.update_safe_price({'from': stranger})
+    assert price_feed.safe_price() == (0.98 * 1e18, chain[-1].timestamp)
+
+    curve_pool.set_price(0.949 * 1e18)
+    assert price_feed.current_price() == (0.949 * 1e18, False)
+    with reverts('price is not safe'):
+        price_feed.update_safe_price({'from': stranger})
+
+
+def test_feed_state_and_history(price_feed, stable_swap_oracle, curve_pool, deployer, stranger):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+    price_feed.initialize_price_history(4, {'from': deployer})
+    price_feed.update_safe_price({'from': stranger})
+
+    chain.sleep(100)
+    curve_pool.set_price(0.97 * 1e18)
+    price_feed.update_safe_price({'from': stranger})
+
+    updated_at = chain[-1].timestamp
+
+    assert price_feed.feed_state() == (
+        0.97 * 1e18, updated_at, 0.97 * 1e18, True, 1e18, 500, deployer, curve_pool, stable_swap_oracle
+    )
+    assert price_feed.price_history_count() == 2
+    assert price_feed.twap(1) == (0.97 * 1e18, updated_at)
+
+
+def test_cannot_initialize_with_other_sources(deployer, stable_swap_oracle, curve_pool, accounts, StEthPriceFeedImmutable):
+    impl = StEthPriceFeedImmutable.deploy(stable_swap_oracle, curve_pool, {'from': deployer})
+
+    with reverts():
+        impl.initialize(500, accounts[5], curve_pool, deployer, {'from': deployer})
+
+    with reverts():
+        impl.initialize(500, stable_swap_oracle, accounts[5], deployer, {'from': deployer})
+
+    impl.initialize(500, stable_swap_oracle, curve_pool, deployer, {'from': deployer})
+
+    with reverts():
+        impl.initialize(500, stable_swap_oracle, curve_pool, deployer, {'from': deployer})
+
+
+def test_cannot_deploy_with_zero_sources(deployer, stable_swap_oracle, curve_pool, StEthPriceFeedImmutable):
+    with reverts():
+        StEthPriceFeedImmutable.deploy(stable_swap_oracle, ZERO_ADDRESS, {'from': deployer})
+
+    with reverts():
+        StEthPriceFeedImmutable.deploy(ZERO_ADDRESS, curve_pool, {'from': deployer})
+
+
+def test_upgrade_to_immutable_sources_and_back(deploy_price_feed, stable_swap_oracle, curve_pool, deployer, stranger):
+    price_feed = deploy_price_feed(max_safe_price_difference=500)
+
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+    price_feed.update_safe_price({'from': stranger})
+    prev_safe_price = price_feed.safe_price()
+
+    scripts.deploy.upgrade_price_feed(price_feed.address, {'from': deployer}, immutable_sources=True)
+
+    assert price_feed.safe_price() == prev_safe_price
+    assert price_feed.curve_pool_address() == curve_pool
+    assert price_feed.stable_swap_oracle_address() == stable_swap_oracle
+
+    curve_pool.set_price(0.97 * 1e18)
+    price_feed.update_safe_price({'from': stranger})
+    prev_safe_price = price_feed.safe_price()
+
+    scripts.deploy.upgrade_price_feed(price_feed.address, {'from': deployer}, immutable_sources=False)
+
+    assert price_feed.safe_price() == prev_safe_price
+    assert price_feed.curve_pool_address() == curve_pool
+    assert price_feed.stable_swap_oracle_address() == stable_swap_oracle
+    assert price_feed.current_price() == (0.97 * 1e18, True)
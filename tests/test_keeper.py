@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+from brownie import chain
+from utils.price_math import is_safe_price
+
+from scripts.keeper import Keeper, update_reason, REASON_NO_PRICE, REASON_STALE, REASON_DRIFT
+
+
+ONE_HOUR = 60 * 60
+
+NOW = 1_600_000_000
+
+
+def feed_state(
+    safe_price,
+    safe_price_timestamp,
+    pool_price,
+    oracle_price,
+    max_safe_price_difference=500,
+    is_anchor_stale=False
+):
+    is_safe = is_safe_price(pool_price, oracle_price, max_safe_price_difference) and not is_anchor_stale
+    return (safe_price, safe_price_timestamp, pool_price, is_safe, oracle_price, max_safe_price_difference)
+
+
+def test_update_reason_no_price():
+    state = feed_state(0, 0, 98 * 10**16, 10**18)
+    assert update_reason(state, NOW, ONE_HOUR, 50) == REASON_NO_PRICE
+
+
+def test_update_reason_stale():
+    state = feed_state(98 * 10**16, NOW - ONE_HOUR - 1, 98 * 10**16, 10**18)
+    assert update_reason(state, NOW, ONE_HOUR, 50) == REASON_STALE
+
+    state = feed_state(98 * 10**16, NOW - ONE_HOUR, 98 * 10**16, 10**18)
+    assert update_reason(state, NOW, ONE_HOUR, 50) is None
+
+
+def test_update_reason_drift():
+    # 0.5% drift
+    state = feed_state(98 * 10**16, NOW, 9751 * 10**14, 10**18)
+    assert update_reason(state, NOW, ONE_HOUR, 50) == REASON_DRIFT
+
+    state = feed_state(98 * 10**16, NOW, 9752 * 10**14, 10**18)
+    assert update_reason(state, NOW, ONE_HOUR, 50) is None
+
+
+def test_update_reason_drift_below_min_safe_price_change():
+    # 0.5% drift, the feed would only refresh the timestamp of a change below 1%
+    state = feed_state(98 * 10**16, NOW, 9751 * 10**14, 10**18)
+    assert update_reason(state, NOW, ONE_HOUR, 50, min_safe_price_change=100) is None
+
+    # 1% drift
+    state = feed_state(98 * 10**16, NOW, 9702 * 10**14, 10**18)
+    assert update_reason(state, NOW, ONE_HOUR, 50, min_safe_price_change=100) == REASON_DRIFT
+
+    # the age still counts
+    state = feed_state(98 * 10**16, NOW - ONE_HOUR - 1, 9751 * 10**14, 10**18)
+    assert update_reason(state, NOW, ONE_HOUR, 50, min_safe_price_change=100) == REASON_STALE
+
+
+def test_update_reason_drift_is_measured_from_capped_price():
+    state = feed_state(10**18, NOW, 102 * 10**16, 10**18)
+    assert update_reason(state, NOW, ONE_HOUR, 50) is None
+
+    # not safe as a current price, but `update_safe_price` would cache 10**18
+    state = feed_state(99 * 10**16, NOW, 102 * 10**16, 10**18)
+    assert update_reason(state, NOW, ONE_HOUR, 50) == REASON_DRIFT
+
+
+def test_update_reason_unsafe():
+    state = feed_state(0, 0, 949 * 10**15, 10**18)
+    assert update_reason(state, NOW, ONE_HOUR, 50) is None
+
+    state = feed_state(98 * 10**16, NOW - 2 * ONE_HOUR, 949 * 10**15, 10**18)
+    assert update_reason(state, NOW, ONE_HOUR, 50) is None
+
+
+def test_update_reason_anchor_stale():
+    state = feed_state(0, 0, 98 * 10**16, 10**18, is_anchor_stale=True)
+    assert update_reason(state, NOW, ONE_HOUR, 50) is None
+
+    state = feed_state(98 * 10**16, NOW - 2 * ONE_HOUR, 98 * 10**16, 10**18, is_anchor_stale=True)
+    assert update_reason(state, NOW, ONE_HOUR, 50) is None
+
+
+def test_keeper_updates_only_when_needed(deploy_price_feed, stable_swap_oracle, curve_pool, stranger):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+
+    fresh_feed = deploy_price_feed(max_safe_price_difference=500)
+    fresh_feed.update_safe_price({'from': stranger})
+    empty_feed = deploy_price_feed(max_safe_price_difference=500)
+    strict_feed = deploy_price_feed(max_safe_price_difference=100)
+
+    # unsafe for the strict feed only
+    curve_pool.set_price(0.985 * 1e18)
+    stable_swap_oracle.set_price(0.97 * 1e18)
+
+    keeper = Keeper([fresh_feed, empty_feed, strict_feed], stranger, ONE_HOUR, 100, poll_interval=0)
+    results = asyncio.run(keeper.poll_all())
+
+    assert results[0] is None
+    assert results[1].events['SafePriceUpdated']['to_price'] == 0.985 * 1e18
+    assert results[2] is None
+    assert empty_feed.safe_price() == (0.985 * 1e18, results[1].timestamp)
+
+    chain.sleep(ONE_HOUR + 1)
+    results = asyncio.run(keeper.poll_all())
+
+    assert results[0].events['SafePriceUpdated']['to_price'] == 0.985 * 1e18
+    assert results[1].events['SafePriceUpdated']['to_price'] == 0.985 * 1e18
+    assert results[2] is None
+
+
+def test_keeper_skips_heartbeat_updates(deploy_price_feed, stable_swap_oracle, curve_pool, stranger):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+
+    price_feed = deploy_price_feed(max_safe_price_difference=500)
+    price_feed.update_safe_price({'from': stranger})
+    price_feed.set_min_safe_price_change(30, {'from': price_feed.admin()})
+
+    # drifted by 0.2%, enough for the keeper but not for the feed
+    curve_pool.set_price(0.978 * 1e18)
+    keeper = Keeper([price_feed], stranger, ONE_HOUR, 10, poll_interval=0)
+    assert asyncio.run(keeper.poll_all()) == [None]
+
+    curve_pool.set_price(0.975 * 1e18)
+    results = asyncio.run(keeper.poll_all())
+    assert results[0].events['SafePriceUpdated']['to_price'] == 0.975 * 1e18
+
+
+def test_keeper_skips_feeds_with_stale_anchor(deploy_price_feed, stable_swap_oracle, curve_pool, stranger):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+
+    price_feed = deploy_price_feed(max_safe_price_difference=500)
+    price_feed.update_safe_price({'from': stranger})
+    price_feed.set_max_anchor_age(ONE_HOUR, {'from': price_feed.admin()})
+    stable_swap_oracle.set_timestamp(chain.time() - 2 * ONE_HOUR)
+    chain.sleep(ONE_HOUR + 1)
+
+    keeper = Keeper([price_feed], stranger, ONE_HOUR, 100, poll_interval=0)
+
+    # `feed_state()` reports a price above 1 as not safe either way
+    for pool_price in [0.98 * 1e18, 1.01 * 1e18]:
+        curve_pool.set_price(pool_price)
+        assert asyncio.run(keeper.poll_all()) == [None]
+
+    stable_swap_oracle.set_timestamp(chain.time())
+    results = asyncio.run(keeper.poll_all())
+    assert results[0].events['SafePriceUpdated']['to_price'] == 1e18
@@ -0,0 +1,104 @@
+import pytest
+from brownie import chain, reverts
+
+
+@pytest.fixture(scope='function')
+def price_feed(deploy_price_feed, stable_swap_oracle, curve_pool):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(1e18)
+    return deploy_price_feed(max_safe_price_difference=500)
+
+
+def test_disabled_by_default(price_feed, stranger, helpers):
+    assert price_feed.min_safe_price_change() == 0
+
+    price_feed.update_safe_price({'from': stranger})
+    tx = price_feed.update_safe_price({'from': stranger})
+
+    helpers.assert_single_event_named('SafePriceUpdated', tx, {'from_price': 1e18, 'to_price': 1e18})
+
+
+def test_set_min_safe_price_change_acl(price_feed, stranger):
+    with reverts():
+        price_feed.set_min_safe_price_change(10, {'from': stranger})
+
+
+def test_set_min_safe_price_change(price_feed, helpers):
+    admin = price_feed.admin()
+
+    with reverts():
+        price_feed.set_min_safe_price_change(51, {'from': admin})
+
+    tx = price_feed.set_min_safe_price_change(50, {'from': admin})
+
+    helpers.assert_single_event_named('MinSafePriceChangeChanged', tx, {'min_safe_price_change': 50})
+    assert price_feed.min_safe_price_change() == 50
+
+
+def test_first_update_is_always_written(price_feed, stranger, helpers):
+    price_feed.set_min_safe_price_change(10, {'from': price_feed.admin()})
+
+    tx = price_feed.update_safe_price({'from': stranger})
+
+    helpers.assert_single_event_named('SafePriceUpdated', tx, {'from_price': 0, 'to_price': 1e18})
+    assert price_feed.safe_price() == (1e18, tx.timestamp)
+
+
+def test_small_change_only_refreshes_timestamp(price_feed, curve_pool, stranger, helpers):
+    # 0.1%
+    price_feed.set_min_safe_price_change(10, {'from': price_feed.admin()})
+    price_feed.update_safe_price({'from': stranger})
+
+    chain.sleep(60)
+    tx = price_feed.update_safe_price({'from': stranger})
+
+    helpers.assert_no_events_named('SafePriceUpdated', tx)
+    assert tx.return_value == 1e18
+    assert price_feed.safe_price() == (1e18, tx.timestamp)
+
+    # a 0.09% move is below the threshold
+    curve_pool.set_price(0.9991 * 1e18)
+    chain.sleep(60)
+    tx = price_feed.fetch_safe_price(0, {'from': stranger})
+
+    helpers.assert_no_events_named('SafePriceUpdated', tx)
+    assert tx.return_value == (1e18, tx.timestamp)
+    assert price_feed.safe_price() == (1e18, tx.timestamp)
+
+    # a 0.1% move is not
+    curve_pool.set_price(0.999 * 1e18)
+    tx = price_feed.update_safe_price({'from': stranger})
+
+    helpers.assert_single_event_named('SafePriceUpdated', tx, {'from_price': 1e18, 'to_price': 0.999 * 1e18})
+    assert price_feed.safe_price() == (0.999 * 1e18, tx.timestamp)
+
+
+def test_small_change_is_still_checked_for_safety(price_feed, stable_swap_oracle, stranger):
+    price_feed.set_min_safe_price_change(10, {'from': price_feed.admin()})
+    price_feed.update_safe_price({'from': stranger})
+
+    stable_swap_oracle.set_price(0.9 * 1e18)
+
+    with reverts('price is not safe'):
+        price_feed.update_safe_price({'from': stranger})
+
+
+def test_heartbeat_keeps_twap(price_feed, curve_pool, stranger):
+    admin = price_feed.admin()
+    price_feed.initialize_price_history(4, {'from': admin})
+    price_feed.set_min_safe_price_change(10, {'from': admin})
+
+    first = price_feed.update_safe_price({'from': stranger})
+    chain.sleep(100)
+    price_feed.update_safe_price({'from': stranger})
+
+    # no observation is recorded by a heartbeat, the cached price stays in effect
+    assert price_feed.price_history_count() == 1
+
+    curve_pool.set_price(0.98 * 1e18)
+    chain.sleep(100)
+    price_feed.update_safe_price({'from': stranger})
+    assert price_feed.price_history_count() == 2
+
+    tx = price_feed.twap.transact(2, {'from': stranger})
+    assert tx.return_value[1] == first.timestamp
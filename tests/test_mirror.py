@@ -0,0 +1,141 @@
+import pytest
+from brownie import chain, reverts, web3
+
+from utils.mirror_relayer import MirrorRelayer
+
+
+@pytest.fixture(scope='function')
+def price_feed(deploy_price_feed, stable_swap_oracle, curve_pool):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(1e18)
+    return deploy_price_feed(max_safe_price_difference=500)
+
+
+@pytest.fixture(scope='module')
+def relayer_account(accounts):
+    return accounts[8]
+
+
+@pytest.fixture(scope='function')
+def mirror(deployer, relayer_account, StEthPriceMirror):
+    return StEthPriceMirror.deploy(deployer, relayer_account, {'from': deployer})
+
+
+@pytest.fixture(scope='function')
+def make_relayer(price_feed, mirror, relayer_account):
+    # the development chain serves as both the source and the destination one
+    def make(**kwargs):
+        return MirrorRelayer(
+            web3.provider.endpoint_uri,
+            price_feed.address,
+            web3,
+            mirror.address,
+            relayer_account.address,
+            confirmations=0,
+            **kwargs
+        )
+    return make
+
+
+def test_push_safe_price(mirror, relayer_account, helpers):
+    with reverts():
+        mirror.safe_price()
+    assert mirror.safe_price_info() == (0, 0, 0)
+
+    tx = mirror.push_safe_price(0.99 * 1e18, 1000, 10, {'from': relayer_account})
+
+    helpers.assert_single_event_named(
+        'SafePriceMirrored',
+        tx,
+        {'price': 0.99 * 1e18, 'price_timestamp': 1000, 'mainnet_block': 10}
+    )
+    assert mirror.safe_price() == (0.99 * 1e18, 1000)
+    assert mirror.safe_price_info() == (0.99 * 1e18, 1000, 10)
+
+
+def test_push_safe_price_acl(mirror, stranger):
+    with reverts():
+        mirror.push_safe_price(1e18, 1000, 10, {'from': stranger})
+
+
+def test_push_safe_price_monotonic(mirror, relayer_account):
+    mirror.push_safe_price(1e18, 1000, 10, {'from': relayer_account})
+
+    with reverts('timestamp is not newer'):
+        mirror.push_safe_price(0.99 * 1e18, 1000, 11, {'from': relayer_account})
+    with reverts('block is older'):
+        mirror.push_safe_price(0.99 * 1e18, 1001, 9, {'from': relayer_account})
+    with reverts():
+        mirror.push_safe_price(0, 1001, 11, {'from': relayer_account})
+
+    mirror.push_safe_price(0.99 * 1e18, 1001, 10, {'from': relayer_account})
+    assert mirror.safe_price_info() == (0.99 * 1e18, 1001, 10)
+
+
+def test_set_relayer(mirror, deployer, stranger, helpers):
+    with reverts():
+        mirror.set_relayer(stranger, {'from': stranger})
+
+    tx = mirror.set_relayer(stranger, {'from': deployer})
+
+    helpers.assert_single_event_named('RelayerChanged', tx, {'relayer': stranger})
+    mirror.push_safe_price(1e18, 1000, 10, {'from': stranger})
+
+
+def test_relayer_coalesces_updates(price_feed, mirror, curve_pool, stranger, make_relayer):
+    relayer = make_relayer()
+    for price in (0.99 * 1e18, 0.98 * 1e18, 0.97 * 1e18):
+        curve_pool.set_price(price)
+        tx = price_feed.update_safe_price({'from': stranger})
+        chain.sleep(10)
+
+    update = relayer.relay()
+
+    assert update.as_tuple() == (0.97 * 1e18, tx.timestamp, tx.block_number)
+    assert mirror.safe_price_info() == (0.97 * 1e18, tx.timestamp, tx.block_number)
+
+    # nothing new to push
+    assert relayer.relay() is None
+
+
+def test_relayer_pushes_heartbeats(price_feed, mirror, stranger, make_relayer):
+    price_feed.set_min_safe_price_change(10, {'from': price_feed.admin()})
+    price_feed.update_safe_price({'from': stranger})
+    relayer = make_relayer()
+    relayer.relay()
+
+    chain.sleep(60)
+    tx = price_feed.update_safe_price({'from': stranger})
+    update = relayer.relay()
+
+    # no event to take the block from, the price is read at the latest block
+    assert update.as_tuple() == (1e18, tx.timestamp, tx.block_number)
+    assert mirror.safe_price() == (1e18, tx.timestamp)
+
+
+def test_relayer_resumes_from_mirror(price_feed, mirror, curve_pool, stranger, make_relayer):
+    first = price_feed.update_safe_price({'from': stranger})
+    make_relayer().relay()
+
+    relayer = make_relayer()
+    assert relayer.relay() is None
+    assert relayer.next_block == chain.height + 1
+
+    curve_pool.set_price(0.98 * 1e18)
+    tx = price_feed.update_safe_price({'from': stranger})
+    assert relayer.relay().as_tuple() == (0.98 * 1e18, tx.timestamp, tx.block_number)
+    assert first.block_number < tx.block_number
+
+
+def test_relayer_survives_reverted_push(price_feed, mirror, deployer, stranger, relayer_account, make_relayer):
+    tx = price_feed.update_safe_price({'from': stranger})
+    relayer = make_relayer()
+
+    # the mirror rejects the pushes of the relayer account
+    mirror.set_relayer(stranger, {'from': deployer})
+    relayer.run(poll_interval=0, iterations=2)
+    assert mirror.safe_price_info() == (0, 0, 0)
+
+    mirror.set_relayer(relayer_account, {'from': deployer})
+    relayer.run(poll_interval=0, iterations=1)
+    assert mirror.safe_price_info() == (1e18, tx.timestamp, tx.block_number)
@@ -0,0 +1,193 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from brownie import chain, web3
+from eth_utils import function_abi_to_4byte_selector
+
+from utils.price_feed_client import PriceFeedClient, RpcError, load_abi, encode_abi
+
+
+FEED_ADDRESS = '0x' + '11' * 20
+
+
+class StubRpc:
+    """
+    A stand-in JSON-RPC node answering `eth_blockNumber` and `eth_call`
+    to the feed functions with canned results.
+    """
+
+    def __init__(self, results):
+        self.block_number = 100
+        self.http_requests = []
+        self.eth_calls = []
+        self.reverting = set()
+        # answers batch requests with a single error, as nodes rejecting a batch do
+        self.rejecting_batches = False
+        self._outputs = {}
+        for fn in load_abi():
+            if fn.get('type') == 'function':
+                selector = '0x' + function_abi_to_4byte_selector(fn).hex()
+                self._outputs[selector] = (fn['name'], [o['type'] for o in fn['outputs']])
+        self.results = results
+
+    def handle(self, request):
+        if request['method'] == 'eth_blockNumber':
+            return {'jsonrpc': '2.0', 'id': request['id'], 'result': hex(self.block_number)}
+        assert request['method'] == 'eth_call'
+        tx, block = request['params']
+        assert tx['to'].lower() == FEED_ADDRESS
+        name, output_types = self._outputs[tx['data'][:10]]
+        self.eth_calls.append((name, int(block, 16)))
+        if name in self.reverting:
+            return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32000, 'message': 'execution reverted'}}
+        result = encode_abi(output_types, list(self.results[name]))
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': '0x' + result.hex()}
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.http_requests.append(payload)
+                if isinstance(payload, list) and stub.rejecting_batches:
+                    response = {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32600, 'message': 'batch too large'}}
+                elif isinstance(payload, list):
+                    response = [stub.handle(request) for request in payload]
+                else:
+                    response = stub.handle(payload)
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(scope='function')
+def stub_rpc():
+    with StubRpc({
+        'safe_price': (98 * 10**16, 1600000000),
+        'current_price': (97 * 10**16, True),
+        'full_price_info': (97 * 10**16, True, 10**18),
+    }) as rpc:
+        yield rpc
+
+
+def test_prices_are_fetched_in_one_batch(stub_rpc):
+    client = PriceFeedClient(stub_rpc.url, FEED_ADDRESS)
+
+    assert client.prices() == [
+        (98 * 10**16, 1600000000),
+        (97 * 10**16, True),
+        (97 * 10**16, True, 10**18),
+    ]
+
+    # one request for the block number and one batch for the calls
+    assert len(stub_rpc.http_requests) == 2
+    assert len(stub_rpc.http_requests[1]) == 3
+    assert stub_rpc.eth_calls == [('safe_price', 100), ('current_price', 100), ('full_price_info', 100)]
+
+
+def test_results_are_cached_per_block(stub_rpc):
+    client = PriceFeedClient(stub_rpc.url, FEED_ADDRESS, block_number_max_age=0)
+
+    client.prices()
+    assert client.safe_price() == (98 * 10**16, 1600000000)
+    assert client.full_price_info() == (97 * 10**16, True, 10**18)
+    assert len(stub_rpc.eth_calls) == 3
+
+    stub_rpc.block_number = 101
+    stub_rpc.results['safe_price'] = (96 * 10**16, 1600000012)
+    assert client.safe_price() == (96 * 10**16, 1600000012)
+    assert stub_rpc.eth_calls[-1] == ('safe_price', 101)
+
+    # pinned reads of an older block are still served from the cache
+    assert client.safe_price(block_number=100) == (98 * 10**16, 1600000000)
+    assert len(stub_rpc.eth_calls) == 4
+
+
+def test_block_number_is_reused_within_max_age(stub_rpc):
+    client = PriceFeedClient(stub_rpc.url, FEED_ADDRESS, block_number_max_age=60)
+
+    client.safe_price()
+    client.safe_price()
+    client.current_price()
+
+    # block number, the first `safe_price` batch and the `current_price` batch
+    assert len(stub_rpc.http_requests) == 3
+
+
+def test_cache_evicts_least_recently_used(stub_rpc):
+    client = PriceFeedClient(stub_rpc.url, FEED_ADDRESS, cache_size=2)
+
+    client.safe_price(block_number=1)
+    client.safe_price(block_number=2)
+    client.safe_price(block_number=1)
+    client.safe_price(block_number=3)
+    assert len(stub_rpc.eth_calls) == 3
+
+    client.safe_price(block_number=1)
+    assert len(stub_rpc.eth_calls) == 3
+
+    client.safe_price(block_number=2)
+    assert len(stub_rpc.eth_calls) == 4
+
+
+def test_cache_hits_are_not_evicted_by_the_same_fetch(stub_rpc):
+    client = PriceFeedClient(stub_rpc.url, FEED_ADDRESS, cache_size=1)
+
+    client.safe_price(block_number=1)
+    assert client.fetch('safe_price', 'current_price', block_number=1) == [
+        (98 * 10**16, 1600000000),
+        (97 * 10**16, True),
+    ]
+    assert stub_rpc.eth_calls == [('safe_price', 1), ('current_price', 1)]
+
+
+def test_reverted_call_raises_and_is_not_cached(stub_rpc):
+    client = PriceFeedClient(stub_rpc.url, FEED_ADDRESS)
+    stub_rpc.reverting.add('safe_price')
+
+    with pytest.raises(RpcError):
+        client.safe_price(block_number=5)
+
+    stub_rpc.reverting.clear()
+    assert client.safe_price(block_number=5) == (98 * 10**16, 1600000000)
+
+
+def test_against_deployed_feed(deploy_price_feed, stable_swap_oracle, curve_pool, stranger):
+    price_feed = deploy_price_feed(max_safe_price_difference=500)
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+    price_feed.update_safe_price({'from': stranger})
+
+    client = PriceFeedClient(web3.provider.endpoint_uri, price_feed.address)
+
+    assert client.prices(block_number=chain.height) == [
+        price_feed.safe_price(),
+        price_feed.current_price(),
+        price_feed.full_price_info(),
+    ]
+
+
+def test_rejected_batch_raises(stub_rpc):
+    client = PriceFeedClient(stub_rpc.url, FEED_ADDRESS)
+    stub_rpc.rejecting_batches = True
+
+    with pytest.raises(RpcError, match='batch too large'):
+        client.prices(block_number=5)
@@ -0,0 +1,116 @@
+import pytest
+from brownie import chain, reverts
+
+
+@pytest.fixture(scope='function')
+def price_feed(deploy_price_feed, stable_swap_oracle, curve_pool):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(1e18)
+    return deploy_price_feed(max_safe_price_difference=500)
+
+
+def update_safe_price(price_feed, curve_pool, price, stranger):
+    curve_pool.set_price(price)
+    price_feed.update_safe_price({'from': stranger})
+    return chain[-1].timestamp
+
+
+def test_history_is_disabled_by_default(price_feed, curve_pool, stranger):
+    assert price_feed.price_history_capacity() == 0
+
+    update_safe_price(price_feed, curve_pool, 0.98 * 1e18, stranger)
+    assert price_feed.price_history_count() == 0
+
+    with reverts():
+        price_feed.twap(1)
+
+
+def test_initialize_price_history_acl(price_feed, stranger):
+    with reverts():
+        price_feed.initialize_price_history(10, {'from': stranger})
+
+
+def test_initialize_price_history_bounds(price_feed):
+    admin = price_feed.admin()
+    with reverts():
+        price_feed.initialize_price_history(0, {'from': admin})
+    with reverts():
+        price_feed.initialize_price_history(1025, {'from': admin})
+
+
+def test_initialize_price_history_once(price_feed, helpers):
+    admin = price_feed.admin()
+    tx = price_feed.initialize_price_history(10, {'from': admin})
+
+    helpers.assert_single_event_named('PriceHistoryInitialized', tx, {'capacity': 10})
+    assert price_feed.price_history_capacity() == 10
+
+    with reverts():
+        price_feed.initialize_price_history(20, {'from': admin})
+
+
+def test_initialize_price_history_seeds_cached_price(price_feed, curve_pool, stranger):
+    updated_at = update_safe_price(price_feed, curve_pool, 0.98 * 1e18, stranger)
+    price_feed.initialize_price_history(10, {'from': price_feed.admin()})
+
+    assert price_feed.price_history_count() == 1
+    chain.mine(timedelta=100)
+    assert price_feed.twap(1) == (0.98 * 1e18, updated_at)
+
+
+def test_twap(price_feed, curve_pool, stranger):
+    price_feed.initialize_price_history(10, {'from': price_feed.admin()})
+
+    t0 = update_safe_price(price_feed, curve_pool, 0.98 * 1e18, stranger)
+    chain.sleep(100)
+    t1 = update_safe_price(price_feed, curve_pool, 0.96 * 1e18, stranger)
+    chain.sleep(300)
+    t2 = update_safe_price(price_feed, curve_pool, 0.97 * 1e18, stranger)
+    chain.sleep(200)
+
+    assert price_feed.price_history_count() == 3
+
+    assert price_feed.twap(1) == (0.97 * 1e18, t2)
+
+    # sent as transactions to know the block timestamp the average is calculated at
+    tx = price_feed.twap.transact(2, {'from': stranger})
+    now = tx.timestamp
+    expected = (96 * 10**16 * (t2 - t1) + 97 * 10**16 * (now - t2)) // (now - t1)
+    assert tx.return_value == (expected, t1)
+
+    tx = price_feed.twap.transact(3, {'from': stranger})
+    now = tx.timestamp
+    expected = (
+        98 * 10**16 * (t1 - t0) + 96 * 10**16 * (t2 - t1) + 97 * 10**16 * (now - t2)
+    ) // (now - t0)
+    assert tx.return_value == (expected, t0)
+
+    with reverts():
+        price_feed.twap(4)
+
+    with reverts():
+        price_feed.twap(0)
+
+
+def test_twap_ring_buffer_wraps(price_feed, curve_pool, stranger):
+    price_feed.initialize_price_history(2, {'from': price_feed.admin()})
+
+    update_safe_price(price_feed, curve_pool, 0.98 * 1e18, stranger)
+    chain.sleep(100)
+    update_safe_price(price_feed, curve_pool, 0.96 * 1e18, stranger)
+    chain.sleep(100)
+    t2 = update_safe_price(price_feed, curve_pool, 0.97 * 1e18, stranger)
+    chain.sleep(100)
+    t3 = update_safe_price(price_feed, curve_pool, 0.99 * 1e18, stranger)
+
+    assert price_feed.price_history_count() == 4
+    assert price_feed.twap(1) == (0.99 * 1e18, t3)
+
+    tx = price_feed.twap.transact(2, {'from': stranger})
+    now = tx.timestamp
+    expected = (97 * 10**16 * (t3 - t2) + 99 * 10**16 * (now - t3)) // (now - t2)
+    assert tx.return_value == (expected, t2)
+
+    # only the last two updates are kept
+    with reverts():
+        price_feed.twap(3)
@@ -0,0 +1,74 @@
+import pytest
+from brownie import chain
+
+
+@pytest.fixture(scope='function')
+def price_feed(deploy_price_feed, stable_swap_oracle, curve_pool):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.99 * 1e18)
+    return deploy_price_feed(max_safe_price_difference=500)
+
+
+@pytest.fixture(scope='function')
+def reader(price_feed, deployer, RepeatedPriceReader):
+    return RepeatedPriceReader.deploy(price_feed, {'from': deployer})
+
+
+def reads(tx):
+    return [(event['price'], event['is_safe']) for event in tx.events['Test__PriceRead']]
+
+
+def test_snapshot_price_returns_current_price(price_feed, stranger):
+    tx = price_feed.snapshot_price({'from': stranger})
+
+    assert tx.return_value == (0.99 * 1e18, True)
+    assert price_feed.current_price() == (0.99 * 1e18, True)
+
+
+def test_snapshot_price_of_unsafe_price(price_feed, curve_pool, stranger):
+    curve_pool.set_price(0.9 * 1e18)
+
+    tx = price_feed.snapshot_price({'from': stranger})
+
+    assert tx.return_value == (0.9 * 1e18, False)
+
+
+def test_snapshots_in_block_return_first_snapshot(price_feed, reader, curve_pool, stranger):
+    tx = reader.snapshot_and_read_price_after_change(curve_pool, 0.9 * 1e18, {'from': stranger})
+
+    # `current_price()` doesn't read the snapshot
+    assert reads(tx) == [(0.9 * 1e18, False), (0.99 * 1e18, True)]
+
+    chain.mine()
+    tx = price_feed.snapshot_price({'from': stranger})
+    assert tx.return_value == (0.9 * 1e18, False)
+
+
+def test_repeated_reads_without_snapshot(reader, stranger):
+    tx = reader.read_prices(3, False, {'from': stranger})
+
+    assert reads(tx) == [(0.99 * 1e18, True)] * 3
+
+
+def test_repeated_reads_with_snapshot(reader, stranger):
+    tx = reader.read_prices(3, True, {'from': stranger})
+
+    assert reads(tx) == [(0.99 * 1e18, True)] * 3
+    gas_used = [event['gas_used'] for event in tx.events['Test__PriceRead']]
+    assert gas_used[1] < gas_used[0]
+
+
+def test_update_safe_price_doesnt_store_snapshot(price_feed, reader, curve_pool, stranger):
+    tx = reader.update_and_read_price_after_change(curve_pool, 0.9 * 1e18, {'from': stranger})
+
+    assert reads(tx) == [(0.9 * 1e18, False)]
+    assert price_feed.safe_price() == (0.99 * 1e18, tx.timestamp)
+
+
+def test_config_change_drops_snapshot(price_feed, reader, curve_pool, stranger):
+    curve_pool.set_price(0.97 * 1e18)
+    price_feed.set_admin(reader, {'from': price_feed.admin()})
+
+    tx = reader.snapshot_and_read_price_after_config_change(100, {'from': stranger})
+
+    assert reads(tx) == [(0.97 * 1e18, False)]
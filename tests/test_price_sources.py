@@ -0,0 +1,197 @@
+import pytest
+from brownie import reverts, ZERO_ADDRESS
+
+
+MAX_PRICE_SOURCES = 5
+GAS_LIMIT = 50000
+
+FETCH_STATUS_UNSAFE = 2
+
+
+@pytest.fixture(scope='function')
+def price_feed(deploy_price_feed, stable_swap_oracle, curve_pool):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.97 * 1e18)
+    return deploy_price_feed(max_safe_price_difference=500)
+
+
+@pytest.fixture(scope='function')
+def deploy_price_sources(deployer, PriceSourceMock):
+    def deploy(*prices):
+        return [PriceSourceMock.deploy(price, {'from': deployer}) for price in prices]
+    return deploy
+
+
+def set_price_sources(price_feed, sources, gas_limit=GAS_LIMIT, quorum=None):
+    padding = MAX_PRICE_SOURCES - len(sources)
+    return price_feed.set_price_sources(
+        list(sources) + [ZERO_ADDRESS] * padding,
+        [gas_limit] * len(sources) + [0] * padding,
+        len(sources) if quorum is None else quorum,
+        {'from': price_feed.admin()}
+    )
+
+
+def test_no_price_sources_by_default(price_feed):
+    assert price_feed.price_sources_count() == 0
+    assert price_feed.price_source_quorum() == 0
+    assert price_feed.price_sources() == ([ZERO_ADDRESS] * MAX_PRICE_SOURCES, [0] * MAX_PRICE_SOURCES)
+    assert price_feed.current_price() == (0.97 * 1e18, True)
+
+
+def test_set_price_sources_acl(price_feed, deploy_price_sources, stranger):
+    [source] = deploy_price_sources(1e18)
+    with reverts():
+        price_feed.set_price_sources(
+            [source] + [ZERO_ADDRESS] * 4,
+            [GAS_LIMIT] + [0] * 4,
+            1,
+            {'from': stranger}
+        )
+
+
+def test_set_price_sources(price_feed, deploy_price_sources, helpers):
+    sources = deploy_price_sources(0.99 * 1e18, 0.95 * 1e18)
+
+    tx = set_price_sources(price_feed, sources, quorum=1)
+
+    helpers.assert_single_event_named('PriceSourcesChanged', tx, {
+      'sources': [s.address for s in sources] + [ZERO_ADDRESS] * 3,
+      'gas_limits': [GAS_LIMIT] * 2 + [0] * 3,
+      'quorum': 1
+    })
+    assert price_feed.price_sources_count() == 2
+    assert price_feed.price_source_quorum() == 1
+    assert price_feed.price_sources() == (
+        [s.address for s in sources] + [ZERO_ADDRESS] * 3,
+        [GAS_LIMIT] * 2 + [0] * 3
+    )
+
+    set_price_sources(price_feed, sources[:1])
+
+    assert price_feed.price_sources_count() == 1
+    assert price_feed.price_sources() == (
+        [sources[0].address] + [ZERO_ADDRESS] * 4,
+        [GAS_LIMIT] + [0] * 4
+    )
+
+
+def test_set_price_sources_validation(price_feed, deploy_price_sources):
+    [source] = deploy_price_sources(1e18)
+    admin = price_feed.admin()
+
+    # sources must be contiguous
+    with reverts():
+        price_feed.set_price_sources([ZERO_ADDRESS, source, ZERO_ADDRESS, ZERO_ADDRESS, ZERO_ADDRESS], [0, GAS_LIMIT, 0, 0, 0], 1, {'from': admin})
+    # a gas stipend is required for every source and only for them
+    with reverts():
+        price_feed.set_price_sources([source] + [ZERO_ADDRESS] * 4, [0] * 5, 1, {'from': admin})
+    with reverts():
+        price_feed.set_price_sources([ZERO_ADDRESS] * 5, [GAS_LIMIT] + [0] * 4, 0, {'from': admin})
+    with reverts():
+        price_feed.set_price_sources([source] + [ZERO_ADDRESS] * 4, [200001] + [0] * 4, 1, {'from': admin})
+    # the quorum can't exceed the number of sources
+    with reverts():
+        price_feed.set_price_sources([source] + [ZERO_ADDRESS] * 4, [GAS_LIMIT] + [0] * 4, 2, {'from': admin})
+
+    price_feed.set_price_sources([source] + [ZERO_ADDRESS] * 4, [200000] + [0] * 4, 1, {'from': admin})
+
+
+@pytest.mark.parametrize('source_prices,expected_price', [
+    # prices in basis points, the pool price is 9700
+    ([9900], 9800),
+    ([9900, 9500], 9700),
+    ([9900, 9500, 9600], 9650),
+    ([9900, 9500, 9600, 9800], 9700),
+    ([9900, 9500, 9600, 9800, 9400], 9650),
+    ([9000, 9100, 9200, 9300, 9400], 9250),
+])
+def test_current_price_is_median(price_feed, deploy_price_sources, stranger, source_prices, expected_price):
+    sources = deploy_price_sources(*[price * 10**14 for price in source_prices])
+    set_price_sources(price_feed, sources)
+
+    assert price_feed.full_price_info() == (expected_price * 10**14, True, 1e18)
+
+    tx = price_feed.update_safe_price({'from': stranger})
+    assert tx.return_value == expected_price * 10**14
+
+
+def test_median_is_checked_against_anchor(price_feed, deploy_price_sources, stranger):
+    # the pool price alone is safe, but the median isn't
+    sources = deploy_price_sources(0.90 * 1e18, 0.91 * 1e18)
+    set_price_sources(price_feed, sources)
+
+    assert price_feed.current_price() == (0.91 * 1e18, False)
+    with reverts('price is not safe'):
+        price_feed.update_safe_price({'from': stranger})
+
+
+def test_removing_price_sources(price_feed, deploy_price_sources):
+    set_price_sources(price_feed, deploy_price_sources(0.99 * 1e18))
+    assert price_feed.current_price() == (0.98 * 1e18, True)
+
+    set_price_sources(price_feed, [])
+
+    assert price_feed.price_sources_count() == 0
+    assert price_feed.current_price() == (0.97 * 1e18, True)
+
+
+def test_price_source_gas_stipend(price_feed, deploy_price_sources):
+    [source] = deploy_price_sources(0.99 * 1e18)
+    # makes `get_price` cost more than 50000 gas
+    source.set_extra_reads(100)
+
+    # the source runs out of its stipend and is skipped
+    set_price_sources(price_feed, [source], gas_limit=GAS_LIMIT)
+    assert price_feed.current_price() == (0.97 * 1e18, False)
+
+    set_price_sources(price_feed, [source], gas_limit=200000)
+    assert price_feed.current_price() == (0.98 * 1e18, True)
+
+
+def test_failing_price_sources_are_skipped(price_feed, deploy_price_sources, stranger):
+    sources = deploy_price_sources(0.99 * 1e18, 0.95 * 1e18, 0.96 * 1e18)
+    set_price_sources(price_feed, sources, quorum=1)
+    assert price_feed.full_price_info() == (0.965 * 1e18, True, 1e18)
+
+    sources[0].set_reverts(True, {'from': stranger})
+    assert price_feed.full_price_info() == (0.96 * 1e18, True, 1e18)
+
+    # runs out of its stipend
+    sources[1].set_extra_reads(100, {'from': stranger})
+    assert price_feed.full_price_info() == (0.965 * 1e18, True, 1e18)
+
+    tx = price_feed.update_safe_price({'from': stranger})
+    assert tx.return_value == 0.965 * 1e18
+
+
+def test_price_source_quorum(price_feed, deploy_price_sources, stranger):
+    sources = deploy_price_sources(0.99 * 1e18, 0.95 * 1e18)
+    set_price_sources(price_feed, sources, quorum=2)
+
+    sources[0].set_reverts(True, {'from': stranger})
+
+    # the median of the responding sources is still reported, but not as a safe price
+    assert price_feed.current_price() == (0.96 * 1e18, False)
+    with reverts('price is not safe'):
+        price_feed.update_safe_price({'from': stranger})
+    tx = price_feed.try_fetch_safe_price(0, {'from': stranger})
+    assert tx.return_value == (0, 0, FETCH_STATUS_UNSAFE)
+
+    set_price_sources(price_feed, sources, quorum=1)
+    assert price_feed.current_price() == (0.96 * 1e18, True)
+
+
+def test_non_contract_price_source_is_skipped(price_feed, stranger):
+    set_price_sources(price_feed, [stranger], quorum=0)
+
+    assert price_feed.current_price() == (0.97 * 1e18, True)
+
+
+def test_price_sources_need_their_stipends(price_feed, deploy_price_sources, stranger):
+    sources = deploy_price_sources(0.99 * 1e18, 0.95 * 1e18)
+    set_price_sources(price_feed, sources, gas_limit=200000, quorum=0)
+
+    # a source must not be skipped because the caller didn't pass enough gas for its stipend
+    with reverts('not enough gas for price sources'):
+        price_feed.update_safe_price({'from': stranger, 'gas_limit': 150000})
@@ -1,5 +1,5 @@
 import pytest
-from brownie import reverts, Contract, PriceFeedProxy
+from brownie import chain, reverts, web3, Contract, PriceFeedProxy
 
 
 @pytest.fixture(scope='function')
@@ -98,3 +98,92 @@ def test_set_proxy_admin_fails_by_stranger(price_feed, stranger):
 
     with reverts('ERC1967: unauthorized'):
         feed_proxy.changeProxyAdmin(stranger, {'from': stranger})
+
+
+def test_upgrade_from_v1_migrates_safe_price(
+    deployer,
+    stable_swap_oracle,
+    curve_pool,
+    stranger,
+    StEthPriceFeed,
+    StEthPriceFeedV1
+):
+    v1_impl = StEthPriceFeedV1.deploy({'from': deployer})
+    proxy = PriceFeedProxy.deploy(v1_impl, 500, stable_swap_oracle, curve_pool, deployer, {'from': deployer})
+    price_feed = Contract.from_abi('StEthPriceFeed', proxy.address, StEthPriceFeed.abi)
+
+    curve_pool.set_price(0.98 * 1e18)
+    stable_swap_oracle.set_price(1e18)
+    price_feed.update_safe_price({'from': stranger})
+    prev_safe_price = price_feed.safe_price()
+
+    new_feed_impl = StEthPriceFeed.deploy({'from': deployer})
+    calldata = new_feed_impl.finalize_upgrade_v2.encode_input()
+    proxy.upgradeTo(new_feed_impl, calldata, {'from': deployer})
+
+    assert proxy.implementation() == new_feed_impl
+    assert price_feed.safe_price() == prev_safe_price
+    assert price_feed.safe_price_value() == 0.98 * 1e18
+    assert price_feed.safe_price_timestamp() == prev_safe_price[1]
+
+    # the migration is a no-op once done
+    price_feed.finalize_upgrade_v2({'from': stranger})
+    assert price_feed.safe_price() == prev_safe_price
+
+    curve_pool.set_price(0.97 * 1e18)
+    price_feed.update_safe_price({'from': stranger})
+    assert price_feed.safe_price_value() == 0.97 * 1e18
+
+
+def test_finalize_upgrade_v2_keeps_v2_price(
+    deployer,
+    stable_swap_oracle,
+    curve_pool,
+    stranger,
+    StEthPriceFeed,
+    StEthPriceFeedV1
+):
+    v1_impl = StEthPriceFeedV1.deploy({'from': deployer})
+    proxy = PriceFeedProxy.deploy(v1_impl, 500, stable_swap_oracle, curve_pool, deployer, {'from': deployer})
+    price_feed = Contract.from_abi('StEthPriceFeed', proxy.address, StEthPriceFeed.abi)
+
+    curve_pool.set_price(0.98 * 1e18)
+    stable_swap_oracle.set_price(1e18)
+    price_feed.update_safe_price({'from': stranger})
+
+    # upgraded without the setup call, the v1 price stays in the legacy slots
+    new_feed_impl = StEthPriceFeed.deploy({'from': deployer})
+    proxy.upgradeTo(new_feed_impl, b'', {'from': deployer})
+    chain.sleep(100)
+    curve_pool.set_price(0.97 * 1e18)
+    price_feed.update_safe_price({'from': stranger})
+    v2_safe_price = price_feed.safe_price()
+
+    price_feed.finalize_upgrade_v2({'from': stranger})
+    assert price_feed.safe_price() == v2_safe_price
+    assert web3.eth.get_storage_at(proxy.address, 2) == web3.eth.get_storage_at(proxy.address, 3) == b'\x00' * 32
+
+    price_feed.finalize_upgrade_v2({'from': stranger})
+    assert price_feed.safe_price() == v2_safe_price
+
+
+def test_upgrade_from_v1_without_cached_price(
+    deployer,
+    stable_swap_oracle,
+    curve_pool,
+    stranger,
+    StEthPriceFeed,
+    StEthPriceFeedV1
+):
+    v1_impl = StEthPriceFeedV1.deploy({'from': deployer})
+    proxy = PriceFeedProxy.deploy(v1_impl, 500, stable_swap_oracle, curve_pool, deployer, {'from': deployer})
+    price_feed = Contract.from_abi('StEthPriceFeed', proxy.address, StEthPriceFeed.abi)
+
+    new_feed_impl = StEthPriceFeed.deploy({'from': deployer})
+    proxy.upgradeTo(new_feed_impl, new_feed_impl.finalize_upgrade_v2.encode_input(), {'from': deployer})
+
+    with reverts():
+        price_feed.safe_price()
+
+    assert price_feed.safe_price_timestamp() == 0
+    assert price_feed.max_safe_price_difference() == 500
@@ -0,0 +1,81 @@
+import pytest
+from brownie import reverts, Contract, PriceFeedProxy, PriceFeedProxyFactory
+
+from scripts.deploy import deploy_price_feed
+
+
+@pytest.fixture(scope='module')
+def factory(deployer, price_feed_implementation):
+    return PriceFeedProxyFactory.deploy(price_feed_implementation, {'from': deployer})
+
+
+def deploy_with_factory(factory, stable_swap_oracle, curve_pool, admin, deployer, max_safe_price_difference=500):
+    return deploy_price_feed(
+        max_safe_price_difference,
+        stable_swap_oracle,
+        curve_pool,
+        admin,
+        {'from': deployer},
+        factory=factory
+    )
+
+
+def test_factory_requires_contract(deployer, stranger):
+    with reverts('PriceFeedProxyFactory: not a contract'):
+        PriceFeedProxyFactory.deploy(stranger, {'from': deployer})
+
+
+def test_deploys_initialized_proxies(
+    factory,
+    price_feed_implementation,
+    stable_swap_oracle,
+    curve_pool,
+    deployer,
+    stranger,
+    helpers
+):
+    first = deploy_with_factory(factory, stable_swap_oracle, curve_pool, stranger, deployer)
+    second = deploy_with_factory(factory, stable_swap_oracle, curve_pool, deployer, deployer, 100)
+
+    assert first.address != second.address
+    for price_feed, admin, max_safe_price_difference in [(first, stranger, 500), (second, deployer, 100)]:
+        proxy = Contract.from_abi('PriceFeedProxy', price_feed.address, PriceFeedProxy.abi)
+        assert proxy.implementation() == price_feed_implementation
+        assert proxy.getProxyAdmin() == admin
+        assert price_feed.admin() == admin
+        assert price_feed.max_safe_price_difference() == max_safe_price_difference
+        assert price_feed.stable_swap_oracle_address() == stable_swap_oracle
+        assert price_feed.curve_pool_address() == curve_pool
+
+        # initialized in the deployment transaction, so it can't be taken over
+        with reverts():
+            price_feed.initialize(1000, stable_swap_oracle, curve_pool, stranger, {'from': stranger})
+
+    tx = factory.deployPriceFeed(500, stable_swap_oracle, curve_pool, stranger, {'from': stranger})
+    helpers.assert_single_event_named('PriceFeedDeployed', tx, {
+        'priceFeed': tx.return_value,
+        'admin': stranger,
+    })
+
+
+def test_proxies_are_upgraded_separately(
+    factory,
+    price_feed_implementation,
+    stable_swap_oracle,
+    curve_pool,
+    deployer,
+    NewStEthPriceFeed
+):
+    first = deploy_with_factory(factory, stable_swap_oracle, curve_pool, deployer, deployer)
+    second = deploy_with_factory(factory, stable_swap_oracle, curve_pool, deployer, deployer)
+
+    new_implementation = NewStEthPriceFeed.deploy({'from': deployer})
+    Contract.from_abi('PriceFeedProxy', first.address, PriceFeedProxy.abi).upgradeTo(
+        new_implementation,
+        b'',
+        {'from': deployer}
+    )
+
+    assert Contract.from_abi('PriceFeedProxy', first.address, PriceFeedProxy.abi).implementation() == new_implementation
+    assert Contract.from_abi('PriceFeedProxy', second.address, PriceFeedProxy.abi).implementation() == price_feed_implementation
+    assert factory.implementation() == price_feed_implementation
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+from brownie import reverts
+
+from utils.price_math import percentage_diff, has_changed_unsafely, is_safe_price
+
+np = pytest.importorskip('numpy')
+safety_backtest = pytest.importorskip('utils.safety_backtest')
+
+
+def random_rows(seed, count, max_safe_price_difference=500):
+    rng = random.Random(seed)
+    pool_prices = []
+    oracle_prices = []
+    for i in range(count):
+        oracle_price = rng.randint(85 * 10**16, 105 * 10**16)
+        if i % 4 == 0:
+            # right at the threshold, where rounding matters
+            boundary = oracle_price * max_safe_price_difference // 10000
+            pool_price = oracle_price + rng.choice([-1, 1]) * (boundary + rng.randint(-2, 2))
+        else:
+            pool_price = rng.randint(85 * 10**16, 105 * 10**16)
+        pool_prices.append(pool_price)
+        oracle_prices.append(oracle_price)
+    return pool_prices, oracle_prices
+
+
+def test_percentage_diff_matches_scalar():
+    pool_prices, oracle_prices = random_rows(1, 10000)
+    diffs = safety_backtest.percentage_diff(pool_prices, oracle_prices)
+
+    assert diffs.dtype == np.uint64
+    assert diffs.tolist() == [percentage_diff(new, old) for new, old in zip(pool_prices, oracle_prices)]
+
+
+def test_percentage_diff_of_large_prices():
+    pool_prices, oracle_prices = random_rows(2, 1000)
+    pool_prices = [price * 10**3 for price in pool_prices]
+    oracle_prices = [price * 10**3 for price in oracle_prices]
+    diffs = safety_backtest.percentage_diff(pool_prices, oracle_prices)
+
+    assert list(diffs) == [percentage_diff(new, old) for new, old in zip(pool_prices, oracle_prices)]
+
+
+def test_unsafe_fractions():
+    pool_prices, oracle_prices = random_rows(3, 5000)
+    thresholds = [0, 100, 499, 500, 501, 1000]
+    fractions = safety_backtest.unsafe_fractions(pool_prices, oracle_prices, thresholds)
+
+    for threshold in thresholds:
+        rows = list(zip(pool_prices, oracle_prices))
+        expected_reverts = sum(has_changed_unsafely(p, o, threshold) for p, o in rows) / len(rows)
+        expected_not_safe = sum(not is_safe_price(p, o, threshold) for p, o in rows) / len(rows)
+        assert fractions[threshold] == pytest.approx((expected_reverts, expected_not_safe), abs=1e-12)
+
+
+def test_replay_safe_price():
+    pool_prices, oracle_prices = random_rows(4, 2000)
+    timestamps = list(range(1600000000, 1600000000 + 13 * 2000, 13))
+    safe_prices, safe_price_timestamps = safety_backtest.replay_safe_price(
+        pool_prices, oracle_prices, timestamps, 300
+    )
+
+    safe_price, safe_price_timestamp = 0, 0
+    for i, (pool_price, oracle_price) in enumerate(zip(pool_prices, oracle_prices)):
+        if not has_changed_unsafely(pool_price, oracle_price, 300):
+            safe_price, safe_price_timestamp = min(pool_price, 10**18), timestamps[i]
+        assert (int(safe_prices[i]), int(safe_price_timestamps[i])) == (safe_price, safe_price_timestamp)
+
+
+@pytest.mark.parametrize('max_safe_price_difference', [100, 500])
+def test_matches_contract(deploy_price_feed, stable_swap_oracle, curve_pool, stranger, max_safe_price_difference):
+    price_feed = deploy_price_feed(max_safe_price_difference=max_safe_price_difference)
+    pool_prices, oracle_prices = random_rows(5, 40, max_safe_price_difference)
+    has_changed_unsafely, is_safe = safety_backtest.evaluate(
+        pool_prices, oracle_prices, max_safe_price_difference
+    )
+
+    for i, (pool_price, oracle_price) in enumerate(zip(pool_prices, oracle_prices)):
+        curve_pool.set_price(pool_price)
+        stable_swap_oracle.set_price(oracle_price)
+
+        assert price_feed.full_price_info() == (pool_price, bool(is_safe[i]), oracle_price)
+
+        if has_changed_unsafely[i]:
+            with reverts('price is not safe'):
+                price_feed.update_safe_price({'from': stranger})
+        else:
+            price_feed.update_safe_price({'from': stranger})
+            assert price_feed.safe_price_value() == min(pool_price, 10**18)
@@ -0,0 +1,116 @@
+import random
+
+import pytest
+
+from scripts.simulate import replay_on_chain
+from utils.stableswap import (
+    StableSwapPool, PoolSnapshot, get_D, replay_snapshots, load_snapshots, ETH_INDEX, STETH_INDEX
+)
+
+
+AMP = 5000
+FEE = 4000000
+
+
+def random_states(seed, count):
+    rng = random.Random(seed)
+    for _ in range(count):
+        balances = [rng.randint(10**20, 10**25), rng.randint(10**20, 10**25)]
+        yield balances, rng.choice([100, 1000, AMP, 10000, 20000]), rng.randint(0, 10**8)
+
+
+def depeg_snapshots(count):
+    # stETH is sold into a balanced pool in equal chunks while the oracle lags behind
+    pool = StableSwapPool([10**24, 10**24], AMP, FEE)
+    snapshots = []
+    oracle_price = pool.steth_price()
+    for i in range(count):
+        snapshots.append(PoolSnapshot(1_600_000_000 + i * 60, list(pool.balances), AMP, FEE, oracle_price))
+        if i % 3 == 2:
+            oracle_price = pool.steth_price()
+        pool.exchange(STETH_INDEX, ETH_INDEX, 5 * 10**22)
+    return snapshots
+
+
+@pytest.fixture(scope='function')
+def stable_swap_pool(deployer, StableSwapPoolMock):
+    return StableSwapPoolMock.deploy([10**24, 10**24], AMP, FEE, {'from': deployer})
+
+
+def test_balanced_pool_price():
+    pool = StableSwapPool([10**24, 10**24], AMP, FEE)
+    price = pool.steth_price()
+    # the fee is 0.04%
+    assert 9995 * 10**14 < price < 9996 * 10**14
+
+
+def test_price_decreases_with_steth_balance():
+    prices = [StableSwapPool([10**24, steth * 10**23], AMP, FEE).steth_price() for steth in range(10, 40, 5)]
+    assert prices == sorted(prices, reverse=True)
+
+
+def test_exchange_keeps_invariant():
+    pool = StableSwapPool([10**24, 10**24], AMP, 0)
+    D = get_D(pool.balances, AMP)
+    dy = pool.get_dy(STETH_INDEX, ETH_INDEX, 10**22)
+
+    assert pool.exchange(STETH_INDEX, ETH_INDEX, 10**22) == dy
+    assert pool.balances[STETH_INDEX] == 10**24 + 10**22
+    assert abs(get_D(pool.balances, AMP) - D) <= 2
+
+
+def test_load_snapshots(tmp_path):
+    path = tmp_path / 'snapshots.csv'
+    path.write_text(
+        'timestamp,eth_balance,steth_balance,amp,fee,oracle_price\n'
+        f'1600000000,{10**24},{10**24},{AMP},{FEE},{10**18}\n'
+    )
+    [snapshot] = load_snapshots(path)
+
+    assert snapshot.timestamp == 1600000000
+    assert snapshot.balances == [10**24, 10**24]
+    assert (snapshot.amp, snapshot.fee, snapshot.oracle_price) == (AMP, FEE, 10**18)
+
+
+def test_replay_snapshots():
+    snapshots = depeg_snapshots(20)
+    result = replay_snapshots(snapshots, 100)
+
+    assert result[0] == (snapshots[0].pool().steth_price(), True, snapshots[0].pool().steth_price(), snapshots[0].timestamp)
+    for (pool_price, is_safe, safe_price, safe_price_timestamp), snapshot in zip(result, snapshots):
+        if is_safe:
+            assert (safe_price, safe_price_timestamp) == (pool_price, snapshot.timestamp)
+    # the oracle falls behind at some point
+    assert not all(is_safe for _, is_safe, _, _ in result)
+
+
+def test_mock_matches_model(stable_swap_pool, stranger):
+    for balances, amp, fee in random_states(1, 10):
+        stable_swap_pool.set_state(balances, amp, fee, {'from': stranger})
+        model = StableSwapPool(balances, amp, fee)
+        for dx in (10**18, 10**21, balances[STETH_INDEX] // 3):
+            assert stable_swap_pool.get_dy(STETH_INDEX, ETH_INDEX, dx) == model.get_dy(STETH_INDEX, ETH_INDEX, dx)
+            assert stable_swap_pool.get_dy(ETH_INDEX, STETH_INDEX, dx) == model.get_dy(ETH_INDEX, STETH_INDEX, dx)
+
+
+def test_price_for_amounts_follows_curve(stable_swap_pool, stable_swap_oracle, deployer, StEthPriceFeed):
+    price_feed = StEthPriceFeed.deploy({'from': deployer})
+    price_feed.initialize(1000, stable_swap_oracle, stable_swap_pool, deployer, {'from': deployer})
+    balances = [10**24, 12 * 10**23]
+    stable_swap_pool.set_state(balances, AMP, FEE, {'from': deployer})
+    model = StableSwapPool(balances, AMP, FEE)
+    stable_swap_oracle.set_price(model.steth_price())
+
+    amounts = [10**18, 10**21, 10**22, 10**23, 0, 0, 0, 0]
+    prices, is_safe, _ = price_feed.price_for_amounts(amounts)
+
+    assert prices[:4] == [model.steth_price(amount) for amount in amounts[:4]]
+    # the larger the amount, the worse the price
+    assert prices[:4] == sorted(prices[:4], reverse=True)
+    assert is_safe[0]
+
+
+def test_feed_replay_matches_model(deployer):
+    snapshots = depeg_snapshots(15)
+    expected = [row[:3] for row in replay_snapshots(snapshots, 100)]
+    assert replay_on_chain(snapshots, 100, {'from': deployer}) == expected
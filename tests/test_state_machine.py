@@ -0,0 +1,148 @@
+import os
+
+import pytest
+from brownie import chain, reverts, Contract, PriceFeedProxy
+from brownie.test import strategy
+
+from utils.price_math import has_changed_unsafely, capped_safe_price
+
+
+# every shard runs an independent Hypothesis search with its own random seed; the shards are
+# spread over the workers by `brownie test -n auto`, each of them using its own ganache instance
+FUZZ_SHARDS = int(os.environ.get('FUZZ_SHARDS', '1'))
+FUZZ_MAX_EXAMPLES = int(os.environ.get('FUZZ_MAX_EXAMPLES', '50'))
+FUZZ_STATEFUL_STEP_COUNT = int(os.environ.get('FUZZ_STATEFUL_STEP_COUNT', '20'))
+
+ONE_HOUR = 60 * 60
+
+
+class StateMachine:
+    st_price = strategy('uint256', min_value=80 * 10**16, max_value=110 * 10**16)
+    st_max_safe_price_difference = strategy('uint256', max_value=1200)
+    st_max_age = strategy('uint256', max_value=2 * ONE_HOUR)
+    st_sleep = strategy('uint256', max_value=2 * ONE_HOUR)
+    st_implementation = strategy('uint256', max_value=2)
+
+    def __init__(cls, price_feed, implementations, curve_pool, stable_swap_oracle, stranger):
+        cls.price_feed = price_feed
+        cls.proxy = Contract.from_abi('PriceFeedProxy', price_feed.address, PriceFeedProxy.abi)
+        cls.implementations = implementations
+        cls.curve_pool = curve_pool
+        cls.stable_swap_oracle = stable_swap_oracle
+        cls.stranger = stranger
+
+    def setup(self):
+        self.pool_price = self.curve_pool.price()
+        self.oracle_price = self.stable_swap_oracle.stethPrice()
+        self.max_safe_price_difference = self.price_feed.max_safe_price_difference()
+        self.safe_price = 0
+        self.safe_price_timestamp = 0
+        self.last_seen_timestamp = 0
+
+    def can_update(self):
+        return not has_changed_unsafely(self.pool_price, self.oracle_price, self.max_safe_price_difference)
+
+    def expect_update(self, tx):
+        self.safe_price = capped_safe_price(self.pool_price)
+        self.safe_price_timestamp = tx.timestamp
+        assert tx.events['SafePriceUpdated']['to_price'] == self.safe_price
+
+    def rule_set_pool_price(self, st_price):
+        self.curve_pool.set_price(st_price, {'from': self.stranger})
+        self.pool_price = st_price
+
+    def rule_set_oracle_price(self, st_price):
+        self.stable_swap_oracle.set_price(st_price, {'from': self.stranger})
+        self.oracle_price = st_price
+
+    def rule_sleep(self, st_sleep):
+        chain.sleep(st_sleep)
+
+    def rule_update_safe_price(self):
+        if self.can_update():
+            tx = self.price_feed.update_safe_price({'from': self.stranger})
+            self.expect_update(tx)
+            assert tx.return_value == self.safe_price
+        else:
+            with reverts('price is not safe'):
+                self.price_feed.update_safe_price({'from': self.stranger})
+
+    def rule_fetch_safe_price(self, st_max_age):
+        # the timestamp of the next block is only known up to a couple of seconds
+        age = chain.time() - self.safe_price_timestamp
+        has_price = self.safe_price_timestamp != 0
+        if has_price and age + 2 <= st_max_age:
+            tx = self.price_feed.fetch_safe_price(st_max_age, {'from': self.stranger})
+            assert 'SafePriceUpdated' not in tx.events
+            assert tx.return_value == (self.safe_price, self.safe_price_timestamp)
+        elif self.can_update():
+            tx = self.price_feed.fetch_safe_price(st_max_age, {'from': self.stranger})
+            if 'SafePriceUpdated' in tx.events:
+                self.expect_update(tx)
+            assert tx.return_value == (self.safe_price, self.safe_price_timestamp)
+        elif not has_price or age - 2 > st_max_age:
+            with reverts('price is not safe'):
+                self.price_feed.fetch_safe_price(st_max_age, {'from': self.stranger})
+
+    def rule_set_max_safe_price_difference(self, st_max_safe_price_difference):
+        admin = self.price_feed.admin()
+        if st_max_safe_price_difference <= 1000:
+            self.price_feed.set_max_safe_price_difference(st_max_safe_price_difference, {'from': admin})
+            self.max_safe_price_difference = st_max_safe_price_difference
+        else:
+            with reverts():
+                self.price_feed.set_max_safe_price_difference(st_max_safe_price_difference, {'from': admin})
+
+    def rule_upgrade(self, st_implementation):
+        implementation = self.implementations[st_implementation]
+        setup_calldata = implementation.finalize_upgrade_v2.encode_input()
+        self.proxy.upgradeTo(implementation, setup_calldata, {'from': self.proxy.getProxyAdmin()})
+
+    def invariant_cached_price(self):
+        safe_price = self.price_feed.safe_price_value()
+        safe_price_timestamp = self.price_feed.safe_price_timestamp()
+
+        assert safe_price <= 10**18
+        assert safe_price_timestamp >= self.last_seen_timestamp
+        assert (safe_price, safe_price_timestamp) == (self.safe_price, self.safe_price_timestamp)
+        self.last_seen_timestamp = safe_price_timestamp
+
+    def invariant_config(self):
+        assert self.price_feed.max_safe_price_difference() == self.max_safe_price_difference
+        assert self.price_feed.curve_pool_address() == self.curve_pool
+        assert self.price_feed.stable_swap_oracle_address() == self.stable_swap_oracle
+
+
+@pytest.mark.parametrize('shard', range(FUZZ_SHARDS))
+def test_state_machine(
+    shard,
+    state_machine,
+    deploy_price_feed,
+    deployer,
+    stranger,
+    curve_pool,
+    stable_swap_oracle,
+    StEthPriceFeed,
+    StEthPriceFeedImmutable
+):
+    price_feed = deploy_price_feed(max_safe_price_difference=500)
+    implementations = [
+        Contract.from_abi('PriceFeedProxy', price_feed.address, PriceFeedProxy.abi).implementation(),
+        StEthPriceFeed.deploy({'from': deployer}),
+        StEthPriceFeedImmutable.deploy(stable_swap_oracle, curve_pool, {'from': deployer}),
+    ]
+    implementations[0] = StEthPriceFeed.at(implementations[0])
+
+    state_machine(
+        StateMachine,
+        price_feed,
+        implementations,
+        curve_pool,
+        stable_swap_oracle,
+        stranger,
+        settings={
+            'max_examples': FUZZ_MAX_EXAMPLES,
+            'stateful_step_count': FUZZ_STATEFUL_STEP_COUNT,
+            'deadline': None,
+        }
+    )
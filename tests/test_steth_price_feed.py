@@ -254,6 +254,108 @@ def test_fetch_safe_price_doesnt_fetch_until_expired(
     })
 
 
+FETCH_STATUS_CACHED = 0
+FETCH_STATUS_UPDATED = 1
+FETCH_STATUS_UNSAFE = 2
+
+
+def test_try_fetch_safe_price_doesnt_revert_without_cached_price(
+    stable_swap_oracle,
+    curve_pool,
+    price_feed,
+    stranger,
+    helpers,
+    PriceFetchResultHelper
+):
+    helper = PriceFetchResultHelper.deploy(price_feed, {'from': stranger})
+
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.90 * 1e18)
+
+    tx = helper.try_fetch_safe_price(60 * 60, {'from': stranger})
+
+    helpers.assert_no_events_named('SafePriceUpdated', tx)
+    helpers.assert_single_event_named('Test__PriceTryFetchResult', tx, {
+      'safe_price': 0,
+      'updated_at': 0,
+      'status': FETCH_STATUS_UNSAFE
+    })
+
+    with reverts():
+        price_feed.safe_price()
+
+
+def test_try_fetch_safe_price_returns_stale_price_instead_of_reverting(
+    stable_swap_oracle,
+    curve_pool,
+    price_feed,
+    stranger,
+    helpers,
+    PriceFetchResultHelper
+):
+    # calls `price_feed.try_fetch_safe_price` and logs the result to the `Test__PriceTryFetchResult` event
+    helper = PriceFetchResultHelper.deploy(price_feed, {'from': stranger})
+
+    curve_pool.set_price(1e18)
+    stable_swap_oracle.set_price(1e18)
+
+    one_hour = 60 * 60
+    tx = helper.try_fetch_safe_price(one_hour, {'from': stranger})
+    updated_at = chain[-1].timestamp
+
+    helpers.assert_single_event_named('SafePriceUpdated', tx, source=price_feed, evt_keys_dict={
+      'from_price': 0,
+      'to_price': 1e18
+    })
+    helpers.assert_single_event_named('Test__PriceTryFetchResult', tx, {
+      'safe_price': 1e18,
+      'updated_at': updated_at,
+      'status': FETCH_STATUS_UPDATED
+    })
+
+    # set an unsafe price
+    curve_pool.set_price(0.90 * 1e18)
+
+    tx = helper.try_fetch_safe_price(one_hour, {'from': stranger})
+
+    helpers.assert_no_events_named('SafePriceUpdated', tx)
+    helpers.assert_single_event_named('Test__PriceTryFetchResult', tx, {
+      'safe_price': 1e18,
+      'updated_at': updated_at,
+      'status': FETCH_STATUS_CACHED
+    })
+
+    chain.mine(timedelta = one_hour + 1)
+
+    tx = helper.try_fetch_safe_price(one_hour, {'from': stranger})
+
+    helpers.assert_no_events_named('SafePriceUpdated', tx)
+    helpers.assert_single_event_named('Test__PriceTryFetchResult', tx, {
+      'safe_price': 1e18,
+      'updated_at': updated_at,
+      'status': FETCH_STATUS_UNSAFE
+    })
+
+    assert price_feed.safe_price() == (1e18, updated_at)
+
+    pool_price = 0.96 * 1e18
+    curve_pool.set_price(pool_price)
+
+    tx = helper.try_fetch_safe_price(one_hour, {'from': stranger})
+
+    helpers.assert_single_event_named('SafePriceUpdated', tx, source=price_feed, evt_keys_dict={
+      'from_price': 1e18,
+      'to_price': pool_price
+    })
+    helpers.assert_single_event_named('Test__PriceTryFetchResult', tx, {
+      'safe_price': pool_price,
+      'updated_at': chain[-1].timestamp,
+      'status': FETCH_STATUS_UPDATED
+    })
+
+    assert price_feed.safe_price() == (pool_price, chain[-1].timestamp)
+
+
 def test_set_max_safe_price_difference_acl(price_feed, stranger):
     with reverts():
         price_feed.set_max_safe_price_difference(1000, {'from': stranger})
@@ -309,3 +411,88 @@ def test_set_admin(price_feed, accounts, stranger, helpers):
     helpers.assert_single_event_named('AdminChanged', tx, {
       'admin': old_admin,
     })
+
+
+def pad_amounts(amounts):
+    return amounts + [0] * (8 - len(amounts))
+
+
+def test_price_for_amounts(stable_swap_oracle, curve_pool, price_feed):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+
+    amounts = pad_amounts([1e18, 100 * 1e18, 3])
+    (prices, is_safe, anchor_price) = price_feed.price_for_amounts(amounts)
+
+    assert anchor_price == 1e18
+    # 0.98 * 3 is rounded down to 2, which is way off the anchor price
+    assert prices == pad_amounts([0.98 * 1e18, 0.98 * 1e18, 2 * 10**18 // 3])
+    assert is_safe == [True, True, False] + [False] * 5
+
+
+def test_price_for_amounts_stops_at_zero_amount(stable_swap_oracle, curve_pool, price_feed):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+
+    (prices, is_safe, _) = price_feed.price_for_amounts(pad_amounts([1e18, 0, 1e18]))
+
+    assert prices == pad_amounts([0.98 * 1e18])
+    assert is_safe == [True] + [False] * 7
+
+
+def test_price_for_amounts_unsafe(stable_swap_oracle, curve_pool, price_feed):
+    stable_swap_oracle.set_price(1e18)
+
+    curve_pool.set_price(0.949 * 1e18)
+    (prices, is_safe, _) = price_feed.price_for_amounts(pad_amounts([1e18, 2 * 1e18]))
+    assert prices == pad_amounts([0.949 * 1e18, 0.949 * 1e18])
+    assert is_safe == [False] * 8
+
+    curve_pool.set_price(1.02 * 1e18)
+    (prices, is_safe, _) = price_feed.price_for_amounts(pad_amounts([1e18]))
+    assert prices == pad_amounts([1.02 * 1e18])
+    assert is_safe == [False] * 8
+
+    stable_swap_oracle.set_price(0.99 * 1e18)
+    curve_pool.set_price(1e18)
+    (prices, is_safe, _) = price_feed.price_for_amounts(pad_amounts([1e18]))
+    assert prices == pad_amounts([1e18])
+    assert is_safe == [True] + [False] * 7
+
+
+def test_feed_state_before_any_price_set(stable_swap_oracle, curve_pool, price_feed):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+
+    assert price_feed.feed_state() == (
+        0,
+        0,
+        0.98 * 1e18,
+        True,
+        1e18,
+        500,
+        price_feed.admin(),
+        curve_pool,
+        stable_swap_oracle
+    )
+
+
+def test_feed_state(stable_swap_oracle, curve_pool, price_feed, stranger):
+    stable_swap_oracle.set_price(1e18)
+    curve_pool.set_price(0.98 * 1e18)
+    price_feed.update_safe_price({'from': stranger})
+    updated_at = chain[-1].timestamp
+
+    curve_pool.set_price(0.949 * 1e18)
+
+    assert price_feed.feed_state() == (
+        0.98 * 1e18,
+        updated_at,
+        0.949 * 1e18,
+        False,
+        1e18,
+        500,
+        price_feed.admin(),
+        curve_pool,
+        stable_swap_oracle
+    )
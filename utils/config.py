@@ -20,7 +20,9 @@ def get_deployer_account(is_live):
         raise EnvironmentError(
             'Please set DEPLOYER env variable to the deployer account name')
 
-    return accounts.load(os.environ['DEPLOYER']) if is_live else accounts[0]
+    # the keystore password is prompted for unless DEPLOYER_PASSWORD is set
+    password = os.environ.get('DEPLOYER_PASSWORD')
+    return accounts.load(os.environ['DEPLOYER'], password=password) if is_live else accounts[0]
 
 
 def prompt_bool():
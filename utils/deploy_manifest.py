@@ -0,0 +1,219 @@
+# Non-interactive deploys driven by a manifest. The networks of the manifest are deployed
+# concurrently, one `brownie run` subprocess per network, and every contract deployed is
+# recorded in a lockfile so that an interrupted run resumes where it stopped.
+#
+# The subprocesses report the deployed contracts by printing `RECORD_PREFIX` lines, and
+# the parent process is the only one writing the lockfile.
+
+import asyncio
+import json
+import os
+import sys
+
+from eth_utils import is_address, keccak, to_checksum_address
+
+
+RECORD_PREFIX = 'DEPLOY_RECORD '
+
+DEFAULT_MAX_SAFE_PRICE_DIFFERENCE = 500
+MAX_SAFE_PRICE_DIFFERENCE = 1000
+
+# the deployment parameters compared on resume, see `deployment_params`
+DEPLOYMENT_PARAMS = ('max_safe_price_difference', 'stable_swap_oracle', 'curve_pool', 'admin', 'immutable_sources')
+
+
+class ManifestError(ValueError):
+    pass
+
+
+def _checksum(deployment_name, key, value):
+    if not isinstance(value, str) or not is_address(value):
+        raise ManifestError(f'{deployment_name}: {key} is not an address: {value!r}')
+    return to_checksum_address(value)
+
+
+def _parse_deployment(network, deployment):
+    name = deployment.get('name')
+    if not isinstance(name, str) or not name:
+        raise ManifestError(f'{network}: every deployment needs a name')
+    unknown = set(deployment) - {'name'} - set(DEPLOYMENT_PARAMS)
+    if unknown:
+        raise ManifestError(f'{name}: unknown keys {", ".join(sorted(unknown))}')
+
+    max_safe_price_difference = deployment.get('max_safe_price_difference', DEFAULT_MAX_SAFE_PRICE_DIFFERENCE)
+    if not isinstance(max_safe_price_difference, int) or not 0 <= max_safe_price_difference <= MAX_SAFE_PRICE_DIFFERENCE:
+        raise ManifestError(f'{name}: max_safe_price_difference must be an integer from 0 to {MAX_SAFE_PRICE_DIFFERENCE}')
+    for key in ('stable_swap_oracle', 'curve_pool'):
+        if key not in deployment:
+            raise ManifestError(f'{name}: {key} is required')
+    admin = deployment.get('admin')
+
+    return {
+        'name': name,
+        'max_safe_price_difference': max_safe_price_difference,
+        'stable_swap_oracle': _checksum(name, 'stable_swap_oracle', deployment['stable_swap_oracle']),
+        'curve_pool': _checksum(name, 'curve_pool', deployment['curve_pool']),
+        # None stands for the deployer, resolved by the deploying process
+        'admin': None if admin is None else _checksum(name, 'admin', admin),
+        'immutable_sources': bool(deployment.get('immutable_sources', False)),
+    }
+
+
+def parse_manifest(manifest):
+    """
+    Validates the manifest and returns `{network: {'deployer': ..., 'deployments': [...]}}`
+    with the defaults filled in. The manifest has the form
+
+        {"networks": {"<brownie network>": {"deployer": "<account name>", "deployments": [
+            {"name": "...", "stable_swap_oracle": "0x...", "curve_pool": "0x...",
+             "max_safe_price_difference": 500, "admin": "0x...", "immutable_sources": false}
+        ]}}}
+
+    where `deployer`, `max_safe_price_difference`, `admin` and `immutable_sources` are optional.
+    """
+    networks = manifest.get('networks')
+    if not isinstance(networks, dict) or not networks:
+        raise ManifestError('the manifest lists no networks')
+
+    parsed = {}
+    for network, config in networks.items():
+        deployments = [_parse_deployment(network, deployment) for deployment in config.get('deployments', [])]
+        names = [deployment['name'] for deployment in deployments]
+        if len(set(names)) != len(names):
+            raise ManifestError(f'{network}: deployment names must be unique')
+        parsed[network] = {'deployer': config.get('deployer'), 'deployments': deployments}
+    return parsed
+
+
+def load_manifest(path):
+    with open(path) as f:
+        return parse_manifest(json.load(f))
+
+
+def default_lockfile_path(manifest_path):
+    root, _ = os.path.splitext(manifest_path)
+    return f'{root}.lock.json'
+
+
+def implementation_key(init_code):
+    """
+    Returns the hash implementations are reused by: the keccak of the init code, that is the
+    creation bytecode followed by the encoded constructor arguments, as a hex string.
+    """
+    if isinstance(init_code, str):
+        init_code = bytes.fromhex(init_code[2:] if init_code.startswith('0x') else init_code)
+    return '0x' + keccak(init_code).hex()
+
+
+def code_hash(code):
+    return '0x' + keccak(bytes(code)).hex()
+
+
+def deployment_params(deployment, admin):
+    params = {key: deployment[key] for key in DEPLOYMENT_PARAMS}
+    if params['admin'] is None:
+        params['admin'] = to_checksum_address(admin)
+    return params
+
+
+class Lockfile:
+    """
+    The deployed contracts per network:
+
+        {"networks": {"<network>": {
+            "implementations": {"<implementation key>": {"contract", "address", "tx_hash", "block_number", "code_hash"}},
+            "deployments": {"<name>": {"params", "implementation", "proxy", "tx_hash", "block_number"}}
+        }}}
+
+    Every record is saved immediately, by writing a temporary file and renaming it over
+    the lockfile, so the lockfile is never left half-written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {'networks': {}}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.data = json.load(f)
+
+    def network(self, network):
+        section = self.data['networks'].get(network, {})
+        return {
+            'implementations': dict(section.get('implementations', {})),
+            'deployments': dict(section.get('deployments', {})),
+        }
+
+    def record(self, network, record):
+        section = self.data['networks'].setdefault(network, {'implementations': {}, 'deployments': {}})
+        record = dict(record)
+        kind = record.pop('type')
+        if kind == 'implementation':
+            section['implementations'][record.pop('key')] = record
+        elif kind == 'deployment':
+            section['deployments'][record.pop('name')] = record
+        else:
+            raise ValueError(f'unknown record type {kind}')
+        self.save()
+
+    def save(self):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp_path, self.path)
+
+
+def format_record(record):
+    return RECORD_PREFIX + json.dumps(record, sort_keys=True)
+
+
+def parse_record(line):
+    """
+    Returns the record printed by `format_record`, or None for any other output line.
+    """
+    if not line.startswith(RECORD_PREFIX):
+        return None
+    return json.loads(line[len(RECORD_PREFIX):])
+
+
+def brownie_command(network):
+    return ['brownie', 'run', 'deploy', 'deploy_manifest_network', '--network', network]
+
+
+async def _deploy_network(network, command, env, lockfile, semaphore, output):
+    async with semaphore:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env=env
+        )
+        async for raw_line in process.stdout:
+            line = raw_line.decode(errors='replace').rstrip('\n')
+            record = parse_record(line)
+            if record is not None:
+                lockfile.record(network, record)
+            print(f'[{network}] {line}', file=output, flush=True)
+        return await process.wait()
+
+
+async def deploy_networks(manifest, lockfile, max_parallel, command=brownie_command, env=None, output=sys.stdout):
+    """
+    Runs `command(network)` for every network of the parsed `manifest`, at most `max_parallel`
+    at a time, and records the contracts they report in `lockfile`. The processes get `env`
+    (defaults to the current environment) with `DEPLOYER` set to the deployer of the network,
+    if the manifest sets one. Returns the exit codes by network.
+    """
+    semaphore = asyncio.Semaphore(max_parallel)
+    base_env = dict(os.environ if env is None else env, PYTHONUNBUFFERED='1')
+    networks = list(manifest)
+
+    def network_env(network):
+        deployer = manifest[network]['deployer']
+        return base_env if deployer is None else dict(base_env, DEPLOYER=deployer)
+
+    exit_codes = await asyncio.gather(*[
+        _deploy_network(network, command(network), network_env(network), lockfile, semaphore, output)
+        for network in networks
+    ])
+    return dict(zip(networks, exit_codes))
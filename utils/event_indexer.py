@@ -0,0 +1,317 @@
+import itertools
+import json
+import sqlite3
+
+import requests
+from eth_utils import event_abi_to_log_topic, to_checksum_address
+
+from utils.price_feed_client import RpcError, load_abi, decode_abi
+
+
+# events emitted by PriceFeedProxy itself, the feed ABI doesn't include them
+PROXY_EVENTS_ABI = [
+    {
+        'type': 'event',
+        'name': 'Upgraded',
+        'anonymous': False,
+        'inputs': [{'name': 'implementation', 'type': 'address', 'indexed': True}],
+    },
+    {
+        'type': 'event',
+        'name': 'AdminChanged',
+        'anonymous': False,
+        'inputs': [
+            {'name': 'previousAdmin', 'type': 'address', 'indexed': False},
+            {'name': 'newAdmin', 'type': 'address', 'indexed': False},
+        ],
+    },
+]
+
+FEED_EVENTS = (
+    'SafePriceUpdated',
+    'AdminChanged',
+    'MaxSafePriceDifferenceChanged',
+    'MaxAnchorAgeChanged',
+    'MinSafePriceChangeChanged',
+    'PriceSourcesChanged',
+    'PriceHistoryInitialized',
+)
+
+# the name the proxy `AdminChanged` is stored under, to tell it from the feed one
+PROXY_ADMIN_CHANGED = 'ProxyAdminChanged'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS safe_price_updates (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    from_price INTEGER NOT NULL,
+    to_price INTEGER NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS safe_price_updates_timestamp ON safe_price_updates (timestamp);
+
+CREATE TABLE IF NOT EXISTS config_changes (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    event TEXT NOT NULL,
+    args TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS config_changes_timestamp ON config_changes (timestamp);
+CREATE INDEX IF NOT EXISTS config_changes_event ON config_changes (event, block_number);
+
+CREATE TABLE IF NOT EXISTS checkpoint (
+    address TEXT PRIMARY KEY,
+    last_block INTEGER NOT NULL
+);
+'''
+
+
+def _event_decoders(abi):
+    decoders = {}
+    for entry in abi:
+        if entry.get('type') != 'event':
+            continue
+        topic = '0x' + event_abi_to_log_topic(entry).hex()
+        decoders[topic] = entry
+    return decoders
+
+
+def _checksum(abi_type, value):
+    if abi_type == 'address':
+        return to_checksum_address(value)
+    if abi_type.startswith('address['):
+        # the fixed-size address arrays of PriceSourcesChanged
+        return [to_checksum_address(item) for item in value]
+    return value
+
+
+def decode_log(event_abi, log):
+    topics = log['topics'][1:]
+    data_types = [arg['type'] for arg in event_abi['inputs'] if not arg['indexed']]
+    data_values = iter(decode_abi(data_types, bytes.fromhex(log['data'][2:])))
+    args = {}
+    for arg in event_abi['inputs']:
+        if arg['indexed']:
+            value = topics.pop(0)
+            # only address and value types are indexed by the feed and the proxy
+            value = '0x' + value[-40:] if arg['type'] == 'address' else int(value, 16)
+        else:
+            value = next(data_values)
+        args[arg['name']] = _checksum(arg['type'], value)
+    return args
+
+
+class EventIndexer:
+    """
+    Copies the feed and the proxy events into an SQLite database. The logs are requested
+    in block ranges of adaptive size: a range is halved when the node rejects it and
+    doubled while it returns few logs, staying below the smallest rejected one. Progress
+    is checkpointed with every range, so an interrupted or repeated run only requests
+    the blocks not indexed yet.
+    """
+
+    def __init__(
+        self,
+        rpc_url,
+        address,
+        db_path,
+        start_block=0,
+        confirmations=12,
+        chunk_size=10_000,
+        min_chunk_size=10,
+        max_chunk_size=1_000_000,
+        target_logs_per_chunk=1_000,
+        timeout=30,
+        session=None
+    ):
+        self.rpc_url = rpc_url
+        self.address = to_checksum_address(address)
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.target_logs_per_chunk = target_logs_per_chunk
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self._request_ids = itertools.count(1)
+        # the smallest range rejected by the node, the range doesn't grow up to it again
+        self._rejected_chunk_size = None
+        self._decoders = _event_decoders(
+            [entry for entry in load_abi() if entry.get('name') in FEED_EVENTS] + PROXY_EVENTS_ABI
+        )
+
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(SCHEMA)
+        row = self.db.execute('SELECT address FROM checkpoint').fetchone()
+        if row is not None and row[0] != self.address:
+            raise ValueError(f'{db_path} indexes {row[0]}, not {self.address}')
+
+    def close(self):
+        self.db.close()
+
+    def _rpc(self, method, params):
+        payload = {'jsonrpc': '2.0', 'id': next(self._request_ids), 'method': method, 'params': params}
+        response = self.session.post(self.rpc_url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        response = response.json()
+        if 'error' in response:
+            raise RpcError(method, response['error'])
+        return response['result']
+
+    def _block_timestamps(self, block_numbers):
+        if not block_numbers:
+            return {}
+        batch = [
+            {
+                'jsonrpc': '2.0',
+                'id': next(self._request_ids),
+                'method': 'eth_getBlockByNumber',
+                'params': [hex(block_number), False],
+            }
+            for block_number in block_numbers
+        ]
+        response = self.session.post(self.rpc_url, json=batch, timeout=self.timeout)
+        response.raise_for_status()
+        responses = response.json()
+        if not isinstance(responses, list):
+            # the node answers a batch it rejects as a whole with a single error
+            error = responses.get('error', responses) if isinstance(responses, dict) else {'message': responses}
+            raise RpcError('eth_getBlockByNumber', error)
+        timestamps = {}
+        for result in responses:
+            if 'error' in result:
+                raise RpcError('eth_getBlockByNumber', result['error'])
+            block = result.get('result')
+            if block is None:
+                # e.g. a node behind a load balancer that hasn't seen the block yet
+                raise RpcError('eth_getBlockByNumber', {'message': f'block not found in {result!r}'})
+            timestamps[int(block['number'], 16)] = int(block['timestamp'], 16)
+        missing = set(block_numbers) - set(timestamps)
+        if missing:
+            raise RpcError('eth_getBlockByNumber', {'message': f'no results for blocks {sorted(missing)}'})
+        return timestamps
+
+    def get_logs(self, from_block, to_block):
+        return self._rpc('eth_getLogs', [{
+            'address': self.address,
+            'fromBlock': hex(from_block),
+            'toBlock': hex(to_block),
+            'topics': [list(self._decoders)],
+        }])
+
+    def last_indexed_block(self):
+        row = self.db.execute('SELECT last_block FROM checkpoint').fetchone()
+        return row[0] if row is not None else None
+
+    def _store(self, logs, to_block):
+        timestamps = self._block_timestamps(sorted({int(log['blockNumber'], 16) for log in logs}))
+        with self.db:
+            for log in logs:
+                event_abi = self._decoders[log['topics'][0]]
+                args = decode_log(event_abi, log)
+                block_number = int(log['blockNumber'], 16)
+                key = (block_number, int(log['logIndex'], 16), timestamps[block_number], log['transactionHash'])
+                name = event_abi['name']
+                if name == 'SafePriceUpdated':
+                    self.db.execute(
+                        'INSERT OR REPLACE INTO safe_price_updates VALUES (?, ?, ?, ?, ?, ?)',
+                        key + (args['from_price'], args['to_price'])
+                    )
+                else:
+                    if name == 'AdminChanged' and 'newAdmin' in args:
+                        name = PROXY_ADMIN_CHANGED
+                    self.db.execute(
+                        'INSERT OR REPLACE INTO config_changes VALUES (?, ?, ?, ?, ?, ?)',
+                        key + (name, json.dumps(args))
+                    )
+            self.db.execute('INSERT OR REPLACE INTO checkpoint VALUES (?, ?)', (self.address, to_block))
+
+    def run(self, to_block=None):
+        """
+        Indexes the blocks since the last checkpoint (or `start_block`) up to `to_block`,
+        which defaults to the latest block minus `confirmations`. Returns the number of
+        the stored logs.
+        """
+        if to_block is None:
+            to_block = int(self._rpc('eth_blockNumber', []), 16) - self.confirmations
+
+        last_block = self.last_indexed_block()
+        from_block = self.start_block if last_block is None else last_block + 1
+        stored = 0
+        while from_block <= to_block:
+            chunk_end = min(from_block + self.chunk_size - 1, to_block)
+            try:
+                logs = self.get_logs(from_block, chunk_end)
+            except (RpcError, requests.RequestException):
+                # most providers limit either the block range or the number of logs
+                if self.chunk_size <= self.min_chunk_size:
+                    raise
+                self._rejected_chunk_size = min(self._rejected_chunk_size or self.chunk_size, self.chunk_size)
+                self.chunk_size = max(self.min_chunk_size, self.chunk_size // 2)
+                continue
+
+            self._store(logs, chunk_end)
+            stored += len(logs)
+            if len(logs) < self.target_logs_per_chunk // 2:
+                max_chunk_size = self.max_chunk_size
+                if self._rejected_chunk_size is not None:
+                    max_chunk_size = min(max_chunk_size, self._rejected_chunk_size - 1)
+                self.chunk_size = max(self.chunk_size, min(max_chunk_size, self.chunk_size * 2))
+            from_block = chunk_end + 1
+        return stored
+
+    def safe_price_at_block(self, block_number):
+        """
+        Returns the cached safe price and its timestamp as of the end of the block,
+        or None if no safe price was set by then.
+
+        The timestamp is the one of the last `SafePriceUpdated` event. Updates that
+        only refresh the timestamp of the cached price (see `min_safe_price_change`)
+        emit no event, so the feed may report a later timestamp for the same price.
+        """
+        return self.db.execute(
+            'SELECT to_price, timestamp FROM safe_price_updates WHERE block_number <= ? '
+            'ORDER BY block_number DESC, log_index DESC LIMIT 1',
+            (block_number,)
+        ).fetchone()
+
+    def safe_price_at_time(self, timestamp):
+        """
+        Returns the cached safe price and its timestamp as of `timestamp`,
+        or None if no safe price was set by then. See `safe_price_at_block`
+        for the timestamp.
+        """
+        return self.db.execute(
+            'SELECT to_price, timestamp FROM safe_price_updates WHERE timestamp <= ? '
+            'ORDER BY block_number DESC, log_index DESC LIMIT 1',
+            (timestamp,)
+        ).fetchone()
+
+    def safe_price_updates(self, from_block, to_block):
+        return self.db.execute(
+            'SELECT block_number, timestamp, from_price, to_price FROM safe_price_updates '
+            'WHERE block_number BETWEEN ? AND ? ORDER BY block_number, log_index',
+            (from_block, to_block)
+        ).fetchall()
+
+    def config_changes(self, event=None, to_block=None):
+        """
+        Returns `(block_number, timestamp, event, args)` of the config changes,
+        optionally of one event only and up to `to_block`.
+        """
+        query = 'SELECT block_number, timestamp, event, args FROM config_changes WHERE block_number <= ?'
+        params = [to_block if to_block is not None else 2**63 - 1]
+        if event is not None:
+            query += ' AND event = ?'
+            params.append(event)
+        query += ' ORDER BY block_number, log_index'
+        return [
+            (block_number, timestamp, event, json.loads(args))
+            for block_number, timestamp, event, args in self.db.execute(query, params)
+        ]
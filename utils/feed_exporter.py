@@ -0,0 +1,209 @@
+# Prometheus metrics of the feed health, polled over JSON-RPC by `PriceFeedClient`.
+# Requires prometheus_client, which is not a dependency of the repo: `pip install prometheus_client`.
+
+import asyncio
+import json
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.price_feed_client import PriceFeedClient
+from utils.price_math import percentage_diff
+
+try:
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, start_http_server
+except ImportError:
+    CollectorRegistry = None
+
+
+PREFIX = 'steth_price_feed'
+
+RPC_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+KEEPER_GAS_BUCKETS = (30_000, 50_000, 75_000, 100_000, 150_000, 200_000, 300_000, 500_000, 1_000_000)
+
+
+def _require_prometheus_client():
+    if CollectorRegistry is None:
+        raise ImportError('prometheus_client is required for the metrics, run `pip install prometheus_client`')
+
+
+def rpc_method(body):
+    """
+    Returns the JSON-RPC method of the request body, the distinct methods joined
+    with commas for a batch request.
+    """
+    try:
+        payload = json.loads(body)
+    except (TypeError, ValueError):
+        return 'unknown'
+    if isinstance(payload, list):
+        return ','.join(sorted({request.get('method', 'unknown') for request in payload}))
+    return payload.get('method', 'unknown')
+
+
+def poll_interval(deviation, max_safe_price_difference, min_interval, max_interval):
+    """
+    Returns the delay before the next poll of a feed, decreasing linearly from `max_interval`
+    when the pool price equals the anchor one to `min_interval` when the deviation reaches
+    `max_safe_price_difference`.
+    """
+    if max_safe_price_difference == 0:
+        return min_interval
+    closeness = min(deviation / max_safe_price_difference, 1)
+    return min_interval + (max_interval - min_interval) * (1 - closeness)
+
+
+class KeeperMetrics:
+    """
+    The gas used by the keeper transactions, labelled by the mode the keeper sends them in.
+    """
+
+    def __init__(self, registry=None):
+        _require_prometheus_client()
+        self.registry = registry if registry is not None else CollectorRegistry()
+        self.tx_gas_used = Histogram(
+            f'{PREFIX}_keeper_tx_gas_used',
+            'Gas used by the keeper transactions',
+            ['mode'],
+            buckets=KEEPER_GAS_BUCKETS,
+            registry=self.registry
+        )
+
+    def observe_tx(self, tx, batch=False):
+        self.tx_gas_used.labels('batch' if batch else 'single').observe(tx.gas_used)
+
+    def serve(self, port, addr='0.0.0.0'):
+        start_http_server(port, addr=addr, registry=self.registry)
+
+
+class FeedExporter:
+    """
+    Polls `feed_state()` of the feeds at `rpc_url` and keeps the metrics in `registry`.
+
+    Each feed is polled on its own schedule, see `poll_interval`, while at most `concurrency`
+    polls run at a time. All the clients share one HTTP session with a connection pool
+    of `concurrency` connections, and the latency of every request to the node is observed
+    by the session response hook.
+    """
+
+    def __init__(
+        self,
+        rpc_url,
+        price_feed_addresses,
+        concurrency=4,
+        min_interval=5.0,
+        max_interval=60.0,
+        timeout=10,
+        registry=None
+    ):
+        _require_prometheus_client()
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.registry = registry if registry is not None else CollectorRegistry()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.hooks['response'].append(self._observe_response)
+
+        self.clients = [
+            PriceFeedClient(rpc_url, address, timeout=timeout, session=self.session)
+            for address in price_feed_addresses
+        ]
+
+        labels = ['feed']
+        self.safe_price_age = Gauge(
+            f'{PREFIX}_safe_price_age_seconds',
+            'Seconds since the cached safe price was set, NaN if it was never set',
+            labels,
+            registry=self.registry
+        )
+        self.safe_price = Gauge(f'{PREFIX}_safe_price', 'Cached safe price, in ETH', labels, registry=self.registry)
+        self.pool_price = Gauge(f'{PREFIX}_pool_price', 'Current pool price, in ETH', labels, registry=self.registry)
+        self.anchor_price = Gauge(f'{PREFIX}_anchor_price', 'Anchor price, in ETH', labels, registry=self.registry)
+        self.deviation = Gauge(
+            f'{PREFIX}_deviation_bps',
+            'Deviation of the pool price from the anchor price, 10000 equals to 100%',
+            labels,
+            registry=self.registry
+        )
+        self.max_safe_price_difference = Gauge(
+            f'{PREFIX}_max_safe_price_difference_bps',
+            'The max_safe_price_difference of the feed, 10000 equals to 100%',
+            labels,
+            registry=self.registry
+        )
+        self.is_safe = Gauge(f'{PREFIX}_is_safe', 'Whether the current price is safe', labels, registry=self.registry)
+        self.poll_interval = Gauge(
+            f'{PREFIX}_poll_interval_seconds',
+            'Delay before the next poll of the feed',
+            labels,
+            registry=self.registry
+        )
+        self.poll_errors = Counter(f'{PREFIX}_poll_errors', 'Failed polls', labels, registry=self.registry)
+        self.rpc_latency = Histogram(
+            f'{PREFIX}_rpc_latency_seconds',
+            'Time until the node responded, by the JSON-RPC method',
+            ['method'],
+            buckets=RPC_LATENCY_BUCKETS,
+            registry=self.registry
+        )
+
+    def _observe_response(self, response, *args, **kwargs):
+        self.rpc_latency.labels(rpc_method(response.request.body)).observe(response.elapsed.total_seconds())
+
+    def poll(self, client, now=None):
+        """
+        Reads the feed state and updates the metrics of the feed. Returns the delay before
+        the next poll of the feed.
+        """
+        (
+            safe_price,
+            safe_price_timestamp,
+            pool_price,
+            is_safe,
+            anchor_price,
+            max_safe_price_difference,
+            *_
+        ) = client.fetch('feed_state')[0]
+        if now is None:
+            now = time.time()
+
+        feed = client.address
+        deviation = percentage_diff(pool_price, anchor_price) if anchor_price != 0 else 0
+        interval = poll_interval(deviation, max_safe_price_difference, self.min_interval, self.max_interval)
+
+        self.safe_price_age.labels(feed).set(now - safe_price_timestamp if safe_price_timestamp != 0 else float('nan'))
+        self.safe_price.labels(feed).set(safe_price / 10**18)
+        self.pool_price.labels(feed).set(pool_price / 10**18)
+        self.anchor_price.labels(feed).set(anchor_price / 10**18)
+        self.deviation.labels(feed).set(deviation)
+        self.max_safe_price_difference.labels(feed).set(max_safe_price_difference)
+        self.is_safe.labels(feed).set(1 if is_safe else 0)
+        self.poll_interval.labels(feed).set(interval)
+        return interval
+
+    async def _poll_forever(self, client, semaphore, iterations):
+        iteration = 0
+        while iterations is None or iteration < iterations:
+            async with semaphore:
+                try:
+                    interval = await asyncio.to_thread(self.poll, client)
+                except Exception as e:
+                    # the node may be down for a while, retry at the fastest rate
+                    print(f'{client.address}: {e!r}')
+                    self.poll_errors.labels(client.address).inc()
+                    interval = self.min_interval
+            iteration += 1
+            if iterations is None or iteration < iterations:
+                await asyncio.sleep(interval)
+
+    async def run(self, iterations=None):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*[self._poll_forever(client, semaphore, iterations) for client in self.clients])
+
+    def serve(self, port, addr='0.0.0.0'):
+        start_http_server(port, addr=addr, registry=self.registry)
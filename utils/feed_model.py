@@ -0,0 +1,225 @@
+# In-process model of StEthPriceFeed for evaluating what-if queries without an EVM.
+# Mirrors the contract state and integer arithmetic; kept in sync with the contract
+# by tests/test_feed_model.py.
+
+from utils.price_math import MAX_SAFE_PRICE, capped_safe_price, has_changed_unsafely, percentage_diff
+
+
+MAX_SAFE_PRICE_DIFFERENCE = 1000
+MAX_MIN_SAFE_PRICE_CHANGE = 50
+MAX_ANCHOR_AGE = 7 * 24 * 60 * 60
+MAX_PRICE_SOURCES = 5
+
+FETCH_STATUS_CACHED = 0
+FETCH_STATUS_UPDATED = 1
+FETCH_STATUS_UNSAFE = 2
+FETCH_STATUS_ANCHOR_STALE = 3
+
+
+class PriceFeedRevert(Exception):
+    """
+    Raised where the contract call reverts, with the revert reason or None.
+    """
+
+    def __init__(self, reason=None):
+        super().__init__(reason or 'reverted')
+        self.reason = reason
+
+
+class FixedPrice:
+    """
+    A price source returning a set price: the pool, the anchor or an additional source.
+    The timestamp is the one reported by the oracle `timestamp()` when used as the anchor.
+    An additional source with the price set to None doesn't respond.
+    """
+
+    __slots__ = ('price', 'timestamp')
+
+    def __init__(self, price, timestamp=0):
+        self.price = price
+        self.timestamp = timestamp
+
+    def get_price(self):
+        return self.price
+
+
+class PoolPrice:
+    """
+    The price of `utils.stableswap.StableSwapPool`, as read by the feed with `get_dy`.
+    """
+
+    __slots__ = ('pool',)
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def get_price(self):
+        return self.pool.steth_price()
+
+
+class FeedState:
+    __slots__ = (
+        'safe_price_value',
+        'safe_price_timestamp',
+        'max_safe_price_difference',
+        'max_anchor_age',
+        'min_safe_price_change',
+    )
+
+    def __init__(
+        self,
+        max_safe_price_difference,
+        safe_price_value=0,
+        safe_price_timestamp=0,
+        max_anchor_age=0,
+        min_safe_price_change=0
+    ):
+        self.safe_price_value = safe_price_value
+        self.safe_price_timestamp = safe_price_timestamp
+        self.max_safe_price_difference = max_safe_price_difference
+        self.max_anchor_age = max_anchor_age
+        self.min_safe_price_change = min_safe_price_change
+
+    def copy(self):
+        return FeedState(
+            self.max_safe_price_difference,
+            self.safe_price_value,
+            self.safe_price_timestamp,
+            self.max_anchor_age,
+            self.min_safe_price_change
+        )
+
+
+def median_price(pool_price, sources, quorum=0):
+    """
+    Returns the median of the pool price and the prices of the sources that respond,
+    and whether at least `quorum` sources respond. Mirrors StEthPriceFeed._median_price.
+    """
+    source_prices = [price for price in (source.get_price() for source in sources) if price is not None]
+    prices = sorted([pool_price] + source_prices)
+    middle = len(prices) // 2
+    if len(prices) % 2 == 1:
+        median = prices[middle]
+    else:
+        median = (prices[middle - 1] + prices[middle]) // 2
+    return (median, len(source_prices) >= quorum)
+
+
+class PriceFeedModel:
+    """
+    Evaluates the feed functions against `pool` and `anchor`, objects with `get_price()`
+    (the anchor also with `timestamp`), and the additional price `sources`, of which at
+    least `price_source_quorum` must respond for the price to be safe. The functions
+    that depend on the time take the block timestamp as `now`. The functions that revert
+    in the contract raise `PriceFeedRevert`, leaving the state unchanged.
+    """
+
+    __slots__ = ('pool', 'anchor', 'sources', 'price_source_quorum', 'state')
+
+    def __init__(self, pool, anchor, max_safe_price_difference, sources=(), price_source_quorum=0, state=None):
+        sources = list(sources)
+        if max_safe_price_difference > MAX_SAFE_PRICE_DIFFERENCE or price_source_quorum > len(sources):
+            raise PriceFeedRevert()
+        self.pool = pool
+        self.anchor = anchor
+        self.sources = sources
+        self.price_source_quorum = price_source_quorum
+        self.state = state if state is not None else FeedState(max_safe_price_difference)
+
+    def is_anchor_stale(self, now):
+        max_anchor_age = self.state.max_anchor_age
+        return max_anchor_age != 0 and self.anchor.timestamp + max_anchor_age < now
+
+    def pool_price(self):
+        """
+        Returns the price, whether it has changed unsafely and the anchor price.
+        """
+        price, has_quorum = median_price(self.pool.get_price(), self.sources, self.price_source_quorum)
+        anchor_price = self.anchor.get_price()
+        changed_unsafely = not has_quorum or has_changed_unsafely(price, anchor_price, self.state.max_safe_price_difference)
+        return (price, changed_unsafely, anchor_price)
+
+    def full_price_info(self, now):
+        price, changed_unsafely, anchor_price = self.pool_price()
+        if not changed_unsafely:
+            changed_unsafely = self.is_anchor_stale(now)
+        return (price, price <= MAX_SAFE_PRICE and not changed_unsafely, anchor_price)
+
+    def current_price(self, now):
+        price, is_safe, _ = self.full_price_info(now)
+        return (price, is_safe)
+
+    def safe_price(self):
+        if self.state.safe_price_timestamp == 0:
+            raise PriceFeedRevert()
+        return (self.state.safe_price_value, self.state.safe_price_timestamp)
+
+    def _try_update_safe_price(self, now):
+        if self.is_anchor_stale(now):
+            return (0, FETCH_STATUS_ANCHOR_STALE)
+        price, changed_unsafely, _ = self.pool_price()
+        if changed_unsafely:
+            return (0, FETCH_STATUS_UNSAFE)
+
+        state = self.state
+        price = capped_safe_price(price)
+        prev_price = state.safe_price_value
+        if state.min_safe_price_change != 0 and prev_price != 0:
+            if percentage_diff(price, prev_price) < state.min_safe_price_change:
+                state.safe_price_timestamp = now
+                return (prev_price, FETCH_STATUS_UPDATED)
+
+        state.safe_price_value = price
+        state.safe_price_timestamp = now
+        return (price, FETCH_STATUS_UPDATED)
+
+    def _update_safe_price(self, now):
+        price, status = self._try_update_safe_price(now)
+        if status == FETCH_STATUS_ANCHOR_STALE:
+            raise PriceFeedRevert('anchor price is stale')
+        if status != FETCH_STATUS_UPDATED:
+            raise PriceFeedRevert('price is not safe')
+        return price
+
+    def update_safe_price(self, now):
+        return self._update_safe_price(now)
+
+    def _is_fresh(self, max_age, now):
+        timestamp = self.state.safe_price_timestamp
+        return timestamp != 0 and now - timestamp <= max_age
+
+    def fetch_safe_price(self, max_age, now):
+        if not self._is_fresh(max_age, now):
+            return (self._update_safe_price(now), now)
+        return (self.state.safe_price_value, self.state.safe_price_timestamp)
+
+    def try_fetch_safe_price(self, max_age, now):
+        state = self.state
+        if self._is_fresh(max_age, now):
+            return (state.safe_price_value, state.safe_price_timestamp, FETCH_STATUS_CACHED)
+        cached = (state.safe_price_value, state.safe_price_timestamp)
+        price, status = self._try_update_safe_price(now)
+        if status == FETCH_STATUS_UPDATED:
+            return (price, now, status)
+        return cached + (status,)
+
+    def set_max_safe_price_difference(self, max_safe_price_difference):
+        if max_safe_price_difference > MAX_SAFE_PRICE_DIFFERENCE:
+            raise PriceFeedRevert()
+        self.state.max_safe_price_difference = max_safe_price_difference
+
+    def set_max_anchor_age(self, max_anchor_age):
+        if max_anchor_age > MAX_ANCHOR_AGE:
+            raise PriceFeedRevert()
+        self.state.max_anchor_age = max_anchor_age
+
+    def set_min_safe_price_change(self, min_safe_price_change):
+        if min_safe_price_change > MAX_MIN_SAFE_PRICE_CHANGE:
+            raise PriceFeedRevert()
+        self.state.min_safe_price_change = min_safe_price_change
+
+    def set_price_sources(self, sources, quorum=0):
+        if len(sources) > MAX_PRICE_SOURCES or quorum > len(sources):
+            raise PriceFeedRevert()
+        self.sources = list(sources)
+        self.price_source_quorum = quorum
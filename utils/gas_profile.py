@@ -0,0 +1,172 @@
+# Attribution of the gas used by a transaction to the call frames and the opcode
+# classes, computed from the struct logs returned by `debug_traceTransaction`.
+
+import json
+
+
+CALL_OPS = ('CALL', 'CALLCODE', 'DELEGATECALL', 'STATICCALL')
+CREATE_OPS = ('CREATE', 'CREATE2')
+
+OP_CLASSES = ('SLOAD', 'SSTORE', 'CALL', 'LOG', 'OTHER')
+
+
+def op_class(op):
+    if op in ('SLOAD', 'SSTORE'):
+        return op
+    if op in CALL_OPS or op in CREATE_OPS:
+        return 'CALL'
+    if op.startswith('LOG'):
+        return 'LOG'
+    return 'OTHER'
+
+
+def _word(value):
+    if isinstance(value, int):
+        return value
+    return int(value, 16)
+
+
+def _address(word):
+    return '0x' + format(_word(word) % 2**160, '040x')
+
+
+class Frame:
+    def __init__(self, address, call_type, parent=None, name=None):
+        self.address = address
+        self.call_type = call_type
+        self.parent = parent
+        self.name = name or address
+        self.children = []
+        self.by_class = dict.fromkeys(OP_CLASSES, 0)
+
+    @property
+    def label(self):
+        return self.name if self.call_type is None else f'{self.name}[{self.call_type.lower()}]'
+
+    @property
+    def path(self):
+        labels = []
+        frame = self
+        while frame is not None:
+            labels.append(frame.label)
+            frame = frame.parent
+        return ';'.join(reversed(labels))
+
+    @property
+    def self_gas(self):
+        return sum(self.by_class.values())
+
+    @property
+    def gas(self):
+        return self.self_gas + sum(child.gas for child in self.children)
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def build_frames(struct_logs, to_address, names=None):
+    """
+    Returns the root frame of the call tree with the gas of every step attributed
+    to the frame it was executed in and to its opcode class. The gas a call opcode
+    forwards to the callee is attributed to the callee, only the call overhead
+    stays with the caller as `CALL`.
+
+    `names` maps the lowercase addresses to the labels used in the output.
+    """
+    names = {address.lower(): name for address, name in (names or {}).items()}
+
+    def make_frame(address, call_type, parent):
+        return Frame(address, call_type, parent, names.get(address))
+
+    root = make_frame(to_address.lower(), None, None)
+    frame = root
+    # (frame, step) of the call opcodes waiting for the callee to return
+    pending_calls = []
+
+    for i, step in enumerate(struct_logs):
+        op = step['op']
+        depth = step['depth']
+        next_step = struct_logs[i + 1] if i + 1 < len(struct_logs) else None
+
+        if next_step is not None and next_step['depth'] > depth:
+            # entering a new frame, the opcode cost is known once it returns
+            pending_calls.append((frame, step))
+            if op in CALL_OPS:
+                # for DELEGATECALL that's the address of the executed code
+                child = make_frame(_address(step['stack'][-2]), op, frame)
+            else:
+                child = make_frame('(new contract)', op, frame)
+            frame.children.append(child)
+            frame = child
+            continue
+
+        if next_step is None:
+            cost = step['gasCost']
+        elif next_step['depth'] == depth:
+            cost = step['gas'] - next_step['gas']
+        else:
+            # the last step of a frame: RETURN, STOP, REVERT or an exceptional halt
+            cost = step['gasCost']
+        frame.by_class[op_class(op)] += cost
+
+        if next_step is not None and next_step['depth'] < depth:
+            child = frame
+            frame, call_step = pending_calls.pop()
+            # the gas spent by the caller on the call itself, less the callee's gas
+            call_cost = call_step['gas'] - next_step['gas'] - child.gas
+            frame.by_class['CALL'] += call_cost
+
+    return root
+
+
+def profile(struct_logs, to_address, gas_used, names=None):
+    """
+    Returns the profile as a JSON-serializable dict: the totals by opcode class and
+    every frame with its own gas by opcode class and the gas including its subcalls.
+    The difference between `gas_used` and the executed gas is the intrinsic
+    transaction gas less the storage refunds.
+    """
+    root = build_frames(struct_logs, to_address, names)
+    totals = dict.fromkeys(OP_CLASSES, 0)
+    frames = []
+    for frame in root.walk():
+        for op_class_name, gas in frame.by_class.items():
+            totals[op_class_name] += gas
+        frames.append({
+            'path': frame.path,
+            'address': frame.address,
+            'call_type': frame.call_type,
+            'gas': frame.gas,
+            'self_gas': frame.self_gas,
+            'by_class': dict(frame.by_class),
+        })
+    return {
+        'gas_used': gas_used,
+        'execution_gas': root.gas,
+        'intrinsic_gas_less_refunds': gas_used - root.gas,
+        'by_class': totals,
+        'frames': frames,
+    }
+
+
+def collapsed_stacks(result):
+    """
+    Returns the profile in the collapsed stack format read by flamegraph.pl and
+    speedscope: one `frame;frame;CLASS gas` line per frame and opcode class.
+    """
+    lines = []
+    for frame in result['frames']:
+        for op_class_name, gas in frame['by_class'].items():
+            if gas > 0:
+                lines.append(f'{frame["path"]};{op_class_name} {gas}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_profile(result, json_path, collapsed_path):
+    with open(json_path, 'w') as f:
+        json.dump(result, f, indent=2)
+        f.write('\n')
+    with open(collapsed_path, 'w') as f:
+        f.write(collapsed_stacks(result))
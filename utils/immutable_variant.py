@@ -0,0 +1,155 @@
+# Generates contracts/StEthPriceFeedImmutable.vy from contracts/StEthPriceFeed.vy: the same
+# feed with the Curve pool and the stable swap oracle addresses kept in immutables of the
+# implementation instead of the proxy storage. Run `python -m utils.immutable_variant` after
+# changing StEthPriceFeed.vy, `tests/test_immutable_sources.py` checks the variant is up to date.
+#
+# Every rewrite must match the expected number of times, so a change to the feed the rewrites
+# don't account for fails the generation instead of producing a variant that silently differs.
+
+import os
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_PATH = os.path.join(ROOT, 'contracts', 'StEthPriceFeed.vy')
+VARIANT_PATH = os.path.join(ROOT, 'contracts', 'StEthPriceFeedImmutable.vy')
+
+HEADER = '''# pragma evm-version istanbul
+
+# @dev A variant of StEthPriceFeed that keeps the Curve pool and the stable swap oracle
+#      addresses in the implementation bytecode instead of the proxy storage. Switching
+#      to other price sources requires deploying a new implementation and upgrading the
+#      proxy to it.
+# @dev Generated from StEthPriceFeed.vy by `python -m utils.immutable_variant`, don't edit.
+'''
+
+IMMUTABLES = '''CURVE_POOL: immutable(address)
+STABLE_SWAP_ORACLE: immutable(address)
+
+# Note: check out the unstructured storage'''
+
+STORED_ADDRESSES = '''# Not read by this implementation, kept in sync with the immutables so that
+# the proxy may be upgraded back to StEthPriceFeed
+stored_curve_pool_address: address
+stored_stable_swap_oracle_address: address
+'''
+
+CONSTRUCTOR = '''@external
+def __init__(stable_swap_oracle_address: address, curve_pool_address: address):
+    """
+    @dev Sets the price sources used by every proxy pointing to this implementation.
+
+    @param stable_swap_oracle_address Stable swap oracle address
+    @param curve_pool_address Curve stEth/Eth pool address
+    """
+    assert stable_swap_oracle_address != empty(address)
+    assert curve_pool_address != empty(address)
+    STABLE_SWAP_ORACLE = stable_swap_oracle_address
+    CURVE_POOL = curve_pool_address
+
+
+@external
+def initialize('''
+
+ADDRESS_GETTERS = '''
+
+
+@view
+@external
+def curve_pool_address() -> address:
+    return CURVE_POOL
+
+
+@view
+@external
+def stable_swap_oracle_address() -> address:
+    return STABLE_SWAP_ORACLE
+
+
+@external
+def initialize_price_history('''
+
+# (old, new, expected count), applied in order
+REWRITES = [
+    ('# pragma evm-version istanbul\n', HEADER, 1),
+    ('# Note: check out the unstructured storage', IMMUTABLES, 1),
+    (
+        'curve_pool_address: public(address)\nstable_swap_oracle_address: public(address)\n',
+        STORED_ADDRESSES,
+        1
+    ),
+    (
+        '@param curve_pool_address Curve stEth/Eth pool address\n',
+        '@param curve_pool_address Curve stEth/Eth pool address, must match the implementation one\n',
+        1
+    ),
+    (
+        '@param stable_swap_oracle_address Stable swap oracle address\n    """\n    assert self.curve_pool',
+        '@param stable_swap_oracle_address Stable swap oracle address, must match the implementation one\n'
+        '    """\n    assert self.curve_pool',
+        1
+    ),
+    ('assert stable_swap_oracle_address != empty(address)\n    assert curve_pool_address != empty(address)\n\n', (
+        'assert stable_swap_oracle_address == STABLE_SWAP_ORACLE\n'
+        '    assert curve_pool_address == CURVE_POOL\n\n'
+    ), 1),
+    ('self.stable_swap_oracle_address = stable_swap_oracle_address', 'self.stored_stable_swap_oracle_address = stable_swap_oracle_address', 1),
+    ('self.curve_pool_address = curve_pool_address', 'self.stored_curve_pool_address = curve_pool_address', 1),
+    # the initialization guards of `initialize` and `finalize_upgrade_v2`
+    ('assert self.curve_pool_address', 'assert self.stored_curve_pool_address', 2),
+    (
+        '@dev Moves the cached safe price from the two legacy slots into the packed one.\n',
+        '@dev Moves the cached safe price from the two legacy slots into the packed one\n'
+        '    and syncs the stored price sources with the implementation ones.\n',
+        1
+    ),
+    (
+        '        self.legacy_safe_price_timestamp = 0\n\n\n@external\ndef initialize_price_history(',
+        '        self.legacy_safe_price_timestamp = 0\n'
+        '    self.stored_stable_swap_oracle_address = STABLE_SWAP_ORACLE\n'
+        '    self.stored_curve_pool_address = CURVE_POOL'
+        + ADDRESS_GETTERS,
+        1
+    ),
+    (
+        'Should be passed as the setup call to `PriceFeedProxy.upgradeTo` when upgrading\n'
+        '    from the v1 implementation.',
+        'Should be passed as the setup call to `PriceFeedProxy.upgradeTo` when upgrading\n'
+        '    to this implementation.',
+        1
+    ),
+    ('@external\ndef initialize(', CONSTRUCTOR, 1),
+    ('self.curve_pool_address', 'CURVE_POOL', None),
+    ('self.stable_swap_oracle_address', 'STABLE_SWAP_ORACLE', None),
+]
+
+
+class VariantError(ValueError):
+    pass
+
+
+def render(source):
+    """
+    Returns the source of StEthPriceFeedImmutable given the one of StEthPriceFeed.
+    """
+    for old, new, expected_count in REWRITES:
+        count = source.count(old)
+        if expected_count is not None and count != expected_count:
+            raise VariantError(f'expected {expected_count} of {old!r} in StEthPriceFeed.vy, found {count}')
+        source = source.replace(old, new)
+    return source
+
+
+def read_source(path=SOURCE_PATH):
+    with open(path) as f:
+        return f.read()
+
+
+def main():
+    variant = render(read_source())
+    with open(VARIANT_PATH, 'w') as f:
+        f.write(variant)
+    print(f'Wrote {VARIANT_PATH}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# Relays the cached safe price of the mainnet feed to StEthPriceMirror on another chain.
+
+import itertools
+import json
+import os
+import time
+
+import requests
+from eth_utils import event_abi_to_log_topic, to_checksum_address
+
+from utils.event_indexer import decode_log
+from utils.price_feed_client import PriceFeedClient, RpcError, load_abi
+
+
+MIRROR_ABI_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'interfaces',
+    'StEthPriceMirror.json'
+)
+
+
+def load_mirror_abi(path=MIRROR_ABI_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+class SafePriceUpdate:
+    __slots__ = ('price', 'timestamp', 'block_number')
+
+    def __init__(self, price, timestamp, block_number):
+        self.price = price
+        self.timestamp = timestamp
+        self.block_number = block_number
+
+    def __repr__(self):
+        return f'SafePriceUpdate(price={self.price}, timestamp={self.timestamp}, block_number={self.block_number})'
+
+    def as_tuple(self):
+        return (self.price, self.timestamp, self.block_number)
+
+
+class MirrorRelayer:
+    """
+    Watches `SafePriceUpdated` of the feed on the source chain and pushes the safe price to
+    the mirror on the destination chain. All the updates found since the previous run are
+    coalesced into the latest one, so a single transaction is sent per run at most.
+
+    The source is read over JSON-RPC at `source_rpc_url`, in block ranges of at most
+    `max_block_range` blocks up to the latest block minus `confirmations`. The destination
+    is a `Web3` instance, and `sender` is an account it can send transactions from.
+    """
+
+    def __init__(
+        self,
+        source_rpc_url,
+        price_feed_address,
+        destination_web3,
+        mirror_address,
+        sender,
+        start_block=0,
+        confirmations=12,
+        max_block_range=10_000,
+        timeout=30,
+        session=None
+    ):
+        self.source_rpc_url = source_rpc_url
+        self.price_feed_address = to_checksum_address(price_feed_address)
+        self.destination_web3 = destination_web3
+        self.mirror = destination_web3.eth.contract(
+            address=to_checksum_address(mirror_address),
+            abi=load_mirror_abi()
+        )
+        self.sender = sender
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.max_block_range = max_block_range
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.price_feed = PriceFeedClient(source_rpc_url, price_feed_address, timeout=timeout, session=self.session)
+        self._request_ids = itertools.count(1)
+        self._event_abi = next(
+            entry for entry in load_abi()
+            if entry.get('type') == 'event' and entry['name'] == 'SafePriceUpdated'
+        )
+        self._topic = '0x' + event_abi_to_log_topic(self._event_abi).hex()
+        # the first source block not scanned yet, resumed from the mirror state on the first run
+        self.next_block = None
+
+    def _rpc(self, method, params):
+        payload = {'jsonrpc': '2.0', 'id': next(self._request_ids), 'method': method, 'params': params}
+        response = self.session.post(self.source_rpc_url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        response = response.json()
+        if 'error' in response:
+            raise RpcError(method, response['error'])
+        return response['result']
+
+    def mirrored_update(self):
+        """
+        Returns the update stored by the mirror, or None if nothing was pushed yet.
+        """
+        price, timestamp, block_number = self.mirror.functions.safe_price_info().call()
+        if timestamp == 0:
+            return None
+        return SafePriceUpdate(price, timestamp, block_number)
+
+    def pending_update(self, from_block, to_block):
+        """
+        Returns the latest safe price set between `from_block` and `to_block`, or None if
+        it wasn't changed. Updates that only refresh the timestamp emit no event, so the
+        feed is also read at `to_block` and its price is returned if it is newer.
+        """
+        latest_log = None
+        while from_block <= to_block:
+            chunk_end = min(from_block + self.max_block_range - 1, to_block)
+            logs = self._rpc('eth_getLogs', [{
+                'address': self.price_feed_address,
+                'fromBlock': hex(from_block),
+                'toBlock': hex(chunk_end),
+                'topics': [self._topic],
+            }])
+            if logs:
+                latest_log = logs[-1]
+            from_block = chunk_end + 1
+
+        update = None
+        if latest_log is not None:
+            block = self._rpc('eth_getBlockByNumber', [latest_log['blockNumber'], False])
+            update = SafePriceUpdate(
+                decode_log(self._event_abi, latest_log)['to_price'],
+                int(block['timestamp'], 16),
+                int(latest_log['blockNumber'], 16)
+            )
+
+        price, timestamp = self.price_feed.fetch('safe_price_value', 'safe_price_timestamp', block_number=to_block)
+        if timestamp != 0 and (update is None or timestamp > update.timestamp):
+            update = SafePriceUpdate(price, timestamp, to_block)
+        return update
+
+    def push(self, update):
+        tx_hash = self.mirror.functions.push_safe_price(*update.as_tuple()).transact({'from': self.sender})
+        receipt = self.destination_web3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.timeout)
+        if receipt['status'] != 1:
+            raise RuntimeError(f'push_safe_price reverted in {tx_hash.hex()}')
+        return receipt
+
+    def relay(self, to_block=None):
+        """
+        Pushes the latest safe price set up to `to_block` (defaults to the latest block minus
+        `confirmations`) if it's newer than the mirrored one. Returns the pushed update or None.
+        """
+        if to_block is None:
+            to_block = int(self._rpc('eth_blockNumber', []), 16) - self.confirmations
+
+        mirrored = self.mirrored_update()
+        if self.next_block is None:
+            self.next_block = self.start_block if mirrored is None else max(self.start_block, mirrored.block_number + 1)
+        if self.next_block > to_block:
+            return None
+
+        update = self.pending_update(self.next_block, to_block)
+        pushed = None
+        if update is not None and (mirrored is None or update.timestamp > mirrored.timestamp):
+            self.push(update)
+            pushed = update
+        self.next_block = to_block + 1
+        return pushed
+
+    def run(self, poll_interval, iterations=None):
+        iteration = 0
+        while iterations is None or iteration < iterations:
+            try:
+                update = self.relay()
+                if update is not None:
+                    print(f'Pushed {update}')
+            except Exception as e:
+                # a failed iteration, including a reverted push, is retried from the same block
+                print(f'Relaying failed: {e!r}')
+            iteration += 1
+            if iterations is None or iteration < iterations:
+                time.sleep(poll_interval)
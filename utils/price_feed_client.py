@@ -0,0 +1,182 @@
+import itertools
+import json
+import os
+import time
+from collections import OrderedDict
+
+import requests
+from eth_utils import function_abi_to_4byte_selector, to_checksum_address
+
+try:
+    from eth_abi import encode as encode_abi, decode as decode_abi
+except ImportError:
+    from eth_abi import encode_abi, decode_abi
+
+
+DEFAULT_ABI_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'interfaces',
+    'StEthPriceFeed.json'
+)
+
+
+class RpcError(Exception):
+    def __init__(self, method, error):
+        super().__init__(f'{method}: {error.get("message", error)}')
+        self.method = method
+        self.error = error
+
+
+def load_abi(path=DEFAULT_ABI_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+class LRUCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self._items:
+            return default
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+
+class PriceFeedClient:
+    """
+    Reads the price feed over JSON-RPC. All the calls of a `fetch()` are sent as
+    a single batch request pinned to one block, and the results are cached per
+    block number, so repeated reads within a block are not sent again.
+    """
+
+    def __init__(
+        self,
+        rpc_url,
+        address,
+        abi=None,
+        cache_size=256,
+        block_number_max_age=1.0,
+        timeout=10,
+        session=None
+    ):
+        self.rpc_url = rpc_url
+        self.address = to_checksum_address(address)
+        self.timeout = timeout
+        # block number is re-requested at most once per `block_number_max_age` seconds
+        self.block_number_max_age = block_number_max_age
+        self.cache = LRUCache(cache_size)
+        self.session = session or requests.Session()
+        self._functions = {
+            entry['name']: entry
+            for entry in (abi if abi is not None else load_abi())
+            if entry.get('type') == 'function'
+        }
+        self._request_ids = itertools.count(1)
+        self._block_number = None
+        self._block_number_fetched_at = 0
+
+    def _post(self, payload):
+        response = self.session.post(self.rpc_url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _request(self, method, params):
+        return {'jsonrpc': '2.0', 'id': next(self._request_ids), 'method': method, 'params': params}
+
+    def block_number(self, refresh=False):
+        now = time.monotonic()
+        if refresh or self._block_number is None or now - self._block_number_fetched_at > self.block_number_max_age:
+            response = self._post(self._request('eth_blockNumber', []))
+            if 'error' in response:
+                raise RpcError('eth_blockNumber', response['error'])
+            self._block_number = int(response['result'], 16)
+            self._block_number_fetched_at = now
+        return self._block_number
+
+    def _encode_call(self, name, args):
+        fn = self._functions[name]
+        input_types = [arg['type'] for arg in fn['inputs']]
+        data = function_abi_to_4byte_selector(fn) + encode_abi(input_types, list(args))
+        return '0x' + data.hex()
+
+    def _decode_result(self, name, result):
+        output_types = [output['type'] for output in self._functions[name]['outputs']]
+        values = decode_abi(output_types, bytes.fromhex(result[2:]))
+        values = tuple(to_checksum_address(v) if t == 'address' else v for t, v in zip(output_types, values))
+        return values[0] if len(values) == 1 else values
+
+    def fetch(self, *calls, block_number=None):
+        """
+        Performs the given calls, each one being either a function name or a
+        `(name, *args)` tuple, at the given or the latest block. Returns the
+        decoded results in the same order.
+        """
+        if block_number is None:
+            block_number = self.block_number()
+
+        calls = [(call,) if isinstance(call, str) else _hashable(call) for call in calls]
+        keys = [(block_number, call) for call in calls]
+        # the hits are read before the results of the missing calls are cached, which may evict them
+        results = {key: self.cache.get(key) for key in dict.fromkeys(keys) if key in self.cache}
+        missing = [key for key in dict.fromkeys(keys) if key not in results]
+
+        if missing:
+            batch = []
+            keys_by_id = {}
+            for key in missing:
+                name, *args = key[1]
+                request = self._request('eth_call', [
+                    {'to': self.address, 'data': self._encode_call(name, args)},
+                    hex(block_number)
+                ])
+                batch.append(request)
+                keys_by_id[request['id']] = key
+            responses = self._post(batch)
+            if not isinstance(responses, list):
+                # the node answers a batch it rejects as a whole with a single error
+                error = responses.get('error', responses) if isinstance(responses, dict) else {'message': responses}
+                raise RpcError('eth_call', error)
+            for response in responses:
+                key = keys_by_id[response['id']]
+                if 'error' in response:
+                    raise RpcError(key[1][0], response['error'])
+                results[key] = self._decode_result(key[1][0], response['result'])
+                self.cache.put(key, results[key])
+
+        return [results[key] for key in keys]
+
+    def safe_price(self, block_number=None):
+        return self.fetch('safe_price', block_number=block_number)[0]
+
+    def current_price(self, block_number=None):
+        return self.fetch('current_price', block_number=block_number)[0]
+
+    def full_price_info(self, block_number=None):
+        return self.fetch('full_price_info', block_number=block_number)[0]
+
+    def prices(self, block_number=None):
+        """
+        Returns the results of `safe_price`, `current_price` and `full_price_info`
+        fetched in a single batch request.
+        """
+        return self.fetch('safe_price', 'current_price', 'full_price_info', block_number=block_number)
@@ -0,0 +1,32 @@
+# Integer arithmetic of StEthPriceFeed, kept in sync with the contract
+
+
+MAX_SAFE_PRICE = 10**18
+
+# 10000 equals to 100%
+PERCENTAGE_BASE = 10000
+
+
+def percentage_diff(new, old):
+    # mirrors StEthPriceFeed._percentage_diff
+    if new > old:
+        return (new - old) * PERCENTAGE_BASE // old
+    else:
+        return (old - new) * PERCENTAGE_BASE // old
+
+
+def has_changed_unsafely(pool_price, oracle_price, max_safe_price_difference):
+    return percentage_diff(pool_price, oracle_price) > max_safe_price_difference
+
+
+def is_safe_price(pool_price, oracle_price, max_safe_price_difference):
+    # the `is_safe` flag returned by `current_price` and `full_price_info`
+    return (
+        pool_price <= MAX_SAFE_PRICE
+        and not has_changed_unsafely(pool_price, oracle_price, max_safe_price_difference)
+    )
+
+
+def capped_safe_price(pool_price):
+    # the value `update_safe_price` caches
+    return min(MAX_SAFE_PRICE, pool_price)
@@ -0,0 +1,146 @@
+# Vectorized replay of the StEthPriceFeed safety rules over historical prices.
+# The results match the contract bit for bit: see utils/price_math.py for
+# the scalar version of the same rules.
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError('utils/safety_backtest.py requires numpy, please install it: pip install numpy')
+
+from utils.price_math import MAX_SAFE_PRICE, PERCENTAGE_BASE
+
+
+UINT64_MAX = 2**64 - 1
+
+# the long division in `percentage_diff` multiplies remainders (less than `old`) by 10
+MAX_FAST_PATH_PRICE = UINT64_MAX // 10
+
+
+def as_price_array(values):
+    """
+    Converts prices to a uint64 array if they fit into the fast path, and to an array
+    of Python integers otherwise.
+    """
+    if isinstance(values, np.ndarray):
+        if values.dtype == np.uint64:
+            return values
+        if values.dtype.kind in 'iu' and (values.size == 0 or values.min() >= 0):
+            return values.astype(np.uint64)
+    array = np.asarray(values, dtype=object)
+    if array.size == 0 or (min(array) >= 0 and max(array) <= UINT64_MAX):
+        return array.astype(np.uint64)
+    return array
+
+
+def percentage_diff(new, old):
+    """
+    Vectorized `StEthPriceFeed._percentage_diff`: abs(new - old) * 10000 // old.
+    """
+    new = as_price_array(new)
+    old = as_price_array(old)
+    if new.shape != old.shape:
+        raise ValueError('price arrays have different shapes')
+    if np.any(old == 0):
+        raise ZeroDivisionError('zero anchor price, the feed reverts on it')
+
+    fast_path = (
+        new.dtype == np.uint64
+        and old.dtype == np.uint64
+        and (old.size == 0 or int(old.max()) <= MAX_FAST_PATH_PRICE)
+    )
+    if fast_path:
+        diff = np.where(new > old, new - old, old - new)
+        quotient = diff // old
+        fast_path = quotient.size == 0 or int(quotient.max()) <= (UINT64_MAX - PERCENTAGE_BASE) // PERCENTAGE_BASE
+
+    if not fast_path:
+        new = new.astype(object)
+        old = old.astype(object)
+        diff = np.where(new > old, new - old, old - new)
+        return diff * PERCENTAGE_BASE // old
+
+    # diff * 10000 may overflow uint64, so it's divided by `old` digit by digit:
+    # floor(diff * 10**4 / old) = (diff // old) * 10**4 + floor((diff % old) * 10**4 / old)
+    result = quotient * np.uint64(PERCENTAGE_BASE)
+    remainder = diff % old
+    for power in (1000, 100, 10, 1):
+        remainder = remainder * np.uint64(10)
+        result += (remainder // old) * np.uint64(power)
+        remainder = remainder % old
+    return result
+
+
+def evaluate(pool_prices, oracle_prices, max_safe_price_difference):
+    """
+    Returns two boolean arrays: whether `update_safe_price` reverts with "price is not safe",
+    and the `is_safe` flag of `current_price` / `full_price_info`.
+    """
+    pool_prices = as_price_array(pool_prices)
+    diffs = percentage_diff(pool_prices, oracle_prices)
+    has_changed_unsafely = np.asarray(diffs > max_safe_price_difference, dtype=bool)
+    is_safe = np.asarray(pool_prices <= MAX_SAFE_PRICE, dtype=bool) & ~has_changed_unsafely
+    return has_changed_unsafely, is_safe
+
+
+def unsafe_fractions(pool_prices, oracle_prices, thresholds):
+    """
+    For each candidate `max_safe_price_difference`, returns the fraction of the rows where
+    `update_safe_price` would revert and the fraction of the rows where `current_price`
+    reports the price as not safe, as a `{threshold: (reverts, not_safe)}` dict.
+
+    The percentage differences are calculated and sorted once, so each threshold
+    only costs a binary search.
+    """
+    pool_prices = as_price_array(pool_prices)
+    diffs = percentage_diff(pool_prices, oracle_prices)
+    total = len(diffs)
+    if total == 0:
+        return {threshold: (0.0, 0.0) for threshold in thresholds}
+
+    sorted_diffs = np.sort(diffs)
+    capped = np.asarray(pool_prices <= MAX_SAFE_PRICE, dtype=bool)
+    sorted_capped_diffs = np.sort(diffs[capped])
+
+    result = {}
+    for threshold in thresholds:
+        # rows with diff <= threshold don't revert
+        not_reverting = np.searchsorted(sorted_diffs, threshold, side='right')
+        safe = np.searchsorted(sorted_capped_diffs, threshold, side='right')
+        result[threshold] = (1 - not_reverting / total, 1 - safe / total)
+    return result
+
+
+def replay_safe_price(pool_prices, oracle_prices, timestamps, max_safe_price_difference):
+    """
+    Simulates `update_safe_price` being called at every row. Returns the cached safe price
+    and its timestamp after each row; both are zero until the first successful update.
+    """
+    pool_prices = as_price_array(pool_prices)
+    timestamps = np.asarray(timestamps, dtype=np.uint64)
+    has_changed_unsafely, _ = evaluate(pool_prices, oracle_prices, max_safe_price_difference)
+    updated = ~has_changed_unsafely
+
+    # index of the latest successful update at or before each row, -1 if none
+    indices = np.where(updated, np.arange(len(updated)), -1)
+    last_update = np.maximum.accumulate(indices) if len(indices) else indices
+
+    capped = np.minimum(pool_prices, MAX_SAFE_PRICE).astype(pool_prices.dtype)
+    safe_prices = np.where(last_update >= 0, capped[last_update], 0)
+    safe_price_timestamps = np.where(last_update >= 0, timestamps[last_update], 0)
+    return safe_prices, safe_price_timestamps.astype(np.uint64)
+
+
+def load_csv(path):
+    """
+    Loads `pool_price,oracle_price,timestamp` rows with a header line.
+    """
+    try:
+        rows = np.loadtxt(path, delimiter=',', skiprows=1, dtype=np.uint64, ndmin=2)
+        return rows[:, 0], rows[:, 1], rows[:, 2]
+    except (ValueError, OverflowError):
+        # prices that don't fit into uint64
+        rows = np.loadtxt(path, delimiter=',', skiprows=1, dtype=str, ndmin=2)
+        pool_prices = as_price_array([int(value) for value in rows[:, 0]])
+        oracle_prices = as_price_array([int(value) for value in rows[:, 1]])
+        timestamps = np.asarray([int(value) for value in rows[:, 2]], dtype=np.uint64)
+        return pool_prices, oracle_prices, timestamps
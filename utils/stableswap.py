@@ -0,0 +1,175 @@
+# Integer model of the Curve stETH/ETH StableSwap pool, kept in sync with
+# contracts/test_helpers/StableSwapPoolMock.vy. The math follows the pool
+# contract: both coins have 18 decimals, so the balances are used as is.
+
+import csv
+
+from utils.price_math import has_changed_unsafely, is_safe_price, capped_safe_price
+
+
+N_COINS = 2
+A_PRECISION = 100
+FEE_DENOMINATOR = 10**10
+
+ETH_INDEX = 0
+STETH_INDEX = 1
+
+
+class StableSwapError(Exception):
+    pass
+
+
+def get_D(xp, amp):
+    """
+    Returns the StableSwap invariant for the balances `xp` and the amplification
+    coefficient `amp`, multiplied by A_PRECISION (the value returned by `A_precise()`).
+    """
+    S = sum(xp)
+    if S == 0:
+        return 0
+
+    D = S
+    Ann = amp * N_COINS
+    for _ in range(255):
+        D_P = D
+        for x in xp:
+            # +1 is to prevent division by zero, same as the pool does
+            D_P = D_P * D // (x * N_COINS + 1)
+        D_prev = D
+        D = (
+            (Ann * S // A_PRECISION + D_P * N_COINS) * D
+            // ((Ann - A_PRECISION) * D // A_PRECISION + (N_COINS + 1) * D_P)
+        )
+        if abs(D - D_prev) <= 1:
+            return D
+    raise StableSwapError('get_D did not converge')
+
+
+def get_y(i, j, x, xp, amp):
+    """
+    Returns the new balance of the coin `j` given that the balance of the coin `i`
+    becomes `x` and the invariant is kept.
+    """
+    if i == j or not (0 <= i < N_COINS and 0 <= j < N_COINS):
+        raise StableSwapError('invalid coin indices')
+
+    D = get_D(xp, amp)
+    Ann = amp * N_COINS
+    c = D
+    S_ = 0
+    for k in range(N_COINS):
+        if k == i:
+            _x = x
+        elif k != j:
+            _x = xp[k]
+        else:
+            continue
+        S_ += _x
+        c = c * D // (_x * N_COINS)
+    c = c * D * A_PRECISION // (Ann * N_COINS)
+    b = S_ + D * A_PRECISION // Ann
+
+    y = D
+    for _ in range(255):
+        y_prev = y
+        y = (y * y + c) // (2 * y + b - D)
+        if abs(y - y_prev) <= 1:
+            return y
+    raise StableSwapError('get_y did not converge')
+
+
+class StableSwapPool:
+    """
+    A two-coin StableSwap pool state: the balances, the amplification coefficient
+    multiplied by A_PRECISION, and the fee in FEE_DENOMINATOR units (4000000 is 0.04%).
+    """
+
+    def __init__(self, balances, amp, fee, admin_fee=5 * 10**9):
+        if len(balances) != N_COINS:
+            raise ValueError(f'expected {N_COINS} balances')
+        self.balances = list(balances)
+        self.amp = amp
+        self.fee = fee
+        self.admin_fee = admin_fee
+
+    def get_dy(self, i, j, dx):
+        """
+        Same as `get_dy` of the pool: the amount of the coin `j` received for `dx` of the coin `i`.
+        """
+        xp = self.balances
+        y = get_y(i, j, xp[i] + dx, xp, self.amp)
+        dy = xp[j] - y - 1
+        return dy - self.fee * dy // FEE_DENOMINATOR
+
+    def exchange(self, i, j, dx):
+        """
+        Swaps `dx` of the coin `i` for the coin `j`, updating the balances the way the pool
+        does (the admin share of the fee leaves the pool). Returns the amount received.
+        """
+        xp = self.balances
+        y = get_y(i, j, xp[i] + dx, xp, self.amp)
+        dy = xp[j] - y - 1
+        dy_fee = dy * self.fee // FEE_DENOMINATOR
+        dy_admin_fee = dy_fee * self.admin_fee // FEE_DENOMINATOR
+        self.balances[i] = xp[i] + dx
+        self.balances[j] = xp[j] - (dy - dy_fee) - dy_admin_fee
+        return dy - dy_fee
+
+    def steth_price(self, amount=10**18):
+        """
+        The price of stETH as read by StEthPriceFeed, per 10**18 stETH.
+        """
+        return self.get_dy(STETH_INDEX, ETH_INDEX, amount) * 10**18 // amount
+
+
+class PoolSnapshot:
+    __slots__ = ('timestamp', 'balances', 'amp', 'fee', 'oracle_price')
+
+    def __init__(self, timestamp, balances, amp, fee, oracle_price):
+        self.timestamp = timestamp
+        self.balances = balances
+        self.amp = amp
+        self.fee = fee
+        self.oracle_price = oracle_price
+
+    def pool(self):
+        return StableSwapPool(self.balances, self.amp, self.fee)
+
+
+def load_snapshots(path):
+    """
+    Loads pool snapshots from a CSV file with a header line and the columns
+    `timestamp,eth_balance,steth_balance,amp,fee,oracle_price`, where `amp` is
+    the value of `A_precise()` and `oracle_price` is the stable swap oracle `stethPrice()`.
+    """
+    with open(path, newline='') as f:
+        return [
+            PoolSnapshot(
+                timestamp=int(row['timestamp']),
+                balances=[int(row['eth_balance']), int(row['steth_balance'])],
+                amp=int(row['amp']),
+                fee=int(row['fee']),
+                oracle_price=int(row['oracle_price'])
+            )
+            for row in csv.DictReader(f)
+        ]
+
+
+def replay_snapshots(snapshots, max_safe_price_difference):
+    """
+    Simulates `update_safe_price` being called at every snapshot. Returns a list of
+    `(pool_price, is_safe, safe_price, safe_price_timestamp)` tuples, one per snapshot,
+    where the last two are the cached safe price and its timestamp after the call
+    (both zero until the first successful update).
+    """
+    safe_price = 0
+    safe_price_timestamp = 0
+    result = []
+    for snapshot in snapshots:
+        pool_price = snapshot.pool().steth_price()
+        if not has_changed_unsafely(pool_price, snapshot.oracle_price, max_safe_price_difference):
+            safe_price = capped_safe_price(pool_price)
+            safe_price_timestamp = snapshot.timestamp
+        is_safe = is_safe_price(pool_price, snapshot.oracle_price, max_safe_price_difference)
+        result.append((pool_price, is_safe, safe_price, safe_price_timestamp))
+    return result